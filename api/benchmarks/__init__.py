@@ -0,0 +1,162 @@
+"""
+Benchmarks of the API and its management commands. Each module is run from the
+api directory with `python -m benchmarks.<name>` and works on a throwaway
+database created like the test runner does, so the configured one is never touched.
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from functools import partial
+
+import django
+
+
+def setup():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "new_app.settings")
+    django.setup()
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """
+    Create and migrate the test database for the duration of the block
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+@contextmanager
+def timed(results, name, rows):
+    """
+    Record the duration and throughput of the block in `results`
+    """
+    started = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - started
+    results.append({"name": name, "rows": rows, "seconds": round(elapsed, 3), "rows_per_second": round(rows / elapsed)})
+    print(f"{name}: {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)")
+
+
+async def request(reader, writer, method, path, body=None, headers=None):
+    """
+    Send one HTTP/1.1 request on a kept-alive connection, `body` is sent as JSON,
+    and return the response status once its body is read
+    """
+    payload = json.dumps(body).encode() if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(payload)}\r\n"
+    if body is not None:
+        head += "Content-Type: application/json\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    writer.write(head.encode() + b"\r\n" + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif status not in (204, 304):
+        while size := int((await reader.readline()).strip(), 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    return status
+
+
+async def client(port, requests, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for method, path, body, headers in requests:
+            if time.perf_counter() >= deadline:
+                break
+            started = time.perf_counter()
+            status = await request(reader, writer, method, path, body, headers)
+            if not 200 <= status < 300:
+                errors.append((method, path, status))
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+def repeat_get(path, index):
+    while True:
+        yield "GET", path, None, None
+
+
+async def load(port, requests, concurrency, duration):
+    """
+    Run `concurrency` clients for `duration` seconds and report the throughput and
+    latency percentiles. `requests` is a path to GET repeatedly, or a function of
+    the client index returning an iterable of (method, path, body, headers); a
+    client stops early when it's exhausted.
+    """
+    if isinstance(requests, str):
+        requests = partial(repeat_get, requests)
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        client(port, iter(requests(index)), deadline, latencies, errors) for index in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def percentile(fraction):
+        if not latencies:
+            return None
+        return round(latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000, 2)
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed),
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+        "max_ms": percentile(1),
+    }
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"uvicorn didn't listen on port {port}")
+
+
+@contextmanager
+def serve(port, workers=1, env=None, interface="asgi3"):
+    """
+    Serve the ASGI (or WSGI) application with uvicorn for the duration of the
+    block, with `env` added to the environment of the workers. The load comes
+    from a single client, so throttling is off unless `env` turns it on.
+    """
+    application = "new_app.wsgi:application" if interface == "wsgi" else "new_app.asgi:application"
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", application, "--interface", interface, "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ], env={**os.environ, "THROTTLE_ENABLED": "false", **(env or {})})
+    try:
+        wait_for_port(port)
+        yield
+    finally:
+        server.terminate()
+        server.wait()
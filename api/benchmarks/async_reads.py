@@ -0,0 +1,81 @@
+"""
+Requests per second and latency percentiles of the sync read routes against their
+async-native `/api/async/...` counterparts, served by the same uvicorn workers:
+
+    python -m benchmarks.async_reads [--workers 1] [--concurrency 32] [--duration 10]
+
+The response cache is disabled so both paths hit the database on every request.
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks import setup, benchmark_database, load, serve
+
+SCHOOLS = 20
+STUDENTS_PER_SCHOOL = 500
+
+
+def seed():
+    from core.models import School, Administrator, Teacher, Course, Student, Enrollment
+
+    schools = School.objects.bulk_create(
+        [School(name=f"School {index}", address=f"{index} Main Street") for index in range(SCHOOLS)]
+    )
+    Administrator.objects.bulk_create([Administrator(name="Admin", school=school) for school in schools])
+    teachers = Teacher.objects.bulk_create([Teacher(name="Teacher", school=school) for school in schools])
+    courses = Course.objects.bulk_create([
+        Course(name="Course", location="Room 1", school=teacher.school, teacher=teacher) for teacher in teachers
+    ])
+    students = Student.objects.bulk_create([
+        Student(name=f"Student {index}", school=course.school) for course in courses for index in range(STUDENTS_PER_SCHOOL)
+    ])
+    Enrollment.objects.bulk_create([
+        Enrollment(student=student, course=course, school=course.school)
+        for course, student in zip((course for course in courses for _ in range(STUDENTS_PER_SCHOOL)), students)
+    ])
+    return schools[0].id, Student.objects.order_by("id").values_list("id", flat=True).first()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+
+    results = []
+    with benchmark_database():
+        school_id, student_id = seed()
+        routes = {
+            "list schools": "/api/schools",
+            "list students": "/api/students?limit=100",
+            "retrieve student": f"/api/students/{student_id}",
+            "school stats": f"/api/schools/{school_id}/stats",
+        }
+        env = {"POSTGRES_DB": connection.settings_dict["NAME"], "RESPONSE_CACHE_ENABLED": "false"}
+        with serve(args.port, args.workers, env):
+            for name, path in routes.items():
+                for variant, route in (("sync", path), ("async", path.replace("/api/", "/api/async/", 1))):
+                    asyncio.run(load(args.port, route, args.concurrency, 1))  # warm up
+                    result = {"route": name, "path": variant, **asyncio.run(
+                        load(args.port, route, args.concurrency, args.duration)
+                    )}
+                    results.append(result)
+                    print(f"{name:<18} {variant:<6} {result['rps']:>6} req/s  p50 {result['p50_ms']:>7} ms  "
+                          f"p99 {result['p99_ms']:>7} ms  {result['errors']} errors")
+        # The server's connections must be gone before the database is dropped
+        connection.close()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"benchmark": "async_reads", "workers": args.workers, "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
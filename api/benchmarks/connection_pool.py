@@ -0,0 +1,74 @@
+"""
+Requests per second and latency percentiles of cheap read routes, where opening
+the database connection dominates, with and without connection reuse:
+
+    python -m benchmarks.connection_pool [--concurrency 16] [--duration 10]
+
+The ASGI application is served connecting per request and from the pool, the
+WSGI one connecting per request and with persistent connections (CONN_MAX_AGE).
+The response cache is disabled so every request hits the database.
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks import setup, benchmark_database, load, serve
+
+CONFIGURATIONS = {
+    "asgi connect per request": ("asgi3", {"DB_POOL_MAX_SIZE": "0", "DB_CONN_MAX_AGE": "0"}),
+    "asgi pooled": ("asgi3", {"DB_POOL_MAX_SIZE": "10"}),
+    "wsgi connect per request": ("wsgi", {"DB_POOL_MAX_SIZE": "0", "DB_CONN_MAX_AGE": "0"}),
+    "wsgi persistent": ("wsgi", {"DB_POOL_MAX_SIZE": "0", "DB_CONN_MAX_AGE": "60"}),
+}
+
+
+def seed():
+    from core.models import School, Teacher, Course, Student, Enrollment
+
+    school = School.objects.create(name="School", address="1 Main Street")
+    teacher = Teacher.objects.create(name="Teacher", school=school)
+    course = Course.objects.create(name="Course", location="Room 1", school=school, teacher=teacher)
+    student = Student.objects.create(name="Student", school=school)
+    Enrollment.objects.create(student=student, course=course, school=school)
+    return school.id, student.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+
+    results = []
+    with benchmark_database():
+        school_id, student_id = seed()
+        routes = {
+            "school stats": f"/api/schools/{school_id}/stats",
+            "retrieve student": f"/api/students/{student_id}",
+        }
+        for configuration, (interface, env) in CONFIGURATIONS.items():
+            env = {**env, "POSTGRES_DB": connection.settings_dict["NAME"], "RESPONSE_CACHE_ENABLED": "false"}
+            with serve(args.port, env=env, interface=interface):
+                for name, path in routes.items():
+                    asyncio.run(load(args.port, path, args.concurrency, 1))  # warm up
+                    result = {"route": name, "configuration": configuration, **asyncio.run(
+                        load(args.port, path, args.concurrency, args.duration)
+                    )}
+                    results.append(result)
+                    print(f"{name:<18} {configuration:<26} {result['rps']:>6} req/s  p50 {result['p50_ms']:>7} ms  "
+                          f"p99 {result['p99_ms']:>7} ms  {result['errors']} errors")
+        # The servers' connections must be gone before the database is dropped
+        connection.close()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"benchmark": "connection_pool", "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
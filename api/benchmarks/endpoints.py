@@ -0,0 +1,330 @@
+"""
+Throughput and latency percentiles of every route of new_app/urls.py (CRUD of
+each resource, stats, export, transfers, enrollments, search, the async reads and
+the pool stats), served by uvicorn from the ASGI application on a roster
+generated by `manage.py seed_benchmark`:
+
+    python -m benchmarks.endpoints [--schools 100] [--students-per-school 200] [--concurrency 16]
+        [--duration 5] [--only students] [--output results.json] [--compare previous.json]
+
+Each scenario runs for --duration seconds. The response cache is disabled unless
+--cache is given, so reads hit the database. The results are written as JSON with
+--output, and compared scenario by scenario with a previous run by --compare.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import subprocess
+from datetime import datetime, timezone
+from io import StringIO
+from urllib.parse import quote
+
+from benchmarks import setup, benchmark_database, load, serve
+
+RESOURCES = {
+    # Route prefix: (url name basename, model name)
+    "schools": ("school", "School"),
+    "admins": ("administrator", "Administrator"),
+    "teachers": ("teacher", "Teacher"),
+    "courses": ("course", "Course"),
+    "students": ("student", "Student"),
+}
+SAMPLE_SIZE = 10_000
+DELETE_POOL_SIZE = 20_000
+TRANSFER_BATCH = 10
+ENROLLMENT_BATCH = 10
+
+
+def sample_rows(queryset, fields):
+    return list(queryset.order_by("?").values("id", *fields)[:SAMPLE_SIZE])
+
+
+def body_of(prefix, row, name):
+    """
+    A valid create or update body for a resource, referencing the rows of `row`
+    """
+    if prefix == "schools":
+        return {"name": name, "address": "1 Benchmark Street"}
+    if prefix == "courses":
+        return {"name": name, "location": "Room 1", "school_id": row["school_id"], "teacher_id": row["teacher_id"]}
+    if prefix == "students":
+        return {"name": name, "school_id": row["school_id"], "course_ids": row["course_ids"]}
+    return {"name": name, "school_id": row["school_id"]}
+
+
+def create_delete_pool(prefix, model, rows):
+    """
+    Rows nothing references, created up front for the DELETE scenarios
+    """
+    from core.models import School, Enrollment
+
+    row = rows[0]
+    if prefix == "schools":
+        instances = [School(name="Deleted", address="-") for _ in range(DELETE_POOL_SIZE)]
+    else:
+        body = body_of(prefix, row, "Deleted")
+        course_ids = body.pop("course_ids", [])
+        instances = [model(**body) for _ in range(DELETE_POOL_SIZE)]
+    instances = model.objects.bulk_create(instances, batch_size=5000)
+    if prefix == "students":
+        # Deleted with their enrollments, like the students of the roster
+        Enrollment.objects.bulk_create([
+            Enrollment(student_id=instance.id, course_id=course_id, school_id=instance.school_id)
+            for instance in instances for course_id in course_ids
+        ], batch_size=5000)
+    return [instance.id for instance in instances]
+
+
+def scenarios(context):
+    """
+    Return (scenario, url name, requests) triples, `requests(client)` yields the
+    (method, path, body, headers) sent by the client of that index
+    """
+    def gets(*paths, headers=None):
+        def requests(client):
+            rng = random.Random(client)
+            while True:
+                yield "GET", rng.choice(paths), None, headers
+        return requests
+
+    def writes(method, prefix, pick):
+        def requests(client):
+            rng = random.Random(client)
+            while True:
+                row = rng.choice(context["rows"][prefix])
+                yield method, pick(row), body_of(prefix, row, f"Benchmark {rng.randrange(10 ** 6)}"), None
+        return requests
+
+    def deletes(prefix, concurrency):
+        def requests(client):
+            for pk in context["delete_pool"][prefix][client::concurrency]:
+                yield "DELETE", f"/api/{prefix}/{pk}", None, None
+        return requests
+
+    def transfers(batch):
+        def requests(client):
+            # Each client moves its own students back and forth between two courses
+            # of their school, so no transfer conflicts with another client's
+            students = context["transfer_students"][client::context["concurrency"]]
+            position = 0
+            while students:
+                moves = []
+                for _ in range(batch):
+                    student = students[position % len(students)]
+                    position += 1
+                    from_course, to_course = student["courses"]
+                    moves.append({"studentId": student["id"], "fromCourseId": from_course, "toCourseId": to_course})
+                    student["courses"] = (to_course, from_course)
+                if batch == 1:
+                    yield "POST", "/api/transfer", moves[0], None
+                else:
+                    yield "POST", "/api/transfers", moves, None
+        return requests
+
+    def enrollments():
+        def requests(client):
+            # Each client enrolls its own students in a course they don't take,
+            # then unenrolls them, so the enrollments never conflict
+            students = context["transfer_students"][client::context["concurrency"]]
+            for position in itertools.count(step=ENROLLMENT_BATCH):
+                pairs = [
+                    {"studentId": student["id"], "courseId": student["courses"][1]}
+                    for student in itertools.islice(itertools.cycle(students), position, position + ENROLLMENT_BATCH)
+                ]
+                yield "POST", "/api/enrollments", pairs, None
+                yield "DELETE", "/api/enrollments", pairs, None
+        return requests
+
+    school_ids = [row["id"] for row in context["rows"]["schools"]]
+    reads = [("api root", "api-root", gets("/api/"))]
+    for prefix, (basename, model) in RESOURCES.items():
+        detail_paths = [f"/api/{prefix}/{row['id']}" for row in context["rows"][prefix][:1000]]
+        reads += [
+            (f"list {prefix}", f"{basename}-list", gets(f"/api/{prefix}")),
+            (f"list {prefix} keyset", f"{basename}-list", gets(f"/api/{prefix}?cursor=&limit=25")),
+            (f"retrieve {prefix}", f"{basename}-detail", gets(*detail_paths)),
+            (f"async list {prefix}", f"async-{basename}-list", gets(f"/api/async/{prefix}")),
+            (
+                f"async retrieve {prefix}", f"async-{basename}-detail",
+                gets(*(path.replace("/api/", "/api/async/", 1) for path in detail_paths))
+            ),
+        ]
+    reads += [
+        ("school stats", "school-stats", gets(*(f"/api/schools/{pk}/stats" for pk in school_ids))),
+        ("async school stats", "async-school-stats", gets(*(f"/api/async/schools/{pk}/stats" for pk in school_ids))),
+        ("bulk school stats", "school-bulk-stats", gets(
+            f"/api/schools/stats?ids={','.join(map(str, school_ids[:50]))}"
+        )),
+        ("list students by school", "student-list", gets(*(f"/api/students?school={pk}" for pk in school_ids))),
+        ("list students by course", "student-list", gets(*(
+            f"/api/students?course={row['id']}" for row in context["rows"]["courses"][:1000]
+        ))),
+        ("list courses by teacher", "course-list", gets(*(
+            f"/api/courses?teacher={row['teacher_id']}" for row in context["rows"]["courses"][:1000]
+        ))),
+        ("list students by name prefix", "student-list", gets(*(
+            f"/api/students?name={quote(row['name'][:3])}&cursor=" for row in context["rows"]["students"][:1000]
+        ))),
+        ("search", "search", gets(*(
+            f"/api/search?q={quote(row['name'][:4])}" for row in context["rows"]["students"][:1000]
+        ))),
+        ("school roster", "school-roster", gets(*(f"/api/schools/{pk}/roster" for pk in school_ids))),
+        ("export school csv", "school-export", gets(*(f"/api/schools/{pk}/export?format=csv" for pk in school_ids))),
+        ("database pool stats", "db-pool", gets("/api/db-pool", headers={"Authorization": context["authorization"]})),
+    ]
+
+    writes_ = [
+        ("transfer", "transfer", transfers(1)),
+        ("batch transfers", "transfers", transfers(TRANSFER_BATCH)),
+        ("enroll and unenroll", "enrollments", enrollments()),
+    ]
+    for prefix, (basename, model) in RESOURCES.items():
+        writes_ += [
+            (f"create {prefix}", f"{basename}-list", writes("POST", prefix, lambda row, prefix=prefix: f"/api/{prefix}")),
+            (f"update {prefix}", f"{basename}-detail", writes(
+                "PUT", prefix, lambda row, prefix=prefix: f"/api/{prefix}/{row['id']}"
+            )),
+            (f"partial update {prefix}", f"{basename}-detail", writes(
+                "PATCH", prefix, lambda row, prefix=prefix: f"/api/{prefix}/{row['id']}"
+            )),
+        ]
+    # Last, as they use up rows created for them
+    deletes_ = [
+        (f"delete {prefix}", f"{basename}-detail", deletes(prefix, context["concurrency"]))
+        for prefix, (basename, model) in RESOURCES.items()
+    ]
+    return reads + writes_ + deletes_
+
+
+def prepare(args):
+    """
+    Seed the roster and collect the ids the scenarios request
+    """
+    from django.apps import apps
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+    from core.models import Enrollment, Student
+
+    call_command(
+        "seed_benchmark", schools=args.schools, students_per_school=args.students_per_school, stdout=StringIO()
+    )
+    context = {"concurrency": args.concurrency, "rows": {}, "delete_pool": {}}
+    fields = {
+        "schools": [], "admins": ["school_id"], "teachers": ["school_id"],
+        "courses": ["school_id", "teacher_id"], "students": ["name", "school_id", "course_ids"],
+    }
+    for prefix, (basename, model_name) in RESOURCES.items():
+        model = apps.get_model("core", model_name)
+        queryset = Student.objects.with_course_ids() if model is Student else model.objects.all()
+        context["rows"][prefix] = sample_rows(queryset, fields[prefix])
+    for prefix, (basename, model_name) in RESOURCES.items():
+        model = apps.get_model("core", model_name)
+        context["delete_pool"][prefix] = create_delete_pool(prefix, model, context["rows"][prefix])
+
+    # Students with one of their courses and a course of their school they don't take to alternate with
+    courses = {}
+    for school_id, course_id in Enrollment.objects.order_by().distinct().values_list("school_id", "course_id"):
+        courses.setdefault(school_id, []).append(course_id)
+    context["transfer_students"] = []
+    for row in context["rows"]["students"]:
+        other = [pk for pk in courses.get(row["school_id"], []) if pk not in row["course_ids"]]
+        if row["course_ids"] and other:
+            context["transfer_students"].append({"id": row["id"], "courses": (row["course_ids"][0], other[0])})
+
+    # A token rather than a password, whose hashing would dominate the request
+    token = Token.objects.create(user=User.objects.create_superuser("benchmark"))
+    context["authorization"] = f"Token {token.key}"
+    return context
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous_path):
+    with open(previous_path) as file:
+        previous = {result["scenario"]: result for result in json.load(file)["results"]}
+    print(f"\nCompared with {previous_path}:")
+    for result in results:
+        before = previous.get(result["scenario"])
+        if not before or not before["rps"] or not before["p99_ms"] or result["p99_ms"] is None:
+            continue
+        rps = (result["rps"] - before["rps"]) / before["rps"] * 100
+        p99 = (result["p99_ms"] - before["p99_ms"]) / before["p99_ms"] * 100
+        print(f"{result['scenario']:<30} req/s {rps:>+7.1f}%  p99 {p99:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schools", type=int, default=100)
+    parser.add_argument("--students-per-school", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--only", help="Only run the scenarios whose name contains this text")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Compare the results with the JSON output of a previous run")
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    from django.urls import get_resolver
+
+    results = []
+    started_at = datetime.now(timezone.utc).isoformat()
+    with benchmark_database():
+        context = prepare(args)
+        selected = [scenario for scenario in scenarios(context) if not args.only or args.only in scenario[0]]
+        routes = {name for name in get_resolver().reverse_dict if isinstance(name, str)}
+        missing = routes - {route for scenario, route, requests in scenarios(context)}
+        if missing:
+            print(f"Routes without a scenario: {', '.join(sorted(missing))}")
+
+        env = {
+            "POSTGRES_DB": connection.settings_dict["NAME"],
+            "RESPONSE_CACHE_ENABLED": "true" if args.cache else "false",
+        }
+        with serve(args.port, args.workers, env):
+            asyncio.run(load(args.port, "/api/schools", args.concurrency, 1))  # warm up
+            for scenario, route, requests in selected:
+                result = {"scenario": scenario, "route": route, **asyncio.run(
+                    load(args.port, requests, args.concurrency, args.duration)
+                )}
+                results.append(result)
+                print(f"{scenario:<30} {result['rps']:>6} req/s  p50 {result['p50_ms']} ms  "
+                      f"p99 {result['p99_ms']} ms  {result['errors']} errors")
+        # The server's connections must be gone before the database is dropped
+        connection.close()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "benchmark": "endpoints",
+                "started_at": started_at,
+                "revision": git_revision(),
+                "options": {
+                    "schools": args.schools,
+                    "students_per_school": args.students_per_school,
+                    "workers": args.workers,
+                    "concurrency": args.concurrency,
+                    "duration": args.duration,
+                    "cache": args.cache,
+                },
+                "results": results,
+            }, file, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Rows per second of `manage.py import_roster` for a generated roster, by default
+100 schools and 1M students:
+
+    python -m benchmarks.import_roster [--students 1000000] [--format csv|ndjson]
+"""
+import argparse
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from benchmarks import setup, benchmark_database, timed
+
+TEACHERS_PER_SCHOOL = 20
+ADMINS_PER_SCHOOL = 2
+COURSES_PER_SCHOOL = 40
+
+
+def write_file(directory, name, file_format, columns, rows):
+    path = os.path.join(directory, f"{name}.{file_format}")
+    with open(path, "w", newline="") as file:
+        if file_format == "csv":
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        else:
+            file.writelines(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+    return path
+
+
+def write_roster(directory, file_format, schools, students, suffix=""):
+    school_ids = [f"S{school}" for school in range(schools)]
+    return {
+        "schools": write_file(directory, "schools", file_format, ["external_id", "name", "address"], (
+            (school_id, f"School {school_id}", f"{school_id} Main Street") for school_id in school_ids
+        )),
+        "teachers": write_file(directory, "teachers", file_format, ["external_id", "name", "school_external_id"], (
+            (f"{school_id}-T{teacher}", f"Teacher {teacher}", school_id)
+            for school_id in school_ids for teacher in range(TEACHERS_PER_SCHOOL)
+        )),
+        "admins": write_file(directory, "admins", file_format, ["external_id", "name", "school_external_id"], (
+            (f"{school_id}-A{admin}", f"Admin {admin}", school_id)
+            for school_id in school_ids for admin in range(ADMINS_PER_SCHOOL)
+        )),
+        "courses": write_file(
+            directory, "courses", file_format,
+            ["external_id", "name", "location", "school_external_id", "teacher_external_id"], (
+                (f"{school_id}-C{course}", f"Course {course}", f"Room {course}", school_id,
+                 f"{school_id}-T{course % TEACHERS_PER_SCHOOL}")
+                for school_id in school_ids for course in range(COURSES_PER_SCHOOL)
+            )
+        ),
+        "students": write_file(
+            directory, f"students{suffix}", file_format,
+            ["external_id", "name", "school_external_id", "course_external_id"], (
+                (f"P{student}", f"Student {student}{suffix}", school_ids[student % schools],
+                 f"{school_ids[student % schools]}-C{student // schools % COURSES_PER_SCHOOL}")
+                for student in range(students)
+            )
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schools", type=int, default=100)
+    parser.add_argument("--students", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    setup()
+    from django.core.management import call_command
+
+    def import_roster(**files):
+        call_command("import_roster", stdout=StringIO(), verbosity=0, **files)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory, benchmark_database():
+        files = write_roster(directory, args.format, args.schools, args.students)
+        renamed = write_roster(directory, args.format, args.schools, args.students, suffix="-renamed")["students"]
+        students = files.pop("students")
+
+        import_roster(**files)
+        with timed(results, "insert students", args.students):
+            import_roster(students=students)
+        with timed(results, "upsert unchanged students", args.students):
+            import_roster(students=students, upsert=True)
+        with timed(results, "upsert renamed students", args.students):
+            import_roster(students=renamed, upsert=True)
+        with timed(results, "dry run students", args.students):
+            import_roster(students=renamed, upsert=True, dry_run=True)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"benchmark": "import_roster", "format": args.format, "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Time to render and parse the JSON of realistic core payloads, pages of 25 and
+1000 rows of each resource, a school roster, search results and a bulk create
+body, with DRF's JSONRenderer and JSONParser against core.fastjson:
+
+    python -m benchmarks.json_codec [--schools 20] [--students-per-school 500] [--repeat 200]
+
+The payloads are the `response.data` of real requests on a roster generated by
+`manage.py seed_benchmark`, and every rendering is checked to be the same bytes.
+"""
+import argparse
+import io
+import json
+import time
+from io import StringIO
+
+from benchmarks import setup, benchmark_database
+
+
+def best_time(function, repeat):
+    """
+    The fastest of `repeat` runs in microseconds, the least disturbed by the rest of the machine
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6
+
+
+def payloads():
+    from rest_framework.test import APIClient
+    from core.models import School, Student
+
+    client = APIClient()
+    school_id = School.objects.order_by("id").values_list("id", flat=True).first()
+    paths = {
+        f"{resource} page of {limit}": f"/api/{resource}?cursor=&limit={limit}"
+        for resource in ("schools", "courses", "teachers", "students") for limit in (25, 1000)
+    }
+    paths.update({"school roster": f"/api/schools/{school_id}/roster?limit=100", "search": "/api/search?q=ol&limit=100"})
+    data = {name: client.get(path).data for name, path in paths.items()}
+    students = Student.objects.values("name", "school_id")[:1000]
+    body = json.dumps([{"name": row["name"], "school_id": row["school_id"]} for row in students]).encode()
+    return data, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schools", type=int, default=20)
+    parser.add_argument("--students-per-school", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    setup()
+    from django.core.management import call_command
+    from django.test import override_settings
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from core import fastjson
+
+    results = []
+    with benchmark_database(), override_settings(RESPONSE_CACHE_ENABLED=False, ALLOWED_HOSTS=["*"]):
+        call_command(
+            "seed_benchmark", schools=args.schools, students_per_school=args.students_per_school, stdout=StringIO()
+        )
+        data, body = payloads()
+
+    print(f"orjson {'installed' if fastjson.orjson else 'not installed, core.fastjson falls back to the stdlib'}")
+    cases = [
+        (f"render {name}", payload, lambda payload, renderer: renderer.render(payload))
+        for name, payload in data.items()
+    ] + [("parse bulk create of 1000", body, lambda payload, parser: parser.parse(io.BytesIO(payload)))]
+    for name, payload, run in cases:
+        if name.startswith("render"):
+            baseline, fast = JSONRenderer(), fastjson.FastJSONRenderer()
+            assert run(payload, fast) == run(payload, baseline), f"{name} renders different bytes"
+            size = len(run(payload, baseline))
+        else:
+            baseline, fast = JSONParser(), fastjson.FastJSONParser()
+            size = len(payload)
+        drf = best_time(lambda: run(payload, baseline), args.repeat)
+        core = best_time(lambda: run(payload, fast), args.repeat)
+        results.append({"name": name, "bytes": size, "drf_us": round(drf, 1), "fast_us": round(core, 1)})
+        print(f"{name:<30} {size:>9,} bytes  drf {drf:>9.1f} us  fast {core:>9.1f} us  {drf / core:>5.1f}x")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"benchmark": "json_codec", "orjson": fastjson.orjson is not None, "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Latency percentiles of `GET /api/search` on a roster generated by
+`manage.py seed_benchmark`, by default 1000 schools and 1M students, from one
+letter typed up to full names, with and without a school:
+
+    python -m benchmarks.search [--schools 1000] [--students-per-school 1000]
+        [--concurrency 1] [--duration 5] [--target-ms 50]
+
+The generated names share a few first and last names, so every prefix matches
+tens of thousands of rows: the worst case for the index. One client by default,
+so the percentiles are the latency of a search rather than the time spent
+queued, and the queries whose p99 is over --target-ms are reported.
+"""
+import argparse
+import asyncio
+import json
+from io import StringIO
+from urllib.parse import urlencode
+
+from benchmarks import setup, benchmark_database, load, serve
+
+QUERIES = ["o", "ol", "oli", "olivia", "olivia sm", "olivia smith", "smith ol", "zzz"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schools", type=int, default=1000)
+    parser.add_argument("--students-per-school", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--target-ms", type=float, default=50, help="p99 latency target of every query")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    setup()
+    from django.core.management import call_command
+    from django.db import connection
+    from core.models import School
+
+    results = []
+    with benchmark_database():
+        call_command(
+            "seed_benchmark", schools=args.schools, students_per_school=args.students_per_school, stdout=StringIO()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        school_id = School.objects.order_by("id").values_list("id", flat=True).first()
+        env = {"POSTGRES_DB": connection.settings_dict["NAME"], "RESPONSE_CACHE_ENABLED": "false"}
+        with serve(args.port, args.workers, env):
+            for text in QUERIES:
+                for school in (None, school_id):
+                    params = {"q": text} if school is None else {"q": text, "school": school}
+                    path = f"/api/search?{urlencode(params)}"
+                    asyncio.run(load(args.port, path, args.concurrency, 1))  # warm up
+                    result = {"query": text, "school": school, **asyncio.run(
+                        load(args.port, path, args.concurrency, args.duration)
+                    )}
+                    result["over_target"] = result["p99_ms"] is None or result["p99_ms"] > args.target_ms
+                    results.append(result)
+                    name = text if school is None else f"{text} (one school)"
+                    print(f"{name:<26} {result['rps']:>6} req/s  p50 {result['p50_ms']:>7} ms  "
+                          f"p99 {result['p99_ms']:>7} ms  {result['errors']} errors"
+                          f"{'  OVER TARGET' if result['over_target'] else ''}")
+        connection.close()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"benchmark": "search", "target_ms": args.target_ms, "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Payload size, throughput and latency percentiles of pages of 1000 rows with
+every field against the same pages narrowed by `?fields=` or `?exclude=`, on a
+roster generated by `manage.py seed_benchmark`:
+
+    python -m benchmarks.sparse_fields [--schools 50] [--students-per-school 1000]
+        [--concurrency 4] [--duration 5]
+
+The response cache is disabled so every request hits the database.
+"""
+import argparse
+import asyncio
+import json
+from io import StringIO
+from urllib.request import urlopen
+
+from benchmarks import setup, benchmark_database, load, serve
+
+PAGE = "cursor=&limit=1000"
+ROUTES = [
+    # (resource, full page, narrowed page)
+    ("schools", f"/api/schools?{PAGE}", f"/api/schools?{PAGE}&exclude=address"),
+    ("teachers", f"/api/teachers?{PAGE}", f"/api/teachers?{PAGE}&fields=name"),
+    ("courses", f"/api/courses?{PAGE}", f"/api/courses?{PAGE}&fields=name,teacher_id"),
+    ("students", f"/api/students?{PAGE}", f"/api/students?{PAGE}&fields=name"),
+    (
+        "students by school", f"/api/students?{PAGE}&school={{school_id}}",
+        f"/api/students?{PAGE}&school={{school_id}}&fields=name,school_id",
+    ),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schools", type=int, default=50)
+    parser.add_argument("--students-per-school", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    setup()
+    from django.core.management import call_command
+    from django.db import connection
+    from core.models import School
+
+    results = []
+    with benchmark_database():
+        call_command(
+            "seed_benchmark", schools=args.schools, students_per_school=args.students_per_school, stdout=StringIO()
+        )
+        school_id = School.objects.order_by("id").values_list("id", flat=True).first()
+        env = {"POSTGRES_DB": connection.settings_dict["NAME"], "RESPONSE_CACHE_ENABLED": "false"}
+        with serve(args.port, args.workers, env):
+            for resource, *paths in ROUTES:
+                for variant, path in zip(("full", "sparse"), paths):
+                    path = path.format(school_id=school_id)
+                    with urlopen(f"http://localhost:{args.port}{path}") as response:
+                        size = len(response.read())
+                    asyncio.run(load(args.port, path, args.concurrency, 1))  # warm up
+                    result = {"resource": resource, "variant": variant, "path": path, "bytes": size, **asyncio.run(
+                        load(args.port, path, args.concurrency, args.duration)
+                    )}
+                    results.append(result)
+                    print(f"{resource:<20} {variant:<7} {size:>9,} bytes {result['rps']:>6} req/s  "
+                          f"p50 {result['p50_ms']:>7} ms  p99 {result['p99_ms']:>7} ms  {result['errors']} errors")
+        connection.close()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"benchmark": "sparse_fields", "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
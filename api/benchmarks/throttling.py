@@ -0,0 +1,106 @@
+"""
+Overhead of the rate limits and in-flight caps of core.throttling, with the
+cache configured by THROTTLE_CACHE_BACKEND and THROTTLE_CACHE_LOCATION:
+
+    python -m benchmarks.throttling [--iterations 20000] [--concurrency 4] [--duration 5]
+
+First the work added to each request, the client and endpoint token buckets
+plus taking and releasing an in-flight slot, is timed in process. Then stats
+and list routes are served with throttling off and on, with rates no request
+reaches, and with a rate every request is over, to time the 429s.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from io import StringIO
+
+from benchmarks import setup, benchmark_database, load, serve
+
+UNREACHABLE = {
+    "THROTTLE_CLIENT_RATE": "1000000/s", "THROTTLE_STATS_RATE": "1000000/s", "IN_FLIGHT_STATS_LIMIT": "1000",
+}
+ROUTES = [
+    ("stats", "/api/schools/{school_id}/stats"),
+    ("async stats", "/api/async/schools/{school_id}/stats"),
+    ("students", "/api/students?cursor=&limit=25&school={school_id}"),
+]
+
+
+def throttle_overhead(iterations):
+    """
+    Median and 99th percentile in microseconds of the throttling of one request
+    """
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.request import Request
+    from core.throttling import ClientRateThrottle, EndpointRateThrottle, acquire_in_flight, release_in_flight, \
+        throttle_cache
+
+    class View:
+        throttle_scope = "stats"
+
+    request, view = Request(APIRequestFactory().get("/api/schools/1/stats")), View()
+    rates = {"client": "1000000/s", "stats": "1000000/s"}
+    timings = []
+    throttle_cache().clear()
+    with override_settings(REST_FRAMEWORK={"DEFAULT_THROTTLE_RATES": rates}, IN_FLIGHT_LIMITS={"stats": 1000}):
+        for _ in range(iterations):
+            started = time.perf_counter()
+            assert all(throttle().allow_request(request, view) for throttle in (ClientRateThrottle, EndpointRateThrottle))
+            key = acquire_in_flight(view.throttle_scope)
+            release_in_flight(key)
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    return round(statistics.median(timings) * 1e6, 1), round(timings[int(len(timings) * 0.99)] * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    setup()
+    from django.core.management import call_command
+    from django.db import connection
+    from core.models import School
+
+    p50, p99 = throttle_overhead(args.iterations)
+    print(f"throttling of one request: p50 {p50} us  p99 {p99} us")
+    results = {"overhead_us": {"p50": p50, "p99": p99}, "routes": []}
+
+    with benchmark_database():
+        call_command("seed_benchmark", schools=5, students_per_school=200, stdout=StringIO())
+        school_id = School.objects.order_by("id").values_list("id", flat=True).first()
+        base = {"POSTGRES_DB": connection.settings_dict["NAME"], "RESPONSE_CACHE_ENABLED": "false"}
+        variants = [
+            ("off", {"THROTTLE_ENABLED": "false"}),
+            ("on", {"THROTTLE_ENABLED": "true", **UNREACHABLE}),
+            ("429", {"THROTTLE_ENABLED": "true", "THROTTLE_CLIENT_RATE": "1/hour"}),
+        ]
+        for variant, env in variants:
+            with serve(args.port, args.workers, {**base, **env}):
+                for name, path in ROUTES:
+                    path = path.format(school_id=school_id)
+                    asyncio.run(load(args.port, path, args.concurrency, 1))  # warm up
+                    result = {"route": name, "throttling": variant, **asyncio.run(
+                        load(args.port, path, args.concurrency, args.duration)
+                    )}
+                    results["routes"].append(result)
+                    print(f"{name:<12} {variant:<4} {result['rps']:>6} req/s  p50 {result['p50_ms']:>6} ms  "
+                          f"p99 {result['p99_ms']:>6} ms  {result['errors']} errors")
+        connection.close()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"benchmark": "throttling", **results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
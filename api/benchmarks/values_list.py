@@ -0,0 +1,81 @@
+"""
+Throughput and latency percentiles of large list pages rendered by the
+serializers against the values_list() path of core.values, on a roster
+generated by `manage.py seed_benchmark`:
+
+    python -m benchmarks.values_list [--schools 50] [--students-per-school 1000]
+        [--concurrency 4] [--duration 5]
+
+The server is started once with VALUES_LIST_ENABLED=false and once with it
+enabled, with the response cache disabled so every request hits the database,
+and every page is checked to be the same JSON on both.
+"""
+import argparse
+import asyncio
+import json
+from io import StringIO
+from urllib.request import urlopen
+
+from benchmarks import setup, benchmark_database, load, serve
+
+PAGE = "cursor=&limit=1000"
+ROUTES = [
+    ("students", f"/api/students?{PAGE}"),
+    ("students by school", f"/api/students?{PAGE}&school={{school_id}}"),
+    ("students names", f"/api/students?{PAGE}&fields=name"),
+    ("courses", f"/api/courses?{PAGE}"),
+    ("teachers", f"/api/teachers?{PAGE}"),
+    ("admins", f"/api/admins?{PAGE}"),
+    ("students async", f"/api/async/students?{PAGE}"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schools", type=int, default=50)
+    parser.add_argument("--students-per-school", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    setup()
+    from django.core.management import call_command
+    from django.db import connection
+    from core.models import School
+
+    results, pages = [], {}
+    with benchmark_database():
+        call_command(
+            "seed_benchmark", schools=args.schools, students_per_school=args.students_per_school, stdout=StringIO()
+        )
+        school_id = School.objects.order_by("id").values_list("id", flat=True).first()
+        for variant, enabled in (("serializer", "false"), ("values", "true")):
+            env = {
+                "POSTGRES_DB": connection.settings_dict["NAME"], "RESPONSE_CACHE_ENABLED": "false",
+                "VALUES_LIST_ENABLED": enabled,
+            }
+            with serve(args.port, args.workers, env):
+                for resource, path in ROUTES:
+                    path = path.format(school_id=school_id)
+                    with urlopen(f"http://localhost:{args.port}{path}") as response:
+                        page = json.loads(response.read())
+                    assert pages.setdefault(resource, page) == page, f"{resource} differs on the {variant} path"
+                    asyncio.run(load(args.port, path, args.concurrency, 1))  # warm up
+                    result = {"resource": resource, "variant": variant, "path": path, **asyncio.run(
+                        load(args.port, path, args.concurrency, args.duration)
+                    )}
+                    results.append(result)
+                    print(f"{resource:<20} {variant:<11} {result['rps']:>6} req/s  "
+                          f"p50 {result['p50_ms']:>7} ms  p99 {result['p99_ms']:>7} ms  {result['errors']} errors")
+        connection.close()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"benchmark": "values_list", "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,185 @@
 from django.apps import apps
+from django import forms
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils.functional import cached_property
 
+from core.cache import invalidate_schools, school_id_of
+from core.models import School, SchoolStats, Course, Administrator, Teacher, Student, Enrollment
 
-models = apps.get_models()
+# Unfiltered changelists of tables the planner estimates above this many rows
+# show the estimate instead of running a COUNT(*) over the whole table
+ESTIMATED_COUNT_THRESHOLD = 100_000
 
 
-for model in models:
+def estimated_count(model, using):
+    """
+    The planner's row estimate of the model's table, kept up to date by
+    autovacuum, or -1 when the table was never analyzed
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row else -1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts the unfiltered changelist of a large table from the planner's
+    estimate. Filtered and searched ones are counted exactly, each filter
+    being served by an index.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate > ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class SchoolListFilter(admin.RelatedFieldListFilter):
+    """
+    The schools as choices, loading only the id and name the labels are made of
+    """
+
+    def field_choices(self, field, request, model_admin):
+        return list(School.objects.order_by("name", "id").values_list("id", "name"))
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelists paginated without a COUNT(*) of the whole table. Saves and
+    deletes start a new response cache generation for the schools of the rows,
+    as the writes of the viewsets do, and like their deletes bump the students
+    whose enrollments are cascaded, through `cascaded_enrollments`.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    cascaded_enrollments = None
+
+    def save_model(self, request, obj, form, change):
+        # The school the row moved away from, if it did
+        previous_school_id = form.initial.get("school")
+        super().save_model(request, obj, form, change)
+        invalidate_schools([school_id_of(obj)] + ([previous_school_id] if previous_school_id else []))
+
+    def delete_model(self, request, obj):
+        school_id = school_id_of(obj)
+        with transaction.atomic():
+            if self.cascaded_enrollments:
+                Enrollment.objects.filter(**{self.cascaded_enrollments: obj}).touch_students()
+            super().delete_model(request, obj)
+        invalidate_schools([school_id])
+
+    def delete_queryset(self, request, queryset):
+        school_ids = list(queryset.values_list("pk" if queryset.model is School else "school_id", flat=True))
+        with transaction.atomic():
+            if self.cascaded_enrollments:
+                Enrollment.objects.filter(**{f"{self.cascaded_enrollments}__in": queryset}).touch_students()
+            super().delete_queryset(request, queryset)
+        invalidate_schools(school_ids)
+
+
+class CoreModelAdmin(LargeTableAdmin):
+    """
+    Searched by name prefix or id: a case sensitive LIKE 'prefix%' served by
+    the `<model>_name_prefix_idx` pattern ops index, rather than the default
+    `UPPER(name) LIKE '%term%'` which scans the table. The whole term is one
+    prefix, so "Ava Ok" finds "Ava Okafor".
+    """
+    search_fields = ["name__startswith"]
+    search_help_text = "Start of the name, or id"
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(pk=search_term), False
+        return queryset.filter(name__startswith=search_term), False
+
+
+@admin.register(School)
+class SchoolAdmin(CoreModelAdmin):
+    list_display = ["id", "name", "address", "updated_at"]
+
+
+@admin.register(SchoolStats)
+class SchoolStatsAdmin(LargeTableAdmin):
+    list_display = ["school", "courses", "admins", "teachers", "students", "enrollments"]
+    list_select_related = ["school"]
+    raw_id_fields = ["school"]
+
+
+class SchoolMemberAdmin(CoreModelAdmin):
+    """
+    Rows listed with their school joined, filtered by school through the
+    `<model>_school_...` indexes, and edited with a school autocomplete
+    """
+    list_display = ["id", "name", "school", "updated_at"]
+    list_select_related = ["school"]
+    list_filter = [("school", SchoolListFilter)]
+    autocomplete_fields = ["school"]
+
+
+@admin.register(Administrator)
+class AdministratorAdmin(SchoolMemberAdmin):
+    pass
+
+
+@admin.register(Teacher)
+class TeacherAdmin(SchoolMemberAdmin):
+    cascaded_enrollments = "course__teacher"
+
+
+class CourseAdminForm(forms.ModelForm):
+    """
+    A course, which can only move to another school while nobody is enrolled in
+    it, as in CourseSerializer
+    """
+
+    def clean(self):
+        cleaned_data = super().clean()
+        school = cleaned_data.get("school")
+        if self.instance.pk is not None and school is not None and school.pk != self.instance.school_id:
+            # FOR UPDATE blocks the enrollments inserted concurrently until the move commits
+            list(Course.objects.filter(pk=self.instance.pk).select_for_update().values_list("pk", flat=True))
+            if self.instance.enrollments.exists():
+                self.add_error("school", "A course with enrolled students can't move to another school.")
+        return cleaned_data
+
+
+@admin.register(Course)
+class CourseAdmin(SchoolMemberAdmin):
+    form = CourseAdminForm
+    list_display = ["id", "name", "location", "school", "teacher", "updated_at"]
+    list_select_related = ["school", "teacher"]
+    autocomplete_fields = ["school", "teacher"]
+    cascaded_enrollments = "course"
+
+
+@admin.register(Student)
+class StudentAdmin(SchoolMemberAdmin):
+    # Walks student_name_idx, or student_school_name_idx filtered by school
+    ordering = ["name", "id"]
+
+
+@admin.register(Enrollment)
+class EnrollmentAdmin(LargeTableAdmin):
+    list_display = ["id", "student", "course", "school", "created_at"]
+    list_select_related = ["student", "course", "school"]
+    list_filter = [("school", SchoolListFilter)]
+    raw_id_fields = ["student", "course"]
+    autocomplete_fields = ["school"]
+
+
+# The models of the other apps keep a default ModelAdmin
+for model in apps.get_models():
     try:
         admin.site.register(model)
     except admin.sites.AlreadyRegistered:
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,180 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+GLOBAL_GENERATION_KEY = "core:generation"
+SCHOOL_GENERATION_KEY = "core:generation:school:{}"
+METRICS_KEY = "core:metrics:{}:{}"
+CACHED_HEADERS = ("ETag", "Last-Modified")
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def get_generations(keys):
+    """
+    Return the current generation of each key, starting a new one for the keys
+    the cache doesn't know yet (never cached or evicted)
+    """
+    cache = response_cache()
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def invalidate_schools(school_ids):
+    """
+    Start a new generation for the given schools and for the unscoped responses,
+    which orphans every cached response keyed on the previous ones in O(1).
+    Inside a transaction the generations are started again once it commits, as
+    a concurrent request could have cached the rows it didn't see yet under the
+    first ones.
+    """
+    keys = [GLOBAL_GENERATION_KEY] + [SCHOOL_GENERATION_KEY.format(school_id) for school_id in set(school_ids)]
+
+    def start_generation():
+        generation = time.time_ns()
+        response_cache().set_many({key: generation for key in keys}, timeout=None)
+
+    start_generation()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(start_generation)
+
+
+def school_id_of(instance):
+    from core.models import School
+
+    return instance.pk if isinstance(instance, School) else instance.school_id
+
+
+def record_metric(view_name, outcome):
+    cache = response_cache()
+    key = METRICS_KEY.format(view_name, outcome)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+
+def cached_view_names():
+    """
+    The `<basename>-<action>` names the cached views of the API record their
+    metrics under
+    """
+    from new_app.urls import api_router
+
+    return [
+        f"{basename}-{name}"
+        for prefix, viewset, basename in api_router.registry
+        for name in dir(viewset)
+        if getattr(getattr(viewset, name, None), "cached_response", False)
+    ]
+
+
+def get_metrics(view_names):
+    cache = response_cache()
+    keys = {(name, outcome): METRICS_KEY.format(name, outcome) for name in view_names for outcome in ("hit", "miss")}
+    values = cache.get_many(keys.values())
+    return {
+        name: {outcome: values.get(keys[name, outcome], 0) for outcome in ("hit", "miss")}
+        for name in view_names
+    }
+
+
+def cached_response(school_ids=None):
+    """
+    Cache the data and validators of successful GET responses of a view method,
+    answering conditional requests from them on hits. Responses are
+    keyed by the generation of the schools returned by `school_ids(request, kwargs)`,
+    or by the global generation when it is not given or returns None. Views opt
+    out by setting `cache_responses = False`.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if not (settings.RESPONSE_CACHE_ENABLED and getattr(view, "cache_responses", True)):
+                return method(view, request, *args, **kwargs)
+
+            view_name = f"{view.basename}-{view.action}"
+            scope = school_ids(request, kwargs) if school_ids else None
+            generation_keys = [GLOBAL_GENERATION_KEY] if scope is None else \
+                [SCHOOL_GENERATION_KEY.format(school_id) for school_id in scope]
+            generations = ":".join(str(generation) for generation in get_generations(generation_keys))
+            fingerprint = hashlib.md5(
+                f"{request.get_full_path()}|{request.accepted_media_type}".encode()
+            ).hexdigest()
+            key = f"core:response:{view_name}:{generations}:{fingerprint}"
+
+            cache = response_cache()
+            cached = cache.get(key)
+            if cached is not None:
+                record_metric(view_name, "hit")
+                response = get_conditional_response(
+                    request._request,
+                    etag=cached["headers"].get("ETag"),
+                    last_modified=parse_http_date_safe(cached["headers"].get("Last-Modified"))
+                ) or Response(cached["data"])
+                for header, value in cached["headers"].items():
+                    response[header] = value
+                response["X-Cache"] = "HIT"
+                return response
+
+            record_metric(view_name, "miss")
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, {
+                    "data": response.data,
+                    "headers": {header: response[header] for header in CACHED_HEADERS if header in response},
+                }, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+            response["X-Cache"] = "MISS"
+            return response
+        wrapper.cached_response = True
+        return wrapper
+    return decorator
+
+
+def school_pk(request, kwargs):
+    try:
+        return [int(kwargs["pk"])]
+    except ValueError:
+        return []
+
+
+class CachedResponseMixin:
+    """
+    Caches list and retrieve responses and starts a new generation for the
+    schools touched by every write going through the viewset
+    """
+    cache_responses = True
+
+    @cached_response()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        # The school it moves to is invalidated by the post_save signal
+        previous_school_id = school_id_of(serializer.instance)
+        super().perform_update(serializer)
+        invalidate_schools([previous_school_id])
+
+    def perform_destroy(self, instance):
+        school_id = school_id_of(instance)
+        super().perform_destroy(instance)
+        invalidate_schools([school_id])
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core import checks
+
+# Backends keeping their entries in the memory of each process
+PER_PROCESS_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@checks.register(checks.Tags.caches)
+def check_throttle_cache(app_configs, **kwargs):
+    """
+    The rate limits and in-flight caps only hold across the WEB_CONCURRENCY
+    workers when their cache is shared: with a per process one each worker
+    lets a client through at the full rate and cap
+    """
+    backend = settings.CACHES[settings.THROTTLE_CACHE]["BACKEND"]
+    if not settings.THROTTLE_ENABLED or settings.WEB_CONCURRENCY <= 1 or backend not in PER_PROCESS_CACHES:
+        return []
+    return [checks.Error(
+        f"The throttle cache {settings.THROTTLE_CACHE!r} uses {backend}, which isn't shared by the "
+        f"{settings.WEB_CONCURRENCY} workers of WEB_CONCURRENCY.",
+        hint="Set THROTTLE_CACHE_LOCATION to a Redis URL, or THROTTLE_CACHE_BACKEND to a shared backend.",
+        id="core.E001",
+    )]
+
+
+@checks.register(checks.Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    """
+    The cache generations are only started again in the worker that wrote, so
+    with a per process response cache the other workers keep serving the
+    responses they cached before the write until RESPONSE_CACHE_TIMEOUT
+    """
+    backend = settings.CACHES[settings.RESPONSE_CACHE_ALIAS]["BACKEND"]
+    # A dummy cache never serves a cached response, stale or not
+    if not settings.RESPONSE_CACHE_ENABLED or settings.WEB_CONCURRENCY <= 1 or \
+            backend not in PER_PROCESS_CACHES or backend == "django.core.cache.backends.dummy.DummyCache":
+        return []
+    return [checks.Error(
+        f"The response cache {settings.RESPONSE_CACHE_ALIAS!r} uses {backend}, which isn't shared by the "
+        f"{settings.WEB_CONCURRENCY} workers of WEB_CONCURRENCY.",
+        hint="Set CACHE_BACKEND and CACHE_LOCATION to a shared backend such as Redis, "
+             "or RESPONSE_CACHE_ENABLED to false.",
+        id="core.E002",
+    )]
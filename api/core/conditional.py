@@ -0,0 +1,169 @@
+import hashlib
+from functools import wraps
+
+from django.db import transaction
+from django.http import Http404
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import status
+
+from core.models import Enrollment
+
+CONDITIONAL_HEADERS = ("HTTP_IF_MATCH", "HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE", "HTTP_IF_UNMODIFIED_SINCE")
+
+
+def is_conditional(request):
+    return any(header in request.META for header in CONDITIONAL_HEADERS)
+
+
+def make_etag(request, version):
+    return quote_etag(hashlib.md5(f"{version}|{request.accepted_media_type}".encode()).hexdigest())
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+
+
+def check_preconditions(request, etag, last_modified=None):
+    """
+    Return the 304 or 412 response the request's conditional headers call for,
+    or None when it should be processed
+    """
+    response = get_conditional_response(
+        request._request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified is not None else None
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def conditional_response(version_of_response, lookup_version=None):
+    """
+    Emit an ETag (and Last-Modified when known) on successful responses of a
+    view method and answer conditional requests. `lookup_version(view, request,
+    kwargs)` cheaply reads the current version so a 304 is sent without running
+    the handler; without it, or when it returns None, the handler runs and the
+    version of its response is compared instead.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            conditional = is_conditional(request)
+            if conditional and lookup_version is not None:
+                current = lookup_version(view, request, kwargs)
+                if current is not None:
+                    version, last_modified = current
+                    not_modified = check_preconditions(request, make_etag(request, version), last_modified)
+                    if not_modified is not None:
+                        return not_modified
+
+            response = method(view, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            version, last_modified = version_of_response(view, response)
+            etag = make_etag(request, version)
+            if conditional:
+                not_modified = check_preconditions(request, etag, last_modified)
+                if not_modified is not None:
+                    return not_modified
+            set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
+
+
+def object_version(obj):
+    return f"{obj.pk}:{obj.updated_at.isoformat()}", obj.updated_at
+
+
+def lookup_object_version(view, request, kwargs, lock=False):
+    queryset = view.get_queryset()
+    if lock:
+        queryset = queryset.select_for_update()
+    try:
+        updated_at = queryset.filter(pk=kwargs[view.lookup_field]).values_list("updated_at", flat=True).first()
+    except (TypeError, ValueError):
+        return None
+    if updated_at is None:
+        return None
+    return f"{kwargs[view.lookup_field]}:{updated_at.isoformat()}", updated_at
+
+
+def page_version(view, rows):
+    """
+    Version of a page: the id and updated_at of its rows plus the pagination
+    state (count, links). Last-Modified is left out as it can't reflect deletes.
+    """
+    state = dict(view.paginator.get_paginated_response([]).data)
+    del state["results"]
+    rows = ",".join(f"{row.pk}:{row.updated_at.isoformat()}" for row in rows)
+    return f"{sorted(state.items())}|{rows}", None
+
+
+def lookup_page_version(view, request, kwargs):
+    queryset = view.filter_queryset(view.get_queryset())
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    # Load only what identifies the page and its rows
+    rows = view.paginate_queryset(queryset.only("updated_at", *(field.lstrip("-") for field in ordering)))
+    return page_version(view, rows)
+
+
+def data_version(view, response):
+    return repr(response.data), None
+
+
+class ConditionalResponseMixin:
+    """
+    ETag and Last-Modified support from the `updated_at` columns: conditional
+    GETs are answered with a 304 from a narrow query without serializing the
+    payload, and PUT/PATCH honour If-Match and If-Unmodified-Since.
+    `cascaded_enrollments` is the lookup from the enrollments to the rows whose
+    deletion cascades to them, the students of which are bumped on delete.
+    """
+    cascaded_enrollments = None
+
+    def get_object(self):
+        self.object = super().get_object()
+        return self.object
+
+    def paginate_queryset(self, queryset):
+        self.page = super().paginate_queryset(queryset)
+        return self.page
+
+    @conditional_response(lambda view, response: page_version(view, view.page), lookup_page_version)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response(lambda view, response: object_version(view.object), lookup_object_version)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        if not is_conditional(request):
+            response = super().update(request, *args, **kwargs)
+        else:
+            with transaction.atomic():
+                # Lock the row so it can't change between the check and the update
+                current = lookup_object_version(self, request, kwargs, lock=True)
+                if current is None:
+                    raise Http404
+                version, last_modified = current
+                failed = check_preconditions(request, make_etag(request, version), last_modified)
+                if failed is not None:
+                    return failed
+                response = super().update(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            version, last_modified = object_version(self.object)
+            set_validators(response, make_etag(request, version), last_modified)
+        return response
+
+    def perform_destroy(self, instance):
+        if self.cascaded_enrollments is None:
+            return super().perform_destroy(instance)
+        with transaction.atomic():
+            Enrollment.objects.filter(**{self.cascaded_enrollments: instance}).touch_students()
+            super().perform_destroy(instance)
@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from rest_framework.renderers import BaseRenderer
+
+from core.models import Course, Administrator, Teacher, Student, Enrollment
+
+EXPORT_COLUMNS = ("entity", "id", "name", "school_id", "student_id", "course_id", "teacher_id", "location")
+
+# Entity name: (model, exported columns, ordering). Students are read in the
+# order of the (school, name, id) index and enrollments in that of (school, id),
+# the other tables are small per school.
+EXPORT_ENTITIES = {
+    "students": (Student, ("id", "name", "school_id"), ("name", "id")),
+    "enrollments": (Enrollment, ("id", "school_id", "student_id", "course_id"), ("id",)),
+    "teachers": (Teacher, ("id", "name", "school_id"), ("id",)),
+    "courses": (Course, ("id", "name", "school_id", "teacher_id", "location"), ("id",)),
+    "admins": (Administrator, ("id", "name", "school_id"), ("id",)),
+}
+
+GZIP_RE = re.compile(r"\bgzip\b")
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Export rows are streamed by the view, only error responses go through render()
+    """
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(("field", "message"))
+        for field, messages in (data or {}).items():
+            for message in messages if isinstance(messages, list) else [messages]:
+                writer.writerow((field, message))
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return (json.dumps(data) + "\n").encode(self.charset)
+
+
+def export_rows(school_id, entities, chunk_size):
+    """
+    Yield the rows of the given entities of a school as tuples of EXPORT_COLUMNS,
+    reading each table through a server-side cursor `chunk_size` rows at a time
+    """
+    for entity in entities:
+        model, fields, ordering = EXPORT_ENTITIES[entity]
+        rows = model.objects.filter(school_id=school_id).order_by(*ordering) \
+            .values_list(*fields).iterator(chunk_size=chunk_size)
+        for row in rows:
+            values = dict(zip(fields, row))
+            yield (entity, *(values.get(column) for column in EXPORT_COLUMNS[1:]))
+
+
+def csv_chunks(rows, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for index, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if index % chunk_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(rows, chunk_size):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, row)), separators=(",", ":")))
+        if len(lines) == chunk_size:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def iterate_in_thread(iterator):
+    """
+    Consume a sync iterator from async code one chunk at a time. Every step runs
+    in the request's thread, so the server-side cursor stays on its connection.
+    """
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    try:
+        while (chunk := await next_chunk(iterator, done)) is not done:
+            yield chunk
+    finally:
+        await sync_to_async(iterator.close, thread_sensitive=True)()
+
+
+def export_response(request, school_id, entities, chunk_size):
+    """
+    Stream the export of a school in the negotiated format, gzipped when the
+    client accepts it. Under ASGI the content is an async iterator so Django
+    doesn't buffer it before sending.
+    """
+    renderer = request.accepted_renderer
+    chunks = csv_chunks if renderer.format == CSVRenderer.format else ndjson_chunks
+    content = chunks(export_rows(school_id, entities, chunk_size), chunk_size)
+
+    gzipped = bool(GZIP_RE.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+    if gzipped:
+        content = compress_sequence(content)
+    if isinstance(request._request, ASGIRequest):
+        content = iterate_in_thread(content)
+
+    response = StreamingHttpResponse(content, content_type=f"{renderer.media_type}; charset={renderer.charset}")
+    response["Content-Disposition"] = f'attachment; filename="school-{school_id}.{renderer.format}"'
+    patch_vary_headers(response, ("Accept-Encoding",))
+    if gzipped:
+        response["Content-Encoding"] = "gzip"
+    return response
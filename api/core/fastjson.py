@@ -0,0 +1,97 @@
+import io
+import re
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson writes the floats Python writes with an exponent, under 1e-4 or from
+# 1e16 up, as 0.00001, 1e16 or 1.2e-7 instead of 1e-05, 1e+16 and 1.2e-07,
+# and NaN and Infinity, which JSONRenderer refuses, as null. Their output
+# always holds one of these, which are searched for first as the search takes
+# a fraction of the encoding time. Strings and None can hold them too, as in
+# "Marie-Claire", a cursor or a null "next" link, so the data is then checked
+# for such floats.
+FLOAT_EXPONENT = re.compile(rb"e[-\d]")
+SMALL_FLOAT = b"0.0000"
+NULL = b"null"
+
+
+def has_stdlib_float(data):
+    """
+    Whether the data holds a float that Python writes with an exponent, NaN or
+    Infinity, or an object DRF's encoder converts, which a Decimal is to a float
+    """
+    stack = [[data]]
+    while stack:
+        value = stack.pop()
+        for item in value.values() if isinstance(value, dict) else value:
+            item_type = type(item)
+            if item_type is str or item_type is int or item is None:
+                continue
+            if item_type is float:
+                if item and not 1e-4 <= abs(item) < 1e16:
+                    return True
+            elif isinstance(item, (dict, list, tuple)):
+                stack.append(item)
+            elif not isinstance(item, (str, int)):
+                return True
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer producing the same bytes through orjson when it's installed.
+    Indented, ASCII-only or non-strict output, and data orjson can't encode the
+    same way (integers over 64 bits, non-string keys, the floats above), go
+    through the stdlib encoder of JSONRenderer. Types orjson doesn't know,
+    datetimes included, are converted by DRF's encoder like they are there,
+    and NaN and Infinity raise the ValueError of JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except TypeError:
+            # orjson.JSONEncodeError is a TypeError
+            return super().render(data, accepted_media_type, renderer_context)
+        if (SMALL_FLOAT in ret or NULL in ret or FLOAT_EXPONENT.search(ret)) and has_stdlib_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer does, so the output is a strict javascript subset
+        if b"\xe2\x80" in ret:
+            ret = ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser reading UTF-8 bodies with orjson when it's installed. Bodies
+    orjson rejects, which it does for integers over 64 bits, NaN and Infinity
+    and lone surrogates, are parsed by JSONParser, so its results and error
+    messages are unchanged.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
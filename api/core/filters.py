@@ -0,0 +1,73 @@
+from django.db.models import Exists, OuterRef
+from django_filters import rest_framework as filters
+
+from core.models import School, Course, Administrator, Teacher, Student, Enrollment
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """
+    Comma separated list of integers, `?school=1,2`
+    """
+
+
+class RosterFilterSet(filters.FilterSet):
+    """
+    `?ids=` and `?name=` (a name prefix) on every resource. Each filter has an index
+    starting with its column: the primary key, and `<model>_name_prefix_idx` whose
+    pattern operator class serves LIKE 'prefix%' whatever the database collation.
+    """
+    ids = NumberInFilter(field_name="id")
+    name = filters.CharFilter(field_name="name", lookup_expr="startswith")
+
+
+class SchoolFilterSet(RosterFilterSet):
+    class Meta:
+        model = School
+        fields = ["ids", "name"]
+
+
+class AdministratorFilterSet(RosterFilterSet):
+    # Served by administrator_school_id_idx
+    school = NumberInFilter(field_name="school_id")
+
+    class Meta:
+        model = Administrator
+        fields = ["ids", "name", "school"]
+
+
+class TeacherFilterSet(RosterFilterSet):
+    # Served by teacher_school_id_idx
+    school = NumberInFilter(field_name="school_id")
+
+    class Meta:
+        model = Teacher
+        fields = ["ids", "name", "school"]
+
+
+class CourseFilterSet(RosterFilterSet):
+    # Served by course_school_id_idx and course_teacher_id_idx
+    school = NumberInFilter(field_name="school_id")
+    teacher = NumberInFilter(field_name="teacher_id")
+
+    class Meta:
+        model = Course
+        fields = ["ids", "name", "school", "teacher"]
+
+
+class StudentFilterSet(RosterFilterSet):
+    # Served by student_school_name_idx, in the order of the list
+    school = NumberInFilter(field_name="school_id")
+    course = NumberInFilter(method="filter_course")
+
+    class Meta:
+        model = Student
+        fields = ["ids", "name", "school", "course"]
+
+    def filter_course(self, queryset, name, value):
+        """
+        Students enrolled in any of the courses, read from enrollment_course_student_idx.
+        A semi-join, so students taking several of them are listed once.
+        """
+        return queryset.filter(Exists(
+            Enrollment.objects.filter(student=OuterRef("pk"), course_id__in=value)
+        ))
@@ -0,0 +1,367 @@
+import csv
+import io
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction, DatabaseError, IntegrityError
+
+from core.cache import invalidate_schools
+from core.models import School, Administrator, Teacher, Course, Student, Enrollment
+
+# Entity name: (model, text columns, references as {file column: (foreign key column, model)}),
+# in the order they are merged so references always point at merged rows
+ENTITIES = {
+    "schools": (School, {"name": 128, "address": None}, {}),
+    "teachers": (Teacher, {"name": 128}, {"school_external_id": ("school_id", School)}),
+    "admins": (Administrator, {"name": 128}, {"school_external_id": ("school_id", School)}),
+    "courses": (Course, {"name": 128, "location": None}, {
+        "school_external_id": ("school_id", School),
+        "teacher_external_id": ("teacher_id", Teacher),
+    }),
+    "students": (Student, {"name": 128}, {"school_external_id": ("school_id", School)}),
+    "enrollments": (Enrollment, {}, {
+        "student_external_id": ("student_id", Student),
+        "course_external_id": ("course_id", Course),
+    }),
+}
+
+# File column enrolling the rows of an entity in a course, when it's given
+ENROLLMENT_COLUMNS = {"students": "course_external_id"}
+
+EXTERNAL_ID_LENGTH = 64
+COPY_CHUNK_ROWS = 5000
+
+
+class ProgressFile:
+    """
+    Binary file wrapper reporting every tenth of the file read through it
+    """
+
+    def __init__(self, file, report):
+        self.file = file
+        self.report = report
+        self.size = os.fstat(file.fileno()).st_size
+        self.reported = 0
+
+    def track(self, data):
+        if self.size and self.file.tell() * 10 // self.size > self.reported:
+            self.reported = self.file.tell() * 10 // self.size
+            self.report(self.reported * 10)
+        return data
+
+    def read(self, size=-1):
+        return self.track(self.file.read(size))
+
+    def readline(self, size=-1):
+        return self.track(self.file.readline(size))
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+
+class ChunkFile:
+    """
+    Read-only file over an iterator of byte chunks, as expected by copy_expert().
+    The error raised by the iterator is kept, psycopg2 only reports it as a failed COPY.
+    """
+    error = None
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = b""
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                chunk = next(self.chunks, None)
+            except CommandError as exc:
+                self.error = exc
+                raise
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def ndjson_as_csv(lines, columns, entity):
+    """
+    Convert NDJSON objects to CSV rows of `columns`, COPY_CHUNK_ROWS at a time
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            item = json.loads(line)
+        except ValueError:
+            raise CommandError(f"{entity} row {number}: invalid JSON")
+        if not isinstance(item, dict) or set(item) - set(columns):
+            raise CommandError(f"{entity} row {number}: expected an object with the keys {', '.join(columns)}")
+        writer.writerow([item.get(column) for column in columns])
+        if number % COPY_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+class Command(BaseCommand):
+    help = "Import schools, teachers, admins, courses, students and enrollments from CSV or NDJSON files, " \
+           "matching rows on their external_id"
+
+    def add_arguments(self, parser):
+        for entity in ENTITIES:
+            parser.add_argument(f"--{entity}", metavar="FILE", help=f"CSV or NDJSON file of {entity}")
+        parser.add_argument(
+            "--upsert",
+            action="store_true",
+            help="Update the rows whose external_id already exists instead of rejecting them",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate the files and report what would change without writing anything",
+        )
+        parser.add_argument(
+            "--max-errors",
+            type=int,
+            default=20,
+            help="Number of invalid rows listed per file (default 20)",
+        )
+
+    def handle(self, *args, **options):
+        files = {entity: options[entity] for entity in ENTITIES if options[entity]}
+        if not files:
+            raise CommandError(f"Give at least one of {', '.join(f'--{entity}' for entity in ENTITIES)}")
+        self.upsert = options["upsert"]
+        self.verbosity = options["verbosity"]
+
+        started, errors, school_ids, imported = time.monotonic(), 0, set(), 0
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                for entity, path in files.items():
+                    rows = self.load(cursor, entity, path)
+                    invalid = self.validate(cursor, entity, options["max_errors"])
+                    errors += invalid
+                    if invalid:
+                        continue
+                    inserted, updated, schools = self.merge(cursor, entity)
+                    imported += rows
+                    school_ids.update(schools)
+                    self.stdout.write(
+                        f"{entity}: {inserted} inserted, {updated} updated, {rows - inserted - updated} unchanged"
+                    )
+                if errors:
+                    raise CommandError(f"{errors} invalid row(s), nothing was imported")
+                # Dropped on commit anyway, unless the import runs inside an outer transaction
+                cursor.execute(f"DROP TABLE {', '.join(f'import_{entity}' for entity in files)}")
+                if options["dry_run"]:
+                    transaction.set_rollback(True)
+        except IntegrityError as exc:
+            # A concurrent writer created one of the rows after it was validated
+            raise CommandError(f"Import failed, nothing was imported: {exc}")
+
+        elapsed = time.monotonic() - started
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Dry run: {imported} valid row(s), nothing was written"))
+            return
+        invalidate_schools(school_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} row(s) in {elapsed:.1f}s ({imported / max(elapsed, 1e-6):.0f} rows/s)"
+        ))
+
+    def progress(self, entity):
+        def report(percent):
+            if self.verbosity > 0:
+                self.stdout.write(f"{entity}: read {percent}%")
+        return report
+
+    def key_columns(self, model):
+        # Enrollments are identified by their student and course
+        return [] if model is Enrollment else ["external_id"]
+
+    def enrollment_columns(self, entity):
+        return [ENROLLMENT_COLUMNS[entity]] if entity in ENROLLMENT_COLUMNS else []
+
+    def load(self, cursor, entity, path):
+        """
+        COPY a file into a temporary staging table with the row number of each line
+        """
+        model, text_columns, references = ENTITIES[entity]
+        columns = [*self.key_columns(model), *text_columns, *references, *self.enrollment_columns(entity)]
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE import_{entity} (source_row bigint GENERATED ALWAYS AS IDENTITY, "
+            f"{', '.join(f'{column} text' for column in columns)}) ON COMMIT DROP"
+        )
+
+        try:
+            file = open(path, "rb")
+        except OSError as exc:
+            raise CommandError(f"Can't read {path}: {exc}")
+        with file:
+            source = ProgressFile(file, self.progress(entity))
+            if path.endswith((".ndjson", ".jsonl")):
+                file_columns = columns
+                source = ChunkFile(ndjson_as_csv(source, columns, entity))
+            elif path.endswith(".csv"):
+                file_columns = next(csv.reader([source.readline().decode("utf-8-sig")]), [])
+                if sorted(file_columns) != sorted(columns):
+                    raise CommandError(f"{path}: expected the CSV columns {', '.join(columns)}")
+            else:
+                raise CommandError(f"{path}: expected a .csv, .ndjson or .jsonl file")
+
+            try:
+                with connection.wrap_database_errors:
+                    cursor.copy_expert(
+                        f"COPY import_{entity} ({', '.join(file_columns)}) FROM STDIN WITH (FORMAT csv, ENCODING 'UTF8')",
+                        source,
+                    )
+            except DatabaseError as exc:
+                raise getattr(source, "error", None) or CommandError(f"{path}: {exc}")
+        # Temporary tables are never analyzed automatically
+        cursor.execute(f"ANALYZE import_{entity}")
+        cursor.execute(f"SELECT count(*) FROM import_{entity}")
+        return cursor.fetchone()[0]
+
+    def validate(self, cursor, entity, max_errors):
+        """
+        Report the invalid rows of the staging table in one pass, with the first
+        problem of each row, and return how many there are
+        """
+        model, text_columns, references = ENTITIES[entity]
+        checks = []
+        if self.key_columns(model):
+            checks += [
+                ("NULLIF(s.external_id, '') IS NULL", "'missing external_id'"),
+                (f"length(s.external_id) > {EXTERNAL_ID_LENGTH}",
+                 f"'external_id is longer than {EXTERNAL_ID_LENGTH} characters'"),
+                ("count(*) OVER (PARTITION BY s.external_id) > 1", "'duplicate external_id ' || s.external_id"),
+            ]
+        for column, max_length in text_columns.items():
+            checks.append((f"NULLIF(s.{column}, '') IS NULL", f"'missing {column}'"))
+            if max_length:
+                checks.append((f"length(s.{column}) > {max_length}", f"'{column} is longer than {max_length} characters'"))
+        joins = []
+        for column, (field, related) in references.items():
+            alias = field[:-len("_id")]
+            joins.append(f"LEFT JOIN {related._meta.db_table} {alias} ON {alias}.external_id = s.{column}")
+            checks.append((f"{alias}.id IS NULL", f"'unknown {alias} ' || coalesce(s.{column}, '(missing)')"))
+        for column in self.enrollment_columns(entity):
+            joins.append(f"LEFT JOIN {Course._meta.db_table} course ON course.external_id = s.{column}")
+            checks.append((
+                f"NULLIF(s.{column}, '') IS NOT NULL AND course.id IS NULL", f"'unknown course ' || s.{column}"
+            ))
+        if "course_id" in {field for field, related in references.values()} or self.enrollment_columns(entity):
+            # Students only take the courses of their school
+            school = "student.school_id" if model is Enrollment else "school.id"
+            checks.append((
+                f"course.school_id <> {school}", "'course ' || course.external_id || ' is offered by another school'"
+            ))
+        if model is Course:
+            checks.append((
+                "teacher.school_id <> school.id", "'teacher ' || teacher.external_id || ' is from another school'"
+            ))
+        if self.key_columns(model) and (not self.upsert or model is Course):
+            joins.append(f"LEFT JOIN {model._meta.db_table} existing ON existing.external_id = s.external_id")
+        if not self.upsert and self.key_columns(model):
+            checks.append(("existing.id IS NOT NULL", "s.external_id || ' already exists, use --upsert to update it'"))
+        if self.upsert and model is Course:
+            # The students and enrollments of a course belong to its school
+            checks.append((
+                f"existing.school_id <> school.id AND EXISTS "
+                f"(SELECT 1 FROM {Enrollment._meta.db_table} enrollment WHERE enrollment.course_id = existing.id)",
+                "'course ' || s.external_id || ' has enrolled students, it can''t move to another school'"
+            ))
+
+        cases = " ".join(f"WHEN {condition} THEN {message}" for condition, message in checks)
+        cursor.execute(
+            f"SELECT source_row, problem, count(*) OVER () FROM ("
+            f"SELECT s.source_row, CASE {cases} END AS problem FROM import_{entity} s {' '.join(joins)}"
+            f") AS checked WHERE problem IS NOT NULL ORDER BY source_row LIMIT %s",
+            [max(max_errors, 1)],
+        )
+        problems = cursor.fetchall()
+        for source_row, problem, total in problems[:max_errors]:
+            self.stderr.write(f"{entity} row {source_row}: {problem}")
+        total = problems[0][2] if problems else 0
+        if total > max_errors:
+            self.stderr.write(f"{entity}: {total - max_errors} more invalid row(s)")
+        return total
+
+    def merge(self, cursor, entity):
+        """
+        Insert (or upsert) the staging rows into the model table in one statement,
+        resolving references through the external ids. Returns the inserted and
+        updated counts and the schools whose rows changed.
+        """
+        model, text_columns, references = ENTITIES[entity]
+        if model is Enrollment:
+            inserted, schools = self.enroll(cursor, entity, "student_external_id", "course_external_id")
+            return inserted, 0, schools
+        table = model._meta.db_table
+        target = ["external_id", *text_columns, *(field for field, related in references.values()), "updated_at"]
+        values = ["s.external_id", *(f"s.{column}" for column in text_columns),
+                  *(f"{field[:-len('_id')]}.id" for field, related in references.values()), "now()"]
+        joins = " ".join(
+            f"JOIN {related._meta.db_table} {field[:-len('_id')]} ON {field[:-len('_id')]}.external_id = s.{column}"
+            for column, (field, related) in references.items()
+        )
+        school = "id" if model is School else "school_id"
+
+        conflict, previous = "", "SELECT NULL::bigint AS school_id WHERE false"
+        if self.upsert:
+            changed = target[1:-1]
+            conflict = (
+                f"ON CONFLICT (external_id) DO UPDATE SET "
+                f"{', '.join(f'{column} = EXCLUDED.{column}' for column in target[1:])} "
+                f"WHERE ({', '.join(f'{table}.{column}' for column in changed)}) "
+                f"IS DISTINCT FROM ({', '.join(f'EXCLUDED.{column}' for column in changed)})"
+            )
+            # Read from the snapshot taken before the upsert, so rows moving to
+            # another school invalidate the one they leave
+            previous = f"SELECT t.{school} AS school_id FROM {table} t JOIN import_{entity} s USING (external_id)"
+
+        cursor.execute(
+            f"WITH previous AS ({previous}), merged AS ("
+            f"INSERT INTO {table} ({', '.join(target)}) SELECT {', '.join(values)} FROM import_{entity} s {joins} "
+            f"{conflict} RETURNING xmax = 0 AS inserted, {school} AS school_id) "
+            f"SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted), "
+            f"ARRAY(SELECT school_id FROM merged UNION SELECT school_id FROM previous) FROM merged"
+        )
+        inserted, updated, schools = cursor.fetchone()
+        for column in self.enrollment_columns(entity):
+            if self.upsert:
+                # Students moved to another school leave the courses of the previous one
+                cursor.execute(
+                    f"DELETE FROM {Enrollment._meta.db_table} enrollment USING {table} student "
+                    f"JOIN import_{entity} s USING (external_id) "
+                    f"WHERE enrollment.student_id = student.id AND enrollment.school_id <> student.school_id"
+                )
+            schools = [*schools, *self.enroll(cursor, entity, "external_id", column)[1]]
+        return inserted, updated, schools
+
+    def enroll(self, cursor, entity, student_column, course_column):
+        """
+        Enroll the students of the staging rows in their course, keeping the
+        enrollments that already exist. Returns the inserted count and the schools.
+        """
+        cursor.execute(
+            f"WITH enrolled AS ("
+            f"INSERT INTO {Enrollment._meta.db_table} (student_id, course_id, school_id, created_at) "
+            f"SELECT student.id, course.id, course.school_id, now() FROM import_{entity} s "
+            f"JOIN {Student._meta.db_table} student ON student.external_id = s.{student_column} "
+            f"JOIN {Course._meta.db_table} course ON course.external_id = s.{course_column} "
+            f"ON CONFLICT (student_id, course_id) DO NOTHING RETURNING student_id, school_id"
+            f"), touched AS ("
+            f"UPDATE {Student._meta.db_table} SET updated_at = now() FROM enrolled WHERE id = enrolled.student_id"
+            f") SELECT count(*), ARRAY(SELECT DISTINCT school_id FROM enrolled) FROM enrolled"
+        )
+        return cursor.fetchone()
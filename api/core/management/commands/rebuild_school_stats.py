@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from core.cache import invalidate_schools
+from core.models import School, SchoolStats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-school counters in core_schoolstats, or verify them with --verify"
+
+    counters = ["courses", "admins", "teachers", "students", "enrollments"]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only compare the counters with the real counts and fail if any of them drifted",
+        )
+
+    def handle(self, *args, **options):
+        if options["verify"]:
+            self.verify()
+        else:
+            self.rebuild()
+
+    def drifted_schools(self):
+        drifted = Q(stats__isnull=True)
+        for counter in self.counters:
+            drifted |= ~Q(**{counter: F(f"stats__{counter}")})
+        return School.objects.with_stats().filter(drifted).order_by("id")
+
+    def verify(self):
+        drifted = list(self.drifted_schools().values("id", *self.counters))
+        for row in drifted:
+            self.stdout.write(f"School {row.pop('id')} expected {row}")
+        if drifted:
+            raise CommandError(f"{len(drifted)} school(s) have drifted counters")
+        self.stdout.write(self.style.SUCCESS("All school counters are exact"))
+
+    def rebuild(self):
+        counts = School.objects.with_stats().values_list("id", *self.counters).order_by()
+        select_sql, params = counts.query.sql_with_params()
+        columns = ", ".join(self.counters)
+        updates = ", ".join(f"{counter} = EXCLUDED.{counter}" for counter in self.counters)
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Block the counter triggers of concurrent writers until the rebuilt
+            # values are committed, so no increment is lost or counted twice
+            cursor.execute(f"LOCK TABLE {SchoolStats._meta.db_table} IN SHARE ROW EXCLUSIVE MODE")
+            cursor.execute(
+                f"INSERT INTO {SchoolStats._meta.db_table} (school_id, {columns}) {select_sql} "
+                f"ON CONFLICT (school_id) DO UPDATE SET {updates}",
+                params,
+            )
+            rebuilt = cursor.rowcount
+        invalidate_schools(School.objects.values_list("id", flat=True))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the counters of {rebuilt} school(s)"))
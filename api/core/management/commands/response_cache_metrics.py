@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import cached_view_names, get_metrics
+
+
+class Command(BaseCommand):
+    help = "Print the response cache hits and misses of every cached API view. They are read from the cache " \
+           "of this process, so with a local memory cache only /api/response-cache shows the server's ones"
+
+    def handle(self, *args, **options):
+        for view_name, counts in get_metrics(cached_view_names()).items():
+            lookups = counts["hit"] + counts["miss"]
+            ratio = counts["hit"] / lookups if lookups else 0
+            self.stdout.write(f"{view_name}: {counts['hit']} hits, {counts['miss']} misses ({ratio:.0%} hit ratio)")
@@ -0,0 +1,162 @@
+import csv
+import io
+import math
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.cache import invalidate_schools
+from core.management.commands.import_roster import ChunkFile
+from core.models import School, Administrator, Teacher, Course, Student, Enrollment
+
+FIRST_NAMES = [
+    "Olivia", "Liam", "Emma", "Noah", "Amelia", "Oliver", "Ava", "Elijah", "Sophia", "Mateo", "Isabella",
+    "Lucas", "Mia", "Levi", "Aisha", "Wei", "Priya", "Yuki", "Fatima", "Diego", "Chloe", "Omar", "Zoe", "Ivan",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Nguyen", "Kim", "Patel", "Chen", "Kowalski", "Okafor", "Silva", "Rossi", "Müller", "Dubois", "Tanaka",
+]
+SUBJECTS = [
+    "Mathematics", "Algebra", "Geometry", "Biology", "Chemistry", "Physics", "History", "Geography",
+    "Literature", "Art", "Music", "Computer Science", "Economics", "Spanish", "French", "Physical Education",
+]
+
+# Spread of the school sizes around --students-per-school (lognormal)
+SCHOOL_SIZE_SIGMA = 0.5
+STUDENTS_PER_COURSE = 25
+# Number of courses taken by each student: (count, weight), two on average
+COURSES_PER_STUDENT = ((1, 4), (2, 3), (3, 2), (4, 1))
+STUDENTS_PER_TEACHER = 18
+STUDENTS_PER_ADMIN = 250
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic roster for benchmarks: school sizes spread around --students-per-school, "
+        "staff and courses proportional to them, and skewed course popularity"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--schools", type=int, required=True)
+        parser.add_argument("--students-per-school", type=int, required=True, help="Average number of students")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the generator, for reproducible data")
+        parser.add_argument(
+            "--batch-schools", type=int, default=100, help="Schools generated and committed per transaction"
+        )
+
+    def handle(self, *args, **options):
+        if options["schools"] < 1 or options["students_per_school"] < 0 or options["batch_schools"] < 1:
+            raise CommandError("--schools and --batch-schools must be positive, --students-per-school not negative")
+        rng = random.Random(options["seed"])
+        average = options["students_per_school"]
+        # The mean of a lognormal is exp(mu + sigma^2 / 2)
+        mu = math.log(max(average, 1)) - SCHOOL_SIZE_SIGMA ** 2 / 2
+
+        started = time.perf_counter()
+        totals = dict.fromkeys(["schools", "teachers", "admins", "courses", "students", "enrollments"], 0)
+        school_ids = []
+        for first in range(0, options["schools"], options["batch_schools"]):
+            count = min(options["batch_schools"], options["schools"] - first)
+            sizes = [round(rng.lognormvariate(mu, SCHOOL_SIZE_SIGMA)) if average else 0 for _ in range(count)]
+            with transaction.atomic():
+                ids, created = self.seed_schools(rng, first, sizes)
+            for entity, rows in created.items():
+                totals[entity] += rows
+            school_ids += ids
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{first + count} schools, {totals['students']} students")
+
+        invalidate_schools(school_ids)
+        summary = ", ".join(f"{rows} {entity}" for entity, rows in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {time.perf_counter() - started:.1f}s"))
+
+    def seed_schools(self, rng, first, sizes):
+        schools = School.objects.bulk_create([
+            School(name=f"{rng.choice(LAST_NAMES)} School {first + index}", address=f"{rng.randint(1, 999)} Main Street")
+            for index in range(len(sizes))
+        ])
+        admins, teachers = [], []
+        for school, size in zip(schools, sizes):
+            admins += [
+                Administrator(name=self.person(rng), school=school) for _ in range(1 + size // STUDENTS_PER_ADMIN)
+            ]
+            teachers.append([
+                Teacher(name=self.person(rng), school=school) for _ in range(1 + size // STUDENTS_PER_TEACHER)
+            ])
+        Administrator.objects.bulk_create(admins)
+        Teacher.objects.bulk_create([teacher for staff in teachers for teacher in staff])
+
+        courses = []
+        for school, size, staff in zip(schools, sizes, teachers):
+            courses.append([
+                Course(
+                    name=f"{rng.choice(SUBJECTS)} {index + 1}", location=f"Room {rng.randint(1, 300)}",
+                    school=school, teacher=staff[index % len(staff)]
+                )
+                for index in range(1 + size // STUDENTS_PER_COURSE)
+            ])
+        Course.objects.bulk_create([course for offered in courses for course in offered])
+
+        with connection.cursor() as cursor, connection.wrap_database_errors:
+            # Ids are reserved up front so the enrollments can be copied in the same way
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [Student._meta.db_table, sum(sizes)]
+            )
+            student_ids = iter([row[0] for row in cursor.fetchall()])
+            students, enrollments = self.student_rows(rng, schools, sizes, courses, student_ids)
+            cursor.copy_expert(
+                f"COPY {Student._meta.db_table} (id, name, school_id, updated_at) FROM STDIN WITH (FORMAT csv)",
+                ChunkFile(self.csv_chunks(students)),
+            )
+            cursor.copy_expert(
+                f"COPY {Enrollment._meta.db_table} (student_id, course_id, school_id, created_at) "
+                f"FROM STDIN WITH (FORMAT csv)",
+                ChunkFile(self.csv_chunks(enrollments)),
+            )
+        return [school.id for school in schools], {
+            "schools": len(schools),
+            "teachers": sum(len(staff) for staff in teachers),
+            "admins": len(admins),
+            "courses": sum(len(offered) for offered in courses),
+            "students": sum(sizes),
+            "enrollments": sum(len(school_rows) for school_rows in enrollments),
+        }
+
+    def student_rows(self, rng, schools, sizes, courses, student_ids):
+        """
+        Rows of the students of each school and of their enrollments, one list per
+        school. Students take one to four courses picked with a Zipf-like popularity,
+        so a few courses are much larger than the others.
+        """
+        counts, count_weights = zip(*COURSES_PER_STUDENT)
+        students, enrollments = [], []
+        for school, size, offered in zip(schools, sizes, courses):
+            weights = [1 / (rank + 1) for rank in range(len(offered))]
+            students.append([])
+            enrollments.append([])
+            for _ in range(size):
+                student_id = next(student_ids)
+                students[-1].append([student_id, self.person(rng), school.id, "now"])
+                # A dict keeps the picks in order, so the same seed gives the same rows
+                taken = {}
+                wanted = min(rng.choices(counts, count_weights)[0], len(offered))
+                while len(taken) < wanted:
+                    taken[rng.choices(offered, weights)[0]] = True
+                enrollments[-1] += [[student_id, course.id, school.id, "now"] for course in taken]
+        return students, enrollments
+
+    def csv_chunks(self, schools):
+        """
+        One CSV chunk of rows per school
+        """
+        for rows in schools:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            yield buffer.getvalue().encode()
+
+    def person(self, rng):
+        return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
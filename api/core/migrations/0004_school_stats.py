@@ -0,0 +1,109 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+COUNTED_TABLES = {
+    "core_course": "courses",
+    "core_administrator": "admins",
+    "core_teacher": "teachers",
+    "core_student": "students",
+}
+
+# Statement level triggers with transition tables, so a bulk_create or a
+# queryset delete/update applies one grouped UPDATE per statement instead of
+# one per row. Updates only touch the counters when school_id actually changed.
+COUNTER_FUNCTION_SQL = """
+CREATE FUNCTION {table}_school_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE core_schoolstats AS stats SET {column} = stats.{column} + delta.n
+        FROM (SELECT school_id, count(*) AS n FROM new_rows GROUP BY school_id) AS delta
+        WHERE stats.school_id = delta.school_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE core_schoolstats AS stats SET {column} = stats.{column} - delta.n
+        FROM (SELECT school_id, count(*) AS n FROM old_rows GROUP BY school_id) AS delta
+        WHERE stats.school_id = delta.school_id;
+    ELSE
+        UPDATE core_schoolstats AS stats SET {column} = stats.{column} + delta.n
+        FROM (
+            SELECT school_id, sum(n) AS n FROM (
+                SELECT new_rows.school_id, 1 AS n FROM new_rows
+                JOIN old_rows ON old_rows.id = new_rows.id
+                WHERE old_rows.school_id <> new_rows.school_id
+                UNION ALL
+                SELECT old_rows.school_id, -1 AS n FROM old_rows
+                JOIN new_rows ON new_rows.id = old_rows.id
+                WHERE old_rows.school_id <> new_rows.school_id
+            ) AS moved GROUP BY school_id
+        ) AS delta
+        WHERE stats.school_id = delta.school_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER {table}_school_stats_insert AFTER INSERT ON {table}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {table}_school_stats();
+CREATE TRIGGER {table}_school_stats_delete AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {table}_school_stats();
+CREATE TRIGGER {table}_school_stats_update AFTER UPDATE ON {table}
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {table}_school_stats();
+"""
+
+SCHOOL_FUNCTION_SQL = """
+CREATE FUNCTION core_school_school_stats() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO core_schoolstats (school_id, courses, admins, teachers, students)
+    SELECT id, 0, 0, 0, 0 FROM new_rows
+    ON CONFLICT (school_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_school_school_stats_insert AFTER INSERT ON core_school
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_school_school_stats();
+"""
+
+BACKFILL_SQL = """
+INSERT INTO core_schoolstats (school_id, courses, admins, teachers, students)
+SELECT school.id, {counts} FROM core_school AS school
+""".format(counts=", ".join(
+    f"(SELECT count(*) FROM {table} WHERE {table}.school_id = school.id)"
+    for table in COUNTED_TABLES
+))
+
+
+def drop_function_sql(table):
+    return f"DROP FUNCTION {table}_school_stats() CASCADE;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_course_teacher'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolStats',
+            fields=[
+                ('school', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.school')),
+                ('courses', models.PositiveIntegerField(default=0)),
+                ('admins', models.PositiveIntegerField(default=0)),
+                ('teachers', models.PositiveIntegerField(default=0)),
+                ('students', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunSQL(
+            [COUNTER_FUNCTION_SQL.format(table=table, column=column) for table, column in COUNTED_TABLES.items()],
+            [drop_function_sql(table) for table in COUNTED_TABLES],
+        ),
+        migrations.RunSQL(SCHOOL_FUNCTION_SQL, drop_function_sql("core_school")),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
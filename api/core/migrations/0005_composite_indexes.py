@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:35
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes on large tables, then drop the
+    # single column foreign key indexes they make redundant
+    atomic = False
+
+    dependencies = [
+        ('core', '0004_school_stats'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(fields=['school', 'teacher'], name='course_school_teacher_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='student',
+            index=models.Index(fields=['name', 'id'], name='student_name_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='student',
+            index=models.Index(fields=['school', 'name', 'id'], name='student_school_name_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='student',
+            index=models.Index(fields=['course', 'name', 'id'], name='student_course_name_idx'),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='school',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.school'),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='course',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.course'),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='school',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.school'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='administrator',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='school',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='teacher',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='administrator',
+            constraint=models.UniqueConstraint(fields=('external_id',), name='administrator_external_id_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='course',
+            constraint=models.UniqueConstraint(fields=('external_id',), name='course_external_id_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='school',
+            constraint=models.UniqueConstraint(fields=('external_id',), name='school_external_id_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='student',
+            constraint=models.UniqueConstraint(fields=('external_id',), name='student_external_id_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='teacher',
+            constraint=models.UniqueConstraint(fields=('external_id',), name='teacher_external_id_key'),
+        ),
+    ]
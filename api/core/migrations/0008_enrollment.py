@@ -0,0 +1,116 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:33
+
+import importlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+school_stats = importlib.import_module("core.migrations.0004_school_stats")
+
+# Students taking several courses were stored as one row per course: keep the
+# first row of each (school, name, external_id) and enroll it in the courses
+# of all of them. Rows with an external_id are never merged, as it is unique.
+DEDUPLICATE_SQL = """
+CREATE TEMPORARY TABLE student_duplicates ON COMMIT DROP AS
+SELECT id, min(id) OVER (PARTITION BY school_id, name, external_id) AS keeper_id, course_id
+FROM core_student;
+
+INSERT INTO core_enrollment (student_id, course_id, school_id, created_at)
+SELECT DISTINCT duplicate.keeper_id, duplicate.course_id, course.school_id, now()
+FROM student_duplicates duplicate JOIN core_course course ON course.id = duplicate.course_id;
+
+DELETE FROM core_student USING student_duplicates duplicate
+WHERE core_student.id = duplicate.id AND duplicate.id <> duplicate.keeper_id;
+
+-- Run the deferred foreign key checks now, core_student can't be altered with pending ones
+SET CONSTRAINTS ALL IMMEDIATE;
+"""
+
+# Back to one row per course: the first enrollment stays on the student and
+# every other one becomes a copy of it. The students without any enrollment
+# can't be stored there, as every student had a course, so they are deleted
+# before the course column is NOT NULL again.
+EXPAND_SQL = """
+DELETE FROM core_student
+WHERE NOT EXISTS (SELECT 1 FROM core_enrollment enrollment WHERE enrollment.student_id = core_student.id);
+
+UPDATE core_student SET course_id = first.course_id
+FROM (SELECT DISTINCT ON (student_id) student_id, course_id FROM core_enrollment ORDER BY student_id, id) first
+WHERE first.student_id = core_student.id;
+
+INSERT INTO core_student (name, school_id, course_id, updated_at)
+SELECT student.name, student.school_id, enrollment.course_id, student.updated_at
+FROM core_enrollment enrollment JOIN core_student student ON student.id = enrollment.student_id
+WHERE enrollment.course_id <> student.course_id;
+
+SET CONSTRAINTS ALL IMMEDIATE;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_external_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Enrollment',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='core.course')),
+                ('school', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.school')),
+                ('student', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='core.student')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['course', 'student'], name='enrollment_course_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['school', 'id'], name='enrollment_school_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='enrollment',
+            constraint=models.UniqueConstraint(fields=('student', 'course'), name='enrollment_student_course_key'),
+        ),
+        migrations.AddField(
+            model_name='schoolstats',
+            name='enrollments',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        # The stats rows of new schools are inserted by the trigger of 0004, which
+        # only lists the counters that existed then
+        migrations.RunSQL(
+            "ALTER TABLE core_schoolstats ALTER COLUMN enrollments SET DEFAULT 0;",
+            "ALTER TABLE core_schoolstats ALTER COLUMN enrollments DROP DEFAULT;",
+        ),
+        # Counted by the same statement level triggers as the other tables, so
+        # the enrollments created below are counted too
+        migrations.RunSQL(
+            school_stats.COUNTER_FUNCTION_SQL.format(table='core_enrollment', column='enrollments'),
+            school_stats.drop_function_sql('core_enrollment'),
+        ),
+        # Nullable while the rows are merged, so the migration can be reversed
+        migrations.AlterField(
+            model_name='student',
+            name='course',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.course'),
+        ),
+        migrations.RunSQL(DEDUPLICATE_SQL, EXPAND_SQL),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='student_course_name_idx',
+        ),
+        migrations.RemoveField(
+            model_name='student',
+            name='course',
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='courses',
+            field=models.ManyToManyField(related_name='students', through='core.Enrollment', to='core.course'),
+        ),
+    ]
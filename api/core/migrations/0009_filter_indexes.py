@@ -0,0 +1,69 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:43
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # Build the filter indexes without locking writes, then drop the single
+    # column foreign key indexes they make redundant
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_enrollment'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='administrator',
+            index=models.Index(fields=['school', 'id'], name='administrator_school_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='administrator',
+            index=models.Index(fields=['name'], name='administrator_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(fields=['school', 'id'], name='course_school_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(fields=['teacher', 'id'], name='course_teacher_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(fields=['name'], name='course_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='school',
+            index=models.Index(fields=['name'], name='school_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='student',
+            index=models.Index(fields=['name'], name='student_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='teacher',
+            index=models.Index(fields=['school', 'id'], name='teacher_school_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='teacher',
+            index=models.Index(fields=['name'], name='teacher_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AlterField(
+            model_name='administrator',
+            name='school',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.school'),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='teacher',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.teacher'),
+        ),
+        migrations.AlterField(
+            model_name='teacher',
+            name='school',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.school'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:47
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # The GIN indexes take a while on large tables, build them without locking writes
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_filter_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='administrator',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('name', config='simple'), name='administrator_name_search_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='student',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('name', config='simple'), name='student_name_search_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='teacher',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('name', config='simple'), name='teacher_name_search_idx'),
+        ),
+    ]
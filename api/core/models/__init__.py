@@ -2,4 +2,6 @@ from .school import School
 from .administrator import Administrator
 from .teacher import Teacher
 from .course import Course
-from .student import Student
\ No newline at end of file
+from .student import Student
+from .enrollment import Enrollment
+from .school_stats import SchoolStats
@@ -1,14 +1,32 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
 from . import School
 
 
 class Administrator(models.Model):
     id = models.BigAutoField(primary_key=True)
+    external_id = models.CharField(max_length=64, null=True, blank=True)
     name = models.CharField(max_length=128, blank=False, null=False)
     school = models.ForeignKey(
         School,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
+
+    class Meta:
+        # The (school, id) index also serves the foreign key lookups, the name one
+        # has pattern ops so LIKE 'prefix%' can use it under any collation, and the
+        # GIN one serves the word prefix queries of core.search
+        indexes = [
+            models.Index(fields=['school', 'id'], name='administrator_school_id_idx'),
+            models.Index(fields=['name'], name='administrator_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+            GinIndex(SearchVector('name', config='simple'), name='administrator_name_search_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['external_id'], name='administrator_external_id_key'),
+        ]
@@ -4,16 +4,34 @@ from . import Teacher, School
 
 class Course(models.Model):
     id = models.BigAutoField(primary_key=True)
+    external_id = models.CharField(max_length=64, null=True, blank=True)
     name = models.CharField(max_length=128, blank=False, null=False)
     location = models.TextField(blank=False, null=False)
     school = models.ForeignKey(
         School,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     teacher = models.ForeignKey(
         Teacher,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name}: {self.location}"
+
+    class Meta:
+        # The (school, ...) and (teacher, id) indexes also serve the foreign key
+        # lookups, the name one has pattern ops so LIKE 'prefix%' can use it under
+        # any collation
+        indexes = [
+            models.Index(fields=['school', 'teacher'], name='course_school_teacher_idx'),
+            models.Index(fields=['school', 'id'], name='course_school_id_idx'),
+            models.Index(fields=['teacher', 'id'], name='course_teacher_id_idx'),
+            models.Index(fields=['name'], name='course_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['external_id'], name='course_external_id_key'),
+        ]
@@ -0,0 +1,68 @@
+from django.db import models, connections
+from django.utils import timezone
+
+from . import School, Course, Student
+
+
+class EnrollmentQuerySet(models.QuerySet):
+    def transfer(self, student_ids, from_course_id, to_course_id):
+        """
+        Move enrollments from one course to another with a single conditional UPDATE:
+        only the students still enrolled in `from_course_id`, not yet enrolled in
+        `to_course_id`, move, and only if the target course is offered by their
+        school, so concurrent transfers are never lost or applied twice. The
+        students' updated_at is bumped in the same statement. Returns the ids of
+        the students that moved with their school id.
+        """
+        table = self.model._meta.db_table
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"WITH moved AS ("
+                f"UPDATE {table} SET course_id = %s "
+                f"WHERE student_id = ANY(%s) AND course_id = %s "
+                f"AND EXISTS (SELECT 1 FROM {Course._meta.db_table} course "
+                f"WHERE course.id = %s AND course.school_id = {table}.school_id) "
+                f"AND NOT EXISTS (SELECT 1 FROM {table} target "
+                f"WHERE target.student_id = {table}.student_id AND target.course_id = %s) "
+                f"RETURNING student_id, school_id"
+                f"), touched AS ("
+                f"UPDATE {Student._meta.db_table} SET updated_at = now() FROM moved WHERE id = moved.student_id"
+                f") SELECT student_id, school_id FROM moved",
+                [to_course_id, list(student_ids), from_course_id, to_course_id, to_course_id]
+            )
+            return dict(cursor.fetchall())
+
+    def touch_students(self):
+        """
+        Bump the updated_at of the students of these enrollments, before they
+        are deleted by the cascade of a course, so their ETags change too
+        """
+        return Student.objects.filter(id__in=self.values("student_id")).update(updated_at=timezone.now())
+
+
+class Enrollment(models.Model):
+    """
+    A student taking a course. The school of the course is copied on the row so
+    the per-school counters, exports and cascades don't need to join the courses.
+    """
+    id = models.BigAutoField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="enrollments", db_index=False)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="enrollments", db_index=False)
+    school = models.ForeignKey(School, on_delete=models.CASCADE, db_index=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = EnrollmentQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Student {self.student_id} in course {self.course_id}"
+
+    class Meta:
+        # The unique (student, course) and the (course, student) and (school, id)
+        # indexes also serve the foreign key lookups
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='enrollment_student_course_key'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'student'], name='enrollment_course_student_idx'),
+            models.Index(fields=['school', 'id'], name='enrollment_school_id_idx'),
+        ]
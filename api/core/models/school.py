@@ -1,10 +1,49 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+class SchoolQuerySet(models.QuerySet):
+    def with_stats(self):
+        """
+        Annotate each school with its course, admin, teacher, student and enrollment counts
+        using correlated subqueries, so the stats come back in a single query
+        """
+        from . import Course, Administrator, Teacher, Student, Enrollment
+
+        def count_for(model):
+            counts = model.objects.filter(school=OuterRef("pk")).order_by() \
+                .values("school").annotate(count=Count("pk")).values("count")
+            return Coalesce(Subquery(counts), 0)
+
+        return self.annotate(
+            courses=count_for(Course),
+            admins=count_for(Administrator),
+            teachers=count_for(Teacher),
+            students=count_for(Student),
+            enrollments=count_for(Enrollment),
+        )
 
 
 class School(models.Model):
     id = models.BigAutoField(primary_key=True)
+    # Natural key of the row in the source system, see the import_roster command
+    external_id = models.CharField(max_length=64, null=True, blank=True)
     name = models.CharField(max_length=128, blank=False, null=False)
     address = models.TextField(blank=False, null=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SchoolQuerySet.as_manager()
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    class Meta:
+        # Pattern ops so LIKE 'prefix%' can use it under any collation
+        indexes = [
+            models.Index(fields=['name'], name='school_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
+        # A constraint rather than unique=True, which adds a second (pattern ops) index
+        constraints = [
+            models.UniqueConstraint(fields=['external_id'], name='school_external_id_key'),
+        ]
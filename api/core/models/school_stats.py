@@ -0,0 +1,23 @@
+from django.db import models
+from . import School
+
+
+class SchoolStats(models.Model):
+    """
+    Denormalized per-school counters, kept exact by the database triggers
+    installed in migrations 0004 and 0008 so reading a school's stats is a single row lookup
+    """
+    school = models.OneToOneField(
+        School,
+        primary_key=True,
+        related_name="stats",
+        on_delete=models.CASCADE
+    )
+    courses = models.PositiveIntegerField(default=0)
+    admins = models.PositiveIntegerField(default=0)
+    teachers = models.PositiveIntegerField(default=0)
+    students = models.PositiveIntegerField(default=0)
+    enrollments = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Stats for school {self.school_id}"
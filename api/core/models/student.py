@@ -1,19 +1,54 @@
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
+from django.db.models import OuterRef, Subquery
 
 from . import School, Course
 
 
+class StudentQuerySet(models.QuerySet):
+    def with_course_ids(self):
+        """
+        Annotate each student with the sorted ids of its courses, read from the
+        unique (student, course) index by a subquery of the same query, and with
+        the first of them as the `course_id` students had before they could take
+        several courses
+        """
+        from . import Enrollment
+
+        courses = Enrollment.objects.filter(student=OuterRef("pk")).order_by("course_id").values("course_id")
+        return self.annotate(course_ids=ArraySubquery(courses), course_id=Subquery(courses[:1]))
+
+
 class Student(models.Model):
     id = models.BigAutoField(primary_key=True)
+    external_id = models.CharField(max_length=64, null=True, blank=True)
     name = models.CharField(max_length=128, blank=False, null=False)
     school = models.ForeignKey(
         School,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
-    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    courses = models.ManyToManyField(Course, through="Enrollment", related_name="students")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = StudentQuerySet.as_manager()
 
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ['name']
+        # The (school, ...) index also serves the foreign key lookups, the name
+        # prefix one has pattern ops so LIKE 'prefix%' can use it under any
+        # collation, and the GIN one serves the word prefix queries of core.search
+        indexes = [
+            models.Index(fields=['name', 'id'], name='student_name_idx'),
+            models.Index(fields=['school', 'name', 'id'], name='student_school_name_idx'),
+            models.Index(fields=['name'], name='student_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+            GinIndex(SearchVector('name', config='simple'), name='student_name_search_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['external_id'], name='student_external_id_key'),
+        ]
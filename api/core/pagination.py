@@ -0,0 +1,215 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over the queryset ordering plus the primary key as a tie
+    breaker. Each page is an index range scan starting right after the previous
+    page's last row, so deep pages cost the same as the first one. The total count
+    is only computed with `?count=true`.
+    """
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    count_query_param = "count"
+    default_limit = api_settings.PAGE_SIZE
+    max_limit = 1000
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page, count = self.prepare(queryset, request)
+        self.count = count.count() if count is not None else None
+        return self.finish(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page, count = self.prepare(queryset, request)
+        self.count = await count.acount() if count is not None else None
+        return self.finish([row async for row in page])
+
+    def prepare(self, queryset, request):
+        """
+        Return the queryset of the rows of the page, plus one to know if there
+        are more, and the queryset to count when the count is asked for
+        """
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = self.get_ordering(queryset)
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+
+        count = None
+        if request.query_params.get(self.count_query_param, "").lower() in ("1", "true"):
+            count = queryset
+
+        ordering = [self.reverse_field(field) for field in self.ordering] if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.after(self.position, ordering))
+        return queryset[:self.limit + 1], count
+
+    def finish(self, rows):
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.reverse:
+            rows.reverse()
+
+        self.has_next = self.position is not None if self.reverse else has_more
+        self.has_previous = has_more if self.reverse else self.position is not None
+        self.rows = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        response = {"next": self.get_next_link(), "previous": self.get_previous_link(), "results": data}
+        if self.count is not None:
+            response = {"count": self.count, **response}
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "count": {"type": "integer"},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_limit(self, request):
+        try:
+            return _positive_int(request.query_params[self.limit_query_param], strict=True, cutoff=self.max_limit)
+        except (KeyError, ValueError):
+            return self.default_limit
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not ordering or not all(isinstance(field, str) for field in ordering):
+            ordering = ["pk"]
+        pk_name = queryset.model._meta.pk.attname
+        if not {"pk", pk_name} & {field.lstrip("-") for field in ordering}:
+            ordering.append(f"-{pk_name}" if ordering[0].startswith("-") else pk_name)
+        return ordering
+
+    @staticmethod
+    def reverse_field(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def after(position, ordering):
+        """
+        Rows strictly after `position` in `ordering`. The leading range filter on
+        the first field lets the database use it as an index range scan.
+        """
+        first = ordering[0]
+        condition = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": position[0]})
+        after = Q()
+        for index, field in enumerate(ordering):
+            equal = {previous.lstrip("-"): value for previous, value in zip(ordering[:index], position)}
+            lookup = "lt" if field.startswith("-") else "gt"
+            after |= Q(**equal, **{f"{field.lstrip('-')}__{lookup}": position[index]})
+        return condition & after
+
+    def decode_cursor(self, request, model):
+        """
+        The position and direction of the cursor, each value of the position
+        converted by the field it's compared to, so a tampered cursor is a 404
+        rather than a database error
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            position, reverse = cursor["p"], bool(cursor.get("r"))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [self.to_python(model, field, value) for field, value in zip(self.ordering, position)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        # Not comparable with the range lookups of after()
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def to_python(model, field, value):
+        name = field.lstrip("-")
+        try:
+            model_field = model._meta.pk if name == "pk" else model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # An annotation, compared as it was encoded
+            return value
+        return model_field.to_python(value)
+
+    def encode_cursor(self, row, reverse):
+        position = [
+            getattr(row, "pk" if field.lstrip("-") == "pk" else field.lstrip("-"))
+            for field in self.ordering
+        ]
+        cursor = json.dumps({"p": position, "r": reverse}, cls=DjangoJSONEncoder, separators=(",", ":"))
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, urlsafe_b64encode(cursor.encode()).decode("ascii"))
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.rows:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.rows[0], reverse=True)
+
+
+class KeysetOrLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination for backward compatibility, switching to keyset
+    pagination when the request carries a `cursor` parameter (empty for the first page)
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset() through the async ORM, for the async read views
+        """
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [row async for row in queryset[self.offset:self.offset + self.limit]]
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
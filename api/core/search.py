@@ -0,0 +1,99 @@
+import re
+from itertools import product
+
+from django.db import connection
+
+from core.models import Administrator, Teacher, Student
+
+# ?type= values and the type of their results
+SEARCH_TYPES = {
+    "students": (Student, "student"),
+    "teachers": (Teacher, "teacher"),
+    "admins": (Administrator, "administrator"),
+}
+
+# The expression of the <model>_name_search_idx GIN indexes, the queries have to
+# use the same one for them to be used
+NAME_VECTOR_SQL = "to_tsvector('simple'::regconfig, COALESCE(name, ''))"
+RANK_SQL = f"ts_rank({NAME_VECTOR_SQL}, query) + CASE WHEN lower(name) LIKE %(prefix)s THEN 1 ELSE 0 END"
+
+# A single term shorter than this matches too many names for all of them to be
+# ranked, so it's only looked for at the start of the names, in the
+# <model>_name_prefix_idx pattern ops indexes
+SHORT_PREFIX_LENGTH = 3
+
+
+def search_terms(text):
+    return re.findall(r"\w+", text)
+
+
+def search_sql(table, type_name, school_ids):
+    """
+    The `limit` best matches of one table, ranked by the ts_rank of the name
+    plus 1 when the name starts with the whole text, so "Ali" lists "Ali Smith"
+    before "Bob Ali". Every match is ranked, so the best ones can't be left out
+    and the same data always gives the same results.
+    """
+    school = "AND school_id = ANY(%(school_ids)s)" if school_ids else ""
+    return (
+        f"(SELECT '{type_name}' AS type, id, name, school_id, "
+        f"{RANK_SQL} AS rank "
+        f"FROM {table}, to_tsquery('simple', %(query)s) query "
+        f"WHERE {NAME_VECTOR_SQL} @@ to_tsquery('simple', %(query)s) {school} "
+        f"ORDER BY rank DESC, name, id LIMIT %(limit)s)"
+    )
+
+
+def short_prefix_sql(table, type_name, school_ids, patterns):
+    """
+    The first `limit` names of one table starting with each of the case
+    variants of a short prefix, in the byte order of the pattern ops index so
+    each is a range scan stopped after `limit` rows, ranked like search_sql()
+    """
+    school = "AND school_id = ANY(%(school_ids)s)" if school_ids else ""
+    return " UNION ALL ".join(
+        f"(SELECT '{type_name}' AS type, id, name, school_id, {RANK_SQL} AS rank "
+        f"FROM {table}, to_tsquery('simple', %(query)s) query "
+        f"WHERE name LIKE %({pattern})s {school} "
+        f"ORDER BY name USING ~<~ LIMIT %(limit)s)"
+        for pattern in patterns
+    )
+
+
+def search_names(text, types=SEARCH_TYPES, school_ids=None, limit=20):
+    """
+    The `limit` best matches of `text` among the names of the given types, as
+    dicts of type, id, name, school_id and rank, in one UNION ALL query. Every
+    term is a word prefix, "ali smi" finds "Alice Smith", except a single term
+    of one or two characters, which only finds the names starting with it.
+    """
+    terms = search_terms(text)
+    if not terms or not types:
+        return []
+    params = {
+        # Made of word characters only, so the terms can't be tsquery operators,
+        # and "_" is the only LIKE wildcard they can contain
+        "query": " & ".join(f"{term}:*" for term in terms),
+        "prefix": " ".join(terms).lower().replace("_", r"\_") + "%",
+        "school_ids": school_ids, "limit": limit,
+    }
+    patterns = []
+    if len(terms) == 1 and len(terms[0]) < SHORT_PREFIX_LENGTH:
+        # The pattern ops indexes are case sensitive: one range per case variant
+        variants = sorted({"".join(chars) for chars in product(*({c.lower(), c.upper()} for c in terms[0]))})
+        for index, variant in enumerate(variants):
+            patterns.append(f"pattern_{index}")
+            params[patterns[-1]] = variant.replace("_", r"\_") + "%"
+    parts = []
+    for key in types:
+        model, type_name = SEARCH_TYPES[key]
+        if patterns:
+            parts.append(short_prefix_sql(model._meta.db_table, type_name, school_ids, patterns))
+        else:
+            parts.append(search_sql(model._meta.db_table, type_name, school_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"{' UNION ALL '.join(parts)} ORDER BY rank DESC, name, type, id LIMIT %(limit)s", params
+        )
+        columns = [column.name for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -1,6 +1,8 @@
+from django.db import transaction
 from rest_framework import serializers
 
-from core.models import School, Course, Administrator, Teacher, Student
+from core.cache import invalidate_schools
+from core.models import School, SchoolStats, Course, Administrator, Teacher, Student, Enrollment
 
 
 class SchoolSerializer(serializers.ModelSerializer):
@@ -9,129 +11,239 @@ class SchoolSerializer(serializers.ModelSerializer):
         fields = ["name", "address"]
 
 
-class AdministratorSerializer(serializers.ModelSerializer):
-    school_id = serializers.IntegerField(source="school.id")
+class SchoolStatsSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="school_id")
+
+    class Meta:
+        model = SchoolStats
+        fields = ["id", "courses", "admins", "teachers", "students", "enrollments"]
+
+
+class RosterSchoolSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = School
+        fields = ["id", "name", "address"]
+
+
+class RosterPersonSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+
+
+class RosterCourseSerializer(serializers.ModelSerializer):
+    """
+    A course with its teacher and students nested, which must be loaded with
+    select_related("teacher") and a prefetch of the students
+    """
+    teacher = RosterPersonSerializer()
+    students = RosterPersonSerializer(many=True)
+
+    class Meta:
+        model = Course
+        fields = ["id", "name", "location", "teacher", "students"]
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """
+    Validates a list of rows with one `in_bulk` per referenced model and inserts
+    the valid ones with batched INSERTs, reporting the invalid ones by index
+    """
+
+    def bulk_create(self, atomic=False, batch_size=None):
+        if not isinstance(self.initial_data, list):
+            raise serializers.ValidationError({"non_field_errors": ["Expected a list of items."]})
+        if not self.initial_data:
+            raise serializers.ValidationError({"non_field_errors": ["Expected a non-empty list of items."]})
+
+        rows, errors = {}, {}
+        for index, item in enumerate(self.initial_data):
+            try:
+                rows[index] = self.child.run_validation(item)
+            except serializers.ValidationError as exc:
+                errors[index] = exc.detail
+        self.child.validate_rows(rows, errors)
+
+        instances = []
+        if rows and not (atomic and errors):
+            with transaction.atomic():
+                instances = self.child.bulk_create_rows(list(rows.values()), batch_size)
+        return instances, [{"index": index, "errors": errors[index]} for index in sorted(errors)]
+
+
+class RelatedIdSerializer(serializers.ModelSerializer):
+    """
+    Exposes foreign keys as plain `<name>_id` integers read straight from the row,
+    so serializing a page never loads the related objects
+    """
+    related_models = {}
+
+    def validate(self, attrs):
+        if isinstance(self.parent, BulkCreateListSerializer):
+            # Checked for the whole list at once by the parent
+            return attrs
+        for field, model in self.related_models.items():
+            if field in attrs and not model.objects.filter(id=attrs[field]).exists():
+                raise serializers.ValidationError(f"Invalid data for {model.__name__}")
+        return attrs
+
+    def validate_rows(self, rows, errors):
+        """
+        Check the references of the rows of a bulk create with one `in_bulk` per
+        referenced model, moving the invalid rows from `rows` to `errors`
+        """
+        for field, model in self.related_models.items():
+            existing = model.objects.only("id").in_bulk({attrs[field] for attrs in rows.values()})
+            for index in [index for index, attrs in rows.items() if attrs[field] not in existing]:
+                errors[index] = {"non_field_errors": [f"Invalid data for {model.__name__}"]}
+                del rows[index]
+
+    def bulk_create_rows(self, rows, batch_size):
+        model = self.Meta.model
+        return model.objects.bulk_create([model(**attrs) for attrs in rows], batch_size=batch_size)
+
+
+class AdministratorSerializer(RelatedIdSerializer):
+    school_id = serializers.IntegerField()
+    related_models = {"school_id": School}
+
     class Meta:
         model = Administrator
+        list_serializer_class = BulkCreateListSerializer
         fields = ["name", "school_id"]
 
-    def create(self, validated_data):
-        school_data = validated_data.pop("school")
-        try:
-            school = School.objects.get(id=school_data.get("id"))
-            admin = Administrator.objects.create(school=school, **validated_data)
-            return admin
-        except School.DoesNotExist:
-            raise serializers.ValidationError("Invalid data for School")
 
-    def update(self, instance, validated_data):
-        school_data = validated_data.pop("school")
-        try:
-            school = School.objects.get(id=school_data.get("id"))
-            instance.school = school
-            instance.name = validated_data.get("name")
-            instance.save()
-            return instance
-        except School.DoesNotExist:
-            raise serializers.ValidationError("Invalid data for School")
-
-
-class TeacherSerializer(serializers.ModelSerializer):
-    school_id = serializers.IntegerField(source="school.id")
+class TeacherSerializer(RelatedIdSerializer):
+    school_id = serializers.IntegerField()
+    related_models = {"school_id": School}
+
     class Meta:
         model = Teacher
+        list_serializer_class = BulkCreateListSerializer
         fields = ["name", "school_id"]
 
-    def create(self, validated_data):
-        school_data = validated_data.pop("school")
-        try:
-            school = School.objects.get(id=school_data.get("id"))
-            teacher = Teacher.objects.create(school=school, **validated_data)
-            return teacher
-        except School.DoesNotExist:
-            raise serializers.ValidationError("Invalid data for School")
 
-    def update(self, instance, validated_data):
-        school_data = validated_data.pop("school")
-        try:
-            school = School.objects.get(id=school_data.get("id"))
-            instance.school = school
-            instance.name = validated_data.get("name")
-            instance.save()
-            return instance
-        except School.DoesNotExist:
-            raise serializers.ValidationError("Invalid data for School")
-
-class CourseSerializer(serializers.ModelSerializer):
-    school_id = serializers.IntegerField(source="school.id")
-    teacher_id = serializers.IntegerField(source="teacher.id")
+class CourseSerializer(RelatedIdSerializer):
+    """
+    A course, which can only move to another school while nobody is enrolled in
+    it, as its students and enrollments belong to its school
+    """
+    school_id = serializers.IntegerField()
+    teacher_id = serializers.IntegerField()
+    related_models = {"school_id": School, "teacher_id": Teacher}
+
     class Meta:
         model = Course
+        list_serializer_class = BulkCreateListSerializer
         fields = ["name", "location", "school_id", "teacher_id"]
 
-    def create(self, validated_data):
-        school_data = validated_data.pop("school")
-        teacher_data = validated_data.pop("teacher")
-        try:
-            school = School.objects.get(id=school_data.get("id"))
-            teacher = Teacher.objects.get(id=teacher_data.get("id"))
-            course = Course.objects.create(school=school, teacher=teacher, **validated_data)
-            return course
-        except School.DoesNotExist:
-            raise serializers.ValidationError("Invalid data for School")
-        except Teacher.DoesNotExist:
-            raise serializers.ValidationError("Invalid data for Teacher")
-
     def update(self, instance, validated_data):
-        school_data = validated_data.pop("school")
-        teacher_data = validated_data.pop("teacher")
-        try:
-            school = School.objects.get(id=school_data.get("id"))
-            teacher = Teacher.objects.get(id=teacher_data.get("id"))
-            instance.school = school
-            instance.teacher = teacher
-            instance.name = validated_data.get("name")
-            instance.location = validated_data.get("location")
-            instance.save()
-            return instance
-        except School.DoesNotExist:
-            raise serializers.ValidationError("Invalid data for School")
-        except Teacher.DoesNotExist:
-            raise serializers.ValidationError("Invalid data for Teacher")
-
-
-class StudentSerializer(serializers.ModelSerializer):
-    school_id = serializers.IntegerField(source="school.id")
-    course_id = serializers.IntegerField(source="course.id")
+        with transaction.atomic():
+            # FOR UPDATE blocks the enrollments inserted concurrently until the move commits
+            school_id = Course.objects.select_for_update().values_list("school_id", flat=True).get(id=instance.pk)
+            moved = validated_data.get("school_id", school_id) != school_id
+            if moved and instance.enrollments.exists():
+                raise serializers.ValidationError(
+                    {"school_id": ["A course with enrolled students can't move to another school."]}
+                )
+            course = super().update(instance, validated_data)
+            if moved:
+                # The saved signal only invalidates the new school
+                invalidate_schools([school_id])
+        return course
+
+
+def set_course_ids(student, course_ids):
+    """
+    Set what `with_course_ids()` annotates on a student saved by a serializer
+    """
+    student.course_ids = course_ids
+    student.course_id = course_ids[0] if course_ids else None
+
+
+class StudentSerializer(RelatedIdSerializer):
+    """
+    A student with the sorted ids of the courses it's enrolled in, which are read
+    from the `course_ids` annotation of `Student.objects.with_course_ids()`.
+    `course_ids` replaces the enrollments on update. The former `course_id` is
+    kept for the existing clients: it reads as the first course, or null, and
+    is written as the only course when `course_ids` isn't given. A null
+    `course_id` without `course_ids` leaves the enrollments unchanged.
+    """
+    school_id = serializers.IntegerField()
+    course_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    course_id = serializers.IntegerField(required=False, allow_null=True)
+    related_models = {"school_id": School}
+
     class Meta:
         model = Student
-        fields = ["name", "school_id", "course_id"]
+        list_serializer_class = BulkCreateListSerializer
+        fields = ["name", "school_id", "course_ids", "course_id"]
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        course_id = attrs.pop("course_id", None)
+        if course_id is not None and "course_ids" not in attrs:
+            attrs["course_ids"] = [course_id]
+        if "course_ids" in attrs:
+            attrs["course_ids"] = sorted(set(attrs["course_ids"]))
+        return attrs
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if isinstance(self.parent, BulkCreateListSerializer) or not attrs.get("course_ids"):
+            return attrs
+        school_id = attrs.get("school_id", getattr(self.instance, "school_id", None))
+        offered = Course.objects.filter(id__in=attrs["course_ids"], school_id=school_id).count()
+        if offered != len(attrs["course_ids"]):
+            raise serializers.ValidationError("Invalid data for Course")
+        return attrs
+
+    def validate_rows(self, rows, errors):
+        super().validate_rows(rows, errors)
+        course_ids = {course_id for attrs in rows.values() for course_id in attrs.get("course_ids", [])}
+        schools = dict(Course.objects.filter(id__in=course_ids).values_list("id", "school_id"))
+        for index in [
+            index for index, attrs in rows.items()
+            if any(schools.get(course_id) != attrs["school_id"] for course_id in attrs.get("course_ids", []))
+        ]:
+            errors[index] = {"non_field_errors": ["Invalid data for Course"]}
+            del rows[index]
+
+    def bulk_create_rows(self, rows, batch_size):
+        course_ids = [attrs.pop("course_ids", []) for attrs in rows]
+        students = super().bulk_create_rows(rows, batch_size)
+        Enrollment.objects.bulk_create([
+            Enrollment(student_id=student.id, course_id=course_id, school_id=student.school_id)
+            for student, courses in zip(students, course_ids) for course_id in courses
+        ], batch_size=batch_size)
+        for student, courses in zip(students, course_ids):
+            set_course_ids(student, courses)
+        return students
 
     def create(self, validated_data):
-        school_data = validated_data.pop("school")
-        course_data = validated_data.pop("course")
-        try:
-            school = School.objects.get(id=school_data.get("id"))
-            course = Course.objects.get(id=course_data.get("id"))
-            student = Student.objects.create(school=school, course=course, **validated_data)
-            return student
-        except School.DoesNotExist:
-            raise serializers.ValidationError("Invalid data for School")
-        except Course.DoesNotExist:
-            raise serializers.ValidationError("Invalid data for Course")
+        course_ids = validated_data.pop("course_ids", [])
+        with transaction.atomic():
+            student = super().create(validated_data)
+            Enrollment.objects.bulk_create([
+                Enrollment(student_id=student.id, course_id=course_id, school_id=student.school_id)
+                for course_id in course_ids
+            ])
+        set_course_ids(student, course_ids)
+        return student
 
     def update(self, instance, validated_data):
-        school_data = validated_data.pop("school")
-        course_data = validated_data.pop("course")
-        try:
-            school = School.objects.get(id=school_data.get("id"))
-            course = Course.objects.get(id=course_data.get("id"))
-            instance.school = school
-            instance.course = course
-            instance.name = validated_data.get("name")
-            instance.save()
-            return instance
-        except School.DoesNotExist:
-            raise serializers.ValidationError("Invalid data for School")
-        except Course.DoesNotExist:
-            raise serializers.ValidationError("Invalid data for Course")
+        course_ids = validated_data.pop("course_ids", None)
+        with transaction.atomic():
+            student = super().update(instance, validated_data)
+            # Students moved to another school leave the courses of the previous one
+            student.enrollments.exclude(school_id=student.school_id).delete()
+            if course_ids is not None:
+                student.enrollments.exclude(course_id__in=course_ids).delete()
+                Enrollment.objects.bulk_create([
+                    Enrollment(student_id=student.id, course_id=course_id, school_id=student.school_id)
+                    for course_id in course_ids
+                ], ignore_conflicts=True)
+                set_course_ids(student, course_ids)
+            else:
+                set_course_ids(student, sorted(student.enrollments.values_list("course_id", flat=True)))
+        return student
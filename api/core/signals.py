@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.cache import invalidate_schools, school_id_of
+from core.models import School, Administrator, Teacher, Course, Student
+
+
+@receiver(post_save, sender=School)
+@receiver(post_save, sender=Administrator)
+@receiver(post_save, sender=Teacher)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Student)
+def invalidate_saved_school(sender, instance, **kwargs):
+    """
+    Start a new cache generation for the school of every saved row. Deletes,
+    bulk writes and transfers invalidate explicitly where they happen, in the
+    viewsets and the admin, as delete signals would stop Django from
+    fast-deleting cascaded rows.
+    """
+    invalidate_schools([school_id_of(instance)])
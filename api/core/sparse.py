@@ -0,0 +1,83 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsMixin:
+    """
+    `?fields=name,school_id` or `?exclude=address` on the list and detail GETs:
+    the serializer only renders those fields and the queryset only selects the
+    columns they are read from, plus the primary key, the ordering columns that
+    keyset cursors are built from and `updated_at` for the ETags.
+    """
+    fields_query_param = "fields"
+    exclude_query_param = "exclude"
+    sparse_actions = ("list", "retrieve")
+    always_loaded = ("updated_at",)
+
+    def requested_fields(self):
+        """
+        The names of the serializer fields to render, or None for all of them
+        """
+        if "sparse_fields" not in self.__dict__:
+            self.sparse_fields = self.parse_requested_fields() if self.action in self.sparse_actions else None
+        return self.sparse_fields
+
+    def parse_requested_fields(self):
+        params = {
+            param: self.request.query_params.get(param) for param in (self.fields_query_param, self.exclude_query_param)
+        }
+        if all(value is None for value in params.values()):
+            return None
+
+        readable = {name: field for name, field in self.get_serializer_class()().fields.items() if not field.write_only}
+        errors, names = {}, {}
+        for param, value in params.items():
+            if value is None:
+                continue
+            names[param] = list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+            unknown = [name for name in names[param] if name not in readable]
+            if not names[param]:
+                errors[param] = ["Expected a comma separated list of fields."]
+            elif unknown:
+                errors[param] = [f"Unknown fields: {', '.join(unknown)}. Expected some of {', '.join(readable)}."]
+        if errors:
+            raise ValidationError(errors)
+
+        selected = names.get(self.fields_query_param, readable)
+        excluded = names.get(self.exclude_query_param, [])
+        self.sparse_sources = {name: field.source for name, field in readable.items()}
+        return [name for name in readable if name in selected and name not in excluded]
+
+    def sparse_columns(self, queryset, fields):
+        """
+        The model fields to load for the serializer `fields`. Fields that aren't
+        columns, such as the `course_ids` annotation, are left to the queryset.
+        """
+        opts = queryset.model._meta
+        ordering = queryset.query.order_by or opts.ordering
+        columns = [*self.always_loaded, *(field.lstrip("-") for field in ordering if field.lstrip("-") != "pk")]
+        for name in fields:
+            try:
+                # Also finds the `school_id` attname of `school`
+                field = opts.get_field(self.sparse_sources[name])
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.many_to_many:
+                columns.append(field.name)
+        return columns
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.requested_fields()
+        if fields is None:
+            return queryset
+        return queryset.only(*self.sparse_columns(queryset, fields))
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.requested_fields()
+        if fields is not None:
+            child = getattr(serializer, "child", serializer)
+            for name in [name for name in child.fields if name not in fields]:
+                del child.fields[name]
+        return serializer
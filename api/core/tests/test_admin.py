@@ -2,6 +2,7 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from core.models import School, Administrator
+from new_app.instrumentation import query_budget
 
 
 class AdministratorTests(APITestCase):
@@ -28,6 +29,7 @@ class AdministratorTests(APITestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @query_budget(2)
     def test_get_all_administrators(self):
         """
         Ensure we can get all administrators
@@ -39,6 +41,7 @@ class AdministratorTests(APITestCase):
         self.assertEqual(response.data['results'][0]['name'], 'Admin')
         self.assertEqual(response.data['results'][1]['name'], 'Second Admin')
 
+    @query_budget(2)
     def test_get_administrator(self):
         """
         Ensure we can get an administrator's detail
@@ -79,3 +82,17 @@ class AdministratorTests(APITestCase):
         url = reverse('administrator-detail', kwargs={'pk': 0})
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_administrators_query_count(self):
+        """
+        Ensure the list and detail endpoints run a fixed number of queries whatever the page size
+        """
+        Administrator.objects.bulk_create([Administrator(name=f'Admin {i:02}', school=self.school) for i in range(20)])
+        url = reverse('administrator-list')
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 22)
+
+        url = reverse('administrator-detail', kwargs={'pk': self.administrator.id})
+        with self.assertNumQueries(1):
+            self.client.get(url)
@@ -0,0 +1,98 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School, Administrator, Teacher, Course, Student, Enrollment
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        """
+        Create two schools with a row of every model to use them for the tests
+        """
+        self.schools = [
+            School.objects.create(name=f'School {index}', address='Test Address') for index in range(2)
+        ]
+        for school in self.schools:
+            Administrator.objects.create(name='Admin', school=school)
+            teacher = Teacher.objects.create(name='Teacher', school=school)
+            course = Course.objects.create(name='Course', location='Room 1', school=school, teacher=teacher)
+            for name in ('Bob', 'Alice', 'Carol'):
+                student = Student.objects.create(name=name, school=school)
+                Enrollment.objects.create(student=student, course=course, school=school)
+
+    def assertSameResponse(self, sync_url, async_url, query=''):
+        sync_response = self.client.get(sync_url + query)
+        async_response = self.client.get(async_url + query)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response['Content-Type'], sync_response['Content-Type'])
+        self.assertEqual(async_response.content, sync_response.content.replace(b'/api/', b'/api/async/'))
+
+    def test_list_matches_sync_route(self):
+        """
+        Ensure the async list routes return the same pages as the sync ones
+        """
+        for basename in ('school', 'administrator', 'teacher', 'course', 'student'):
+            with self.subTest(basename):
+                sync_url, async_url = reverse(f'{basename}-list'), reverse(f'async-{basename}-list')
+                self.assertSameResponse(sync_url, async_url)
+                self.assertSameResponse(sync_url, async_url, '?limit=2&offset=1')
+                self.assertSameResponse(sync_url, async_url, '?cursor=&limit=2&count=true')
+
+    def test_retrieve_matches_sync_route(self):
+        """
+        Ensure the async detail routes return the same objects, and 404 for unknown or filtered out ones
+        """
+        student = Student.objects.filter(school=self.schools[0]).first()
+        self.assertSameResponse(
+            reverse('student-detail', kwargs={'pk': student.id}),
+            reverse('async-student-detail', kwargs={'pk': student.id})
+        )
+        self.assertSameResponse(reverse('school-detail', kwargs={'pk': 0}), reverse('async-school-detail', kwargs={'pk': 0}))
+        self.assertSameResponse(
+            reverse('student-detail', kwargs={'pk': student.id}),
+            reverse('async-student-detail', kwargs={'pk': student.id}), f'?school={self.schools[1].id}'
+        )
+        response = self.client.get(reverse('async-student-detail', kwargs={'pk': 0}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json(), self.client.get(reverse('student-detail', kwargs={'pk': 0})).json())
+
+    def test_errors_match_sync_route(self):
+        """
+        Ensure invalid filters, fields and cursors get the same 400 and 404 errors as on the sync routes
+        """
+        sync_url, async_url = reverse('student-list'), reverse('async-student-list')
+        for query, status_code in [
+            ('?school=abc', status.HTTP_400_BAD_REQUEST),
+            ('?fields=bogus', status.HTTP_400_BAD_REQUEST),
+            ('?cursor=zzz', status.HTTP_404_NOT_FOUND),
+            # {"p":["a","x"]}, an id that isn't a number
+            ('?cursor=eyJwIjpbImEiLCJ4Il19', status.HTTP_404_NOT_FOUND),
+        ]:
+            with self.subTest(query):
+                self.assertEqual(self.client.get(async_url + query).status_code, status_code)
+                self.assertSameResponse(sync_url, async_url, query)
+        response = self.client.get(async_url + '?school=abc')
+        self.assertEqual(response.json(), {'school': ['Enter a number.']})
+
+    def test_stats_matches_sync_route(self):
+        """
+        Ensure the async stats route reads the same counters
+        """
+        school = self.schools[0]
+        self.assertSameResponse(
+            reverse('school-stats', kwargs={'pk': school.id}),
+            reverse('async-school-stats', kwargs={'pk': school.id})
+        )
+        self.assertSameResponse(reverse('school-stats', kwargs={'pk': 0}), reverse('async-school-stats', kwargs={'pk': 0}))
+
+    async def test_list_under_asgi(self):
+        """
+        Ensure the async routes are served natively by the ASGI handler
+        """
+        response = await self.async_client.get(reverse('async-student-list'), {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['count'], 6)
+        self.assertEqual([student['name'] for student in data['results']], ['Alice', 'Alice'])
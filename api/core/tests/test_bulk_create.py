@@ -0,0 +1,130 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School, SchoolStats, Administrator, Teacher, Course, Student
+from core.serializers import CourseSerializer
+
+
+class BulkCreateTests(APITestCase):
+    def setUp(self):
+        """
+        Create school, teacher and course objects to use them for the tests
+        """
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        self.teacher = Teacher.objects.create(name='Teacher 1', school=self.school)
+        self.course = Course.objects.create(
+            name='Course 1', location='Room 1',
+            school=self.school, teacher=self.teacher
+        )
+
+    def students(self, count):
+        return [
+            {'name': f'Student {i}', 'school_id': self.school.id, 'course_id': self.course.id}
+            for i in range(count)
+        ]
+
+    def test_bulk_create_students(self):
+        """
+        Ensure we can create many students at once and get the invalid ones reported
+        """
+        url = reverse('student-list')
+        data = self.students(3) + [
+            {'name': '', 'school_id': self.school.id, 'course_id': self.course.id},
+            {'name': 'Student 4', 'school_id': self.school.id, 'course_id': 0},
+        ]
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([student['name'] for student in response.data['created']], ['Student 0', 'Student 1', 'Student 2'])
+        self.assertEqual([error['index'] for error in response.data['errors']], [3, 4])
+        self.assertIn('name', response.data['errors'][0]['errors'])
+        self.assertEqual(response.data['errors'][1]['errors'], {'non_field_errors': ['Invalid data for Course']})
+        self.assertEqual([student['course_ids'] for student in response.data['created']], [[self.course.id]] * 3)
+        self.assertEqual(Student.objects.count(), 3)
+        stats = SchoolStats.objects.get(school=self.school)
+        self.assertEqual((stats.students, stats.enrollments), (3, 3))
+
+    def test_bulk_create_atomic(self):
+        """
+        Ensure nothing is created with ?atomic=true when any item is invalid
+        """
+        url = reverse('student-list') + '?atomic=true'
+        data = self.students(3) + [{'name': 'Student 3', 'school_id': 0, 'course_id': self.course.id}]
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['created'], [])
+        self.assertEqual(response.data['errors'], [{'index': 3, 'errors': {'non_field_errors': ['Invalid data for School']}}])
+        self.assertEqual(Student.objects.count(), 0)
+
+    def test_bulk_create_empty(self):
+        """
+        Ensure an empty list is rejected with an error saying why
+        """
+        response = self.client.post(reverse('student-list'), [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'non_field_errors': ['Expected a non-empty list of items.']})
+
+    def test_bulk_create_query_count(self):
+        """
+        Ensure the number of queries doesn't grow with the number of items
+        """
+        url = reverse('student-list')
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(url, self.students(5), format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(url, self.students(200), format='json')
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Student.objects.count(), 205)
+
+    def test_bulk_create_other_models(self):
+        """
+        Ensure admins, teachers and courses accept a list body too
+        """
+        response = self.client.post(reverse('administrator-list'), [
+            {'name': 'Admin', 'school_id': self.school.id}
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(reverse('teacher-list'), [
+            {'name': 'Teacher 2', 'school_id': self.school.id},
+            {'name': 'Teacher 3', 'school_id': self.school.id},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(reverse('course-list'), [
+            {'name': 'Course 2', 'location': 'Room 2', 'school_id': self.school.id, 'teacher_id': self.teacher.id},
+            {'name': 'Course 3', 'location': 'Room 3', 'school_id': self.school.id, 'teacher_id': 0},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['errors']), 1)
+        self.assertEqual(
+            (Administrator.objects.count(), Teacher.objects.count(), Course.objects.count()),
+            (1, 3, 2)
+        )
+
+
+class ConcurrentBulkCreateTests(TransactionTestCase):
+    def test_reference_deleted(self):
+        """
+        Ensure a row referenced by the items and deleted after their validation
+        gets a conflict, with nothing created
+        """
+        school = School.objects.create(name='Primary School', address='Test Address')
+        teacher = Teacher.objects.create(name='Teacher 1', school=school)
+        validate_rows = CourseSerializer.validate_rows
+
+        def validate_then_delete(serializer, rows, errors):
+            validate_rows(serializer, rows, errors)
+            Teacher.objects.filter(id=teacher.id).delete()
+
+        with mock.patch.object(CourseSerializer, 'validate_rows', validate_then_delete):
+            response = self.client.post(reverse('course-list'), [
+                {'name': 'Course 1', 'location': 'Room 1', 'school_id': school.id, 'teacher_id': teacher.id},
+            ], content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn('non_field_errors', response.json())
+        self.assertEqual(Course.objects.count(), 0)
@@ -0,0 +1,136 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School, Teacher, Course, Student, Enrollment
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ConditionalRequestTests(APITestCase):
+    def setUp(self):
+        """
+        Create school, course and student objects to use them for the tests
+        """
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        teacher = Teacher.objects.create(name='Teacher 1', school=self.school)
+        self.course = Course.objects.create(name='Course 1', location='Room 1', school=self.school, teacher=teacher)
+        self.student = Student.objects.create(name='Student 1', school=self.school)
+
+    def test_detail_not_modified(self):
+        """
+        Ensure a detail request matching the current ETag gets a 304 from one query
+        """
+        url = reverse('student-detail', kwargs={'pk': self.student.id})
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        self.student.name = 'Renamed'
+        self.student.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_not_modified(self):
+        """
+        Ensure list pages get a 304 until a row of the page or the count changes
+        """
+        url = reverse('student-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        cursor_etag = self.client.get(url, {'cursor': ''})['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'cursor': ''}, HTTP_IF_NONE_MATCH=cursor_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Student.objects.create(name='Student 2', school=self.school)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_stats_not_modified(self):
+        """
+        Ensure stats get a 304 while the counters are unchanged
+        """
+        url = reverse('school-stats', kwargs={'pk': self.school.id})
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Student.objects.create(name='Student 2', school=self.school)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_conditional_update(self):
+        """
+        Ensure PUT and PATCH only apply when If-Match holds the current ETag
+        """
+        url = reverse('student-detail', kwargs={'pk': self.student.id})
+        etag = self.client.get(url)['ETag']
+        data = {'name': 'First Student', 'school_id': self.school.id, 'course_id': self.course.id}
+
+        response = self.client.put(url, data, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        new_etag = response['ETag']
+        self.assertNotEqual(new_etag, etag)
+        self.assertEqual(self.client.get(url)['ETag'], new_etag)
+
+        response = self.client.patch(url, {'name': 'Lost Update'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Student.objects.get(id=self.student.id).name, 'First Student')
+
+        response = self.client.patch(url, {'name': 'Second Student'}, HTTP_IF_MATCH=new_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        url = reverse('student-detail', kwargs={'pk': 0})
+        response = self.client.patch(url, {'name': 'Missing'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_course_delete_changes_etag(self):
+        """
+        Ensure deleting a course, or the teacher of one, changes the ETags of its
+        students, whose enrollments are deleted with it
+        """
+        teacher = Teacher.objects.create(name='Teacher 2', school=self.school)
+        courses = [
+            self.course, Course.objects.create(name='Course 2', location='Room 2', school=self.school, teacher=teacher)
+        ]
+        for course in courses:
+            Enrollment.objects.create(student=self.student, course=course, school=self.school)
+        url = reverse('student-detail', kwargs={'pk': self.student.id})
+        list_url = reverse('student-list')
+
+        for delete_url, course_ids in [
+            (reverse('course-detail', kwargs={'pk': self.course.id}), [courses[1].id]),
+            (reverse('teacher-detail', kwargs={'pk': teacher.id}), []),
+        ]:
+            with self.subTest(delete_url):
+                etag, list_etag = self.client.get(url)['ETag'], self.client.get(list_url)['ETag']
+                self.assertEqual(self.client.delete(delete_url).status_code, status.HTTP_204_NO_CONTENT)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data['course_ids'], course_ids)
+                response = self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CachedConditionalRequestTests(APITestCase):
+    def test_cached_not_modified(self):
+        """
+        Ensure cached responses answer conditional requests without any query
+        """
+        school = School.objects.create(name='Primary School', address='Test Address')
+        url = reverse('school-detail', kwargs={'pk': school.id})
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['X-Cache'], 'HIT')
@@ -0,0 +1,134 @@
+from django.contrib.auth.models import User
+from django.db import connection, OperationalError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from new_app.pooled_postgresql.base import DatabaseWrapper
+from new_app.pooled_postgresql.pool import close_pools
+
+
+class ConnectionPoolTests(TestCase):
+    def setUp(self):
+        """
+        Create a pooled connection to the test database
+        """
+        self.wrapper = self.pooled_wrapper()
+
+    def tearDown(self):
+        for wrapper in self.wrappers:
+            wrapper.close()
+        close_pools(self.id())
+
+    def pooled_wrapper(self, **pool):
+        if not hasattr(self, 'wrappers'):
+            self.wrappers = []
+        settings_dict = {**connection.settings_dict, 'POOL': {'MAX_SIZE': 2, 'TIMEOUT': 0.1, **pool}}
+        wrapper = DatabaseWrapper(settings_dict, alias=self.id())
+        self.wrappers.append(wrapper)
+        return wrapper
+
+    def test_connections_are_reused(self):
+        """
+        Ensure closing a connection returns it to the pool for the next request
+        """
+        self.wrapper.ensure_connection()
+        raw = self.wrapper.connection
+        self.wrapper.close()
+
+        other = self.pooled_wrapper()
+        other.ensure_connection()
+        self.assertIs(other.connection, raw)
+        stats = other.pool.stats()
+        self.assertEqual(
+            {key: stats[key] for key in ('size', 'in_use', 'idle', 'checkouts', 'connections_opened')},
+            {'size': 1, 'in_use': 1, 'idle': 0, 'checkouts': 2, 'connections_opened': 1}
+        )
+
+    def test_checkout_times_out(self):
+        """
+        Ensure a checkout waits for a free connection and fails after the timeout
+        """
+        first, second, third = self.wrapper, self.pooled_wrapper(), self.pooled_wrapper()
+        first.ensure_connection()
+        second.ensure_connection()
+        with self.assertRaises(OperationalError):
+            third.ensure_connection()
+
+        first.close()
+        third.ensure_connection()
+        stats = third.pool.stats()
+        self.assertEqual((stats['in_use'], stats['waits'], stats['timeouts']), (2, 1, 1))
+        self.assertGreater(stats['wait_seconds'], 0)
+
+    def test_broken_connections_are_replaced(self):
+        """
+        Ensure idle connections are checked on checkout and replaced when broken
+        """
+        wrapper = self.pooled_wrapper(CHECK_INTERVAL=0)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        pid = raw.info.backend_pid
+        wrapper.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+
+        wrapper.ensure_connection()
+        self.assertIsNot(wrapper.connection, raw)
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertEqual(wrapper.pool.stats()['connections_discarded'], 1)
+
+    def test_returned_connections_are_rolled_back(self):
+        """
+        Ensure a connection returned in a transaction doesn't leak it to the next user
+        """
+        self.wrapper.ensure_connection()
+        self.wrapper.set_autocommit(False)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('CREATE TEMPORARY TABLE pool_leak (id int)')
+        self.wrapper.close()
+
+        self.wrapper.ensure_connection()
+        self.assertTrue(self.wrapper.get_autocommit())
+        with self.wrapper.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('pool_leak')")
+            self.assertIsNone(cursor.fetchone()[0])
+
+    def test_returned_connections_are_reset(self):
+        """
+        Ensure the session state of a returned connection doesn't leak to the next user
+        """
+        self.wrapper.ensure_connection()
+        raw = self.wrapper.connection
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('CREATE TEMPORARY TABLE pool_leak (id int)')
+            cursor.execute("SET statement_timeout = '1234ms'")
+            cursor.execute('SELECT pg_advisory_lock(42)')
+        self.wrapper.close()
+
+        self.wrapper.ensure_connection()
+        self.assertIs(self.wrapper.connection, raw)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('pool_leak')")
+            self.assertIsNone(cursor.fetchone()[0])
+            cursor.execute("SELECT current_setting('statement_timeout')")
+            self.assertNotEqual(cursor.fetchone()[0], '1234ms')
+            cursor.execute("SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()")
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(self.wrapper.pool.stats()['connections_discarded'], 0)
+
+
+class DatabasePoolViewTests(APITestCase):
+    def test_admin_only(self):
+        """
+        Ensure the pool stats are only shown to staff users
+        """
+        url = reverse('db-pool')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.data['pools'], list)
@@ -1,7 +1,8 @@
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
-from core.models import School, Teacher, Course
+from core.models import School, SchoolStats, Teacher, Course, Student, Enrollment
+from new_app.instrumentation import query_budget
 
 
 class CourseTests(APITestCase):
@@ -42,6 +43,7 @@ class CourseTests(APITestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @query_budget(2)
     def test_get_all_courses(self):
         """
         Ensure we can get all courses
@@ -53,6 +55,7 @@ class CourseTests(APITestCase):
         self.assertEqual(response.data['results'][0]['name'], 'Course 1')
         self.assertEqual(response.data['results'][1]['name'], 'Course 2')
 
+    @query_budget(2)
     def test_get_course(self):
         """
         Ensure we can get a course's detail
@@ -91,6 +94,28 @@ class CourseTests(APITestCase):
         response = self.client.put(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_move_course_to_another_school(self):
+        """
+        Ensure a course only moves to another school while nobody is enrolled in it
+        """
+        other_school = School.objects.create(name='Other School', address='Test Address')
+        student = Student.objects.create(name='Student 1', school=self.school)
+        enrollment = Enrollment.objects.create(student=student, course=self.course, school=self.school)
+        url = reverse('course-detail', kwargs={'pk': self.course.id})
+        data = {'name': 'Course 1', 'location': 'Room 1', 'school_id': other_school.id, 'teacher_id': self.teacher1.id}
+        response = self.client.put(url, data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('school_id', response.data)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.school_id, self.school.id)
+        self.assertEqual(SchoolStats.objects.get(school=self.school).enrollments, 1)
+
+        enrollment.delete()
+        response = self.client.put(url, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['school_id'], other_school.id)
+        self.assertEqual(SchoolStats.objects.get(school=other_school).courses, 1)
+
     def test_delete_course(self):
         """
         Ensure we can delete a course
@@ -102,3 +127,17 @@ class CourseTests(APITestCase):
         url = reverse('course-detail', kwargs={'pk': 0})
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_courses_query_count(self):
+        """
+        Ensure the list and detail endpoints run a fixed number of queries whatever the page size
+        """
+        Course.objects.bulk_create([Course(name=f'Course {i:02}', location='Room', school=self.school, teacher=self.teacher1) for i in range(20)])
+        url = reverse('course-list')
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 22)
+
+        url = reverse('course-detail', kwargs={'pk': self.course.id})
+        with self.assertNumQueries(1):
+            self.client.get(url)
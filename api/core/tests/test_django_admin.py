@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core import admin as core_admin
+from core.models import School, Teacher, Course, Administrator, Student, Enrollment
+
+
+class DjangoAdminTests(TestCase):
+    def setUp(self):
+        """
+        Log in a superuser and create two schools with their people, courses and
+        enrollments to use them for the tests
+        """
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.schools = School.objects.bulk_create([
+            School(name=f'School {i}', address='Test Address') for i in range(2)
+        ])
+        for school in self.schools:
+            self.add_rows(school, 3)
+
+    def add_rows(self, school, count):
+        Administrator.objects.bulk_create([Administrator(name=f'Admin {i}', school=school) for i in range(count)])
+        teachers = Teacher.objects.bulk_create([Teacher(name=f'Teacher {i}', school=school) for i in range(count)])
+        courses = Course.objects.bulk_create([
+            Course(name=f'Course {i}', location=f'Room {i}', school=school, teacher=teacher)
+            for i, teacher in enumerate(teachers)
+        ])
+        students = Student.objects.bulk_create([Student(name=f'Student {i}', school=school) for i in range(count)])
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, course=course, school=school) for student, course in zip(students, courses)
+        ])
+
+    def changelist(self, model, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:core_{model}_changelist'), data)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries]
+
+    def test_changelists(self):
+        """
+        Ensure the changelists run the same queries whatever the number of rows, with
+        a single count and the related rows joined
+        """
+        models = ['school', 'schoolstats', 'administrator', 'teacher', 'course', 'student', 'enrollment']
+        before = {model: len(self.changelist(model)[1]) for model in models}
+        self.add_rows(self.schools[0], 10)
+        for model in models:
+            with self.subTest(model):
+                response, queries = self.changelist(model)
+                self.assertEqual(len(queries), before[model])
+                self.assertEqual(len([sql for sql in queries if 'COUNT(*)' in sql]), 1)
+
+    def test_estimated_count(self):
+        """
+        Ensure unfiltered changelists of large tables are counted from the planner's
+        estimate, and filtered ones exactly
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_student')
+        with mock.patch.object(core_admin, 'ESTIMATED_COUNT_THRESHOLD', 0):
+            response, queries = self.changelist('student')
+            self.assertEqual(response.context['cl'].result_count, 6)
+            self.assertFalse([sql for sql in queries if 'COUNT(*)' in sql])
+
+            response, queries = self.changelist('student', {'school__id__exact': self.schools[0].id})
+            self.assertEqual(response.context['cl'].result_count, 3)
+            self.assertTrue([sql for sql in queries if 'COUNT(*)' in sql])
+
+    def test_search(self):
+        """
+        Ensure the search matches the start of the name as a whole, or the id
+        """
+        student = Student.objects.create(name='Ava Okafor', school=self.schools[0])
+        for term, expected in [('Ava Ok', [student.id]), ('Okafor', []), (str(student.id), [student.id])]:
+            with self.subTest(term):
+                response, queries = self.changelist('student', {'q': term})
+                self.assertEqual([row.id for row in response.context['cl'].result_list], expected)
+        response, queries = self.changelist('teacher', {'q': 'Teacher 1'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_change_forms(self):
+        """
+        Ensure the forms don't render every related row as a choice, which are searched instead
+        """
+        course = Course.objects.first()
+        response = self.client.get(reverse('admin:core_course_change', args=[course.id]))
+        self.assertContains(response, 'data-ajax--url', count=2)
+        self.assertNotContains(response, 'School 1</option>')
+
+        response = self.client.get(reverse('admin:core_enrollment_add'))
+        self.assertContains(response, 'vForeignKeyRawIdAdminField', count=2)
+
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'core', 'model_name': 'course', 'field_name': 'teacher', 'term': 'Teacher 2',
+        })
+        self.assertEqual([result['text'] for result in response.json()['results']], ['Teacher 2', 'Teacher 2'])
+
+    def test_delete_course(self):
+        """
+        Ensure deleting courses, one or a selection, changes the updated_at of their students
+        """
+        course, *others = Course.objects.filter(school=self.schools[0]).order_by('id')
+        enrolled = Student.objects.filter(courses__in=[course, *others]).order_by('id')
+        before = dict(enrolled.values_list('id', 'updated_at'))
+        response = self.client.post(reverse('admin:core_course_delete', args=[course.id]), {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post(reverse('admin:core_course_changelist'), {
+            'action': 'delete_selected', '_selected_action': [other.id for other in others], 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        after = dict(Student.objects.filter(id__in=before).values_list('id', 'updated_at'))
+        self.assertEqual(len(after), len(before))
+        self.assertTrue(all(after[student_id] > updated_at for student_id, updated_at in before.items()))
+
+    def test_course_school_change(self):
+        """
+        Ensure a course with enrollments can't move to another school, and one without can
+        """
+        course = Course.objects.filter(school=self.schools[0]).first()
+        url = reverse('admin:core_course_change', args=[course.id])
+        data = {
+            'name': course.name, 'location': course.location, 'school': self.schools[1].id,
+            'teacher': course.teacher_id, 'external_id': '',
+        }
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'A course with enrolled students can&#x27;t move to another school.')
+        self.assertEqual(Course.objects.get(id=course.id).school_id, self.schools[0].id)
+
+        course.enrollments.all().delete()
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Course.objects.get(id=course.id).school_id, self.schools[1].id)
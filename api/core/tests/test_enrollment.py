@@ -0,0 +1,105 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School, SchoolStats, Teacher, Course, Student, Enrollment
+
+
+class EnrollmentTests(APITestCase):
+    def setUp(self):
+        """
+        Create a school with two courses and two students, and a course of another school
+        """
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        teacher = Teacher.objects.create(name='Teacher 1', school=self.school)
+        self.course1, self.course2 = Course.objects.bulk_create([
+            Course(name=f'Course {i}', location=f'Room {i}', school=self.school, teacher=teacher) for i in range(1, 3)
+        ])
+        self.student1, self.student2 = Student.objects.bulk_create([
+            Student(name=f'Student {i}', school=self.school) for i in range(1, 3)
+        ])
+
+        other_school = School.objects.create(name='Middle School', address='Test Address 1')
+        other_teacher = Teacher.objects.create(name='Teacher 2', school=other_school)
+        self.other_course = Course.objects.create(
+            name='Course 3', location='Room 3', school=other_school, teacher=other_teacher
+        )
+
+    def pair(self, student, course_id):
+        return {'studentId': student.id, 'courseId': course_id}
+
+    def test_enroll(self):
+        """
+        Ensure students are enrolled once, only in the courses of their school
+        """
+        data = [
+            self.pair(self.student1, self.course1.id),
+            self.pair(self.student1, self.course2.id),
+            self.pair(self.student2, self.course1.id),
+            self.pair(self.student2, self.other_course.id),
+            self.pair(self.student1, 0),
+            {'studentId': 'abc'},
+        ]
+        # The counter locks, the INSERT, the updated_at bump and the transaction savepoint
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse('enrollments'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['success'] for result in response.data['results']], [True, True, True, False, False, False]
+        )
+        self.assertEqual(response.data['results'][5]['message'], 'Invalid enrollment.')
+        self.assertEqual(list(self.student1.courses.order_by('id')), [self.course1, self.course2])
+
+        response = self.client.post(reverse('enrollments'), data[:1], format='json')
+        self.assertEqual(response.data['results'][0]['success'], False)
+        self.assertEqual(SchoolStats.objects.get(school=self.school).enrollments, 3)
+
+    def test_unenroll(self):
+        """
+        Ensure unenrolling removes the enrollments and keeps the students
+        """
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, course=course, school=self.school)
+            for student in (self.student1, self.student2) for course in (self.course1, self.course2)
+        ])
+        data = [self.pair(self.student1, self.course1.id), self.pair(self.student1, self.other_course.id)]
+        response = self.client.delete(reverse('enrollments'), data, format='json')
+        self.assertEqual([result['success'] for result in response.data['results']], [True, False])
+
+        response = self.client.get(reverse('student-detail', kwargs={'pk': self.student1.id}))
+        self.assertEqual(response.data['course_ids'], [self.course2.id])
+        stats = SchoolStats.objects.get(school=self.school)
+        self.assertEqual((stats.students, stats.enrollments), (2, 3))
+
+        response = self.client.delete(reverse('enrollments'), {'studentId': self.student1.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_student_in_many_courses(self):
+        """
+        Ensure a student taking several courses is listed once with all of them
+        """
+        Enrollment.objects.bulk_create([
+            Enrollment(student=self.student1, course=course, school=self.school) for course in (self.course2, self.course1)
+        ])
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('student-list'))
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            [(student['name'], student['course_ids']) for student in response.data['results']],
+            [('Student 1', [self.course1.id, self.course2.id]), ('Student 2', [])]
+        )
+        self.assertEqual(list(self.course1.students.all()), [self.student1])
+
+    def test_school_change_leaves_courses(self):
+        """
+        Ensure moving a student to another school drops the enrollments of the previous one
+        """
+        Enrollment.objects.create(student=self.student1, course=self.course1, school=self.school)
+        url = reverse('student-detail', kwargs={'pk': self.student1.id})
+        response = self.client.patch(url, {'school_id': self.other_course.school_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['course_ids'], [])
+
+        response = self.client.patch(url, {'course_ids': [self.course1.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(url, {'course_ids': [self.other_course.id]}, format='json')
+        self.assertEqual(response.data['course_ids'], [self.other_course.id])
@@ -0,0 +1,115 @@
+import csv
+import gzip
+import json
+from io import StringIO
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School, Administrator, Teacher, Course, Student, Enrollment
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(APITestCase):
+    def setUp(self):
+        """
+        Create a school with a row of each entity and two students, plus a
+        second school whose rows must never be exported
+        """
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        self.admin = Administrator.objects.create(name='Admin', school=self.school)
+        self.teacher = Teacher.objects.create(name='Teacher', school=self.school)
+        self.course = Course.objects.create(name='Course', location='Room, 1', school=self.school, teacher=self.teacher)
+        self.students = [Student.objects.create(name=name, school=self.school) for name in ('Bob', 'Alice')]
+        self.enrollments = [
+            Enrollment.objects.create(student=student, course=self.course, school=self.school) for student in self.students
+        ]
+
+        other_school = School.objects.create(name='Middle School', address='Test Address 1')
+        other_teacher = Teacher.objects.create(name='Other Teacher', school=other_school)
+        other_course = Course.objects.create(name='Other', location='Room 2', school=other_school, teacher=other_teacher)
+        other_student = Student.objects.create(name='Other Student', school=other_school)
+        Enrollment.objects.create(student=other_student, course=other_course, school=other_school)
+
+        self.url = reverse('school-export', kwargs={'pk': self.school.id})
+
+    def test_export_csv(self):
+        """
+        Ensure the CSV export streams every entity of the school in chunks
+        """
+        response = self.client.get(self.url, {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="school-{self.school.id}.csv"')
+
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        rows = list(csv.reader(StringIO(b''.join(chunks).decode())))
+        self.assertEqual(rows, [
+            ['entity', 'id', 'name', 'school_id', 'student_id', 'course_id', 'teacher_id', 'location'],
+            ['students', str(self.students[1].id), 'Alice', str(self.school.id), '', '', '', ''],
+            ['students', str(self.students[0].id), 'Bob', str(self.school.id), '', '', '', ''],
+            *(
+                ['enrollments', str(enrollment.id), '', str(self.school.id), str(enrollment.student_id),
+                 str(self.course.id), '', '']
+                for enrollment in self.enrollments
+            ),
+            ['teachers', str(self.teacher.id), 'Teacher', str(self.school.id), '', '', '', ''],
+            ['courses', str(self.course.id), 'Course', str(self.school.id), '', '', str(self.teacher.id), 'Room, 1'],
+            ['admins', str(self.admin.id), 'Admin', str(self.school.id), '', '', '', ''],
+        ])
+
+    def test_export_ndjson_entities(self):
+        """
+        Ensure the NDJSON export only contains the requested entities, in the requested order
+        """
+        response = self.client.get(self.url, {'format': 'ndjson', 'entities': 'admins,courses'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {'entity': 'admins', 'id': self.admin.id, 'name': 'Admin', 'school_id': self.school.id,
+             'student_id': None, 'course_id': None, 'teacher_id': None, 'location': None},
+            {'entity': 'courses', 'id': self.course.id, 'name': 'Course', 'school_id': self.school.id,
+             'student_id': None, 'course_id': None, 'teacher_id': self.teacher.id, 'location': 'Room, 1'},
+        ])
+
+    def test_export_gzip(self):
+        """
+        Ensure the export is gzipped when the client accepts it
+        """
+        response = self.client.get(self.url, {'format': 'ndjson'}, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 7)
+
+    async def test_export_asgi(self):
+        """
+        Ensure the export is streamed as an async iterator under ASGI
+        """
+        response = await self.async_client.get(self.url, {'format': 'csv', 'entities': 'students'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.decode().splitlines()), 3)
+
+    def test_export_errors(self):
+        """
+        Ensure unknown entities, formats and schools are rejected
+        """
+        response = self.client.get(self.url, {'format': 'csv', 'entities': 'students,parents'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+
+        response = self.client.get(self.url, {'format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(reverse('school-export', kwargs={'pk': 0}), {'format': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
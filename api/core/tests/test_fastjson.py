@@ -0,0 +1,99 @@
+import datetime
+import io
+import uuid
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from core import fastjson
+from core.fastjson import FastJSONRenderer, FastJSONParser
+
+PAYLOADS = [
+    {'count': 2, 'next': None, 'previous': 'http://testserver/api/students?limit=2',
+     'results': ReturnList([ReturnDict({'name': 'Zoë Müller', 'school_id': 1, 'course_ids': [1, 2]}, serializer=None)],
+                           serializer=None)},
+    {'name': ['This field is required.'], 'errors': [{'index': 0, 'errors': {'x': [ErrorDetail('Invalid', 'invalid')]}}]},
+    {'rank': 0.0607927, 'tiny': 1e-05, 'small': 0.00012, 'huge': 1e16, 'negative': -2.5, 'zero': -0.0},
+    {'separators': 'line paragraph ', 'quote': '"\\/', 'control': '\x00\n\t', 'emoji': '🏫'},
+    {'big': 2 ** 64, 'negative_big': -2 ** 63 - 1},
+    {1: 'integer key', None: 'none key', 2.5: 'float key'},
+    {'at': datetime.datetime(2026, 10, 18, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+     'day': datetime.date(2026, 10, 18), 'time': datetime.time(12, 30), 'duration': datetime.timedelta(minutes=3),
+     'decimal': Decimal('1.10'), 'uuid': uuid.UUID(int=1), 'tuple': (1, 2), 'bytes': b'abc'},
+    {'next': 'http://testserver/api/students?cursor=cD1NYXJpZS1DbGFpcmU%3D', 'results': [{'name': 'Marie-Claire'}],
+     'decimal': Decimal('0.00001')},
+    [], {}, 'text', 12, True,
+]
+
+
+class FastJSONTests(SimpleTestCase):
+    def test_render_same_bytes(self):
+        """
+        Ensure the rendered bytes are the ones of DRF's JSONRenderer, with and without orjson
+        """
+        for installed in (fastjson.orjson, None):
+            with mock.patch.object(fastjson, 'orjson', installed):
+                for data in PAYLOADS:
+                    with self.subTest(data=data, orjson=installed is not None):
+                        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        for media_type in ('application/json; indent=2', None):
+            self.assertEqual(
+                FastJSONRenderer().render(PAYLOADS[0], media_type, {'indent': 4}),
+                JSONRenderer().render(PAYLOADS[0], media_type, {'indent': 4})
+            )
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    @skipIf(fastjson.orjson is None, 'orjson is not installed')
+    def test_render_once(self):
+        """
+        Ensure strings looking like floats with an exponent and nulls don't get the data rendered again
+        """
+        data = {
+            'next': 'http://testserver/api/students?cursor=cD1NYXJpZS1DbGFpcmU%3D', 'previous': None,
+            'results': [{'name': 'Marie-Claire', 'rank': 0.5, 'code': '0.00001'}],
+        }
+        with mock.patch.object(JSONRenderer, 'render', side_effect=AssertionError('rendered again')):
+            self.assertEqual(FastJSONRenderer().render(data), fastjson.orjson.dumps(data))
+            with self.assertRaisesMessage(AssertionError, 'rendered again'):
+                FastJSONRenderer().render({**data, 'rank': 1e-05})
+
+    @skipIf(fastjson.orjson is None, 'orjson is not installed')
+    def test_render_errors(self):
+        """
+        Ensure objects JSONRenderer can't render, NaN and Infinity included, raise the same error
+        """
+        data = {'object': object()}
+        with self.assertRaises(TypeError) as expected:
+            JSONRenderer().render(data)
+        with self.assertRaisesMessage(TypeError, str(expected.exception)):
+            FastJSONRenderer().render(data)
+
+        for value in (float('nan'), float('inf'), float('-inf')):
+            with self.subTest(value=value):
+                data = {'value': value, 'name': 'Marie-Claire'}
+                with self.assertRaises(ValueError) as expected:
+                    JSONRenderer().render(data)
+                with self.assertRaisesMessage(ValueError, str(expected.exception)):
+                    FastJSONRenderer().render(data)
+
+    def test_parse(self):
+        """
+        Ensure bodies are parsed to the same data, or rejected with the same message
+        """
+        def parse(parser, body):
+            try:
+                return parser.parse(io.BytesIO(body))
+            except ParseError as exc:
+                return exc.detail
+
+        bodies = [
+            b'{"studentId": 1, "courseIds": [1, 2], "name": "Zo\\u00eb \xf0\x9f\x8f\xab", "rank": 1e-05}',
+            b'[{"big": 18446744073709551616}]', b'{"nan": NaN}', b'"\\ud800"', b'{"a": 1,}', b'', b'\xff',
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                self.assertEqual(parse(FastJSONParser(), body), parse(JSONParser(), body))
@@ -0,0 +1,81 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School, Administrator, Teacher, Course, Student, Enrollment
+
+
+class FilterTests(APITestCase):
+    def setUp(self):
+        """
+        Create two schools with staff, courses and students to use them for the tests
+        """
+        self.school, self.other_school = School.objects.bulk_create([
+            School(name='Primary School', address='Test Address'),
+            School(name='Middle School', address='Test Address 1'),
+        ])
+        self.admin = Administrator.objects.create(name='Admin', school=self.school)
+        Administrator.objects.create(name='Other Admin', school=self.other_school)
+        self.teacher1, self.teacher2, self.other_teacher = Teacher.objects.bulk_create([
+            Teacher(name='Alan', school=self.school),
+            Teacher(name='Grace', school=self.school),
+            Teacher(name='Ada', school=self.other_school),
+        ])
+        self.course1, self.course2, self.other_course = Course.objects.bulk_create([
+            Course(name='Algebra', location='Room 1', school=self.school, teacher=self.teacher1),
+            Course(name='Biology', location='Room 2', school=self.school, teacher=self.teacher2),
+            Course(name='Algebra', location='Room 3', school=self.other_school, teacher=self.other_teacher),
+        ])
+        self.alice, self.bob, self.carol = Student.objects.bulk_create([
+            Student(name='Alice', school=self.school),
+            Student(name='Bob', school=self.school),
+            Student(name='Carol', school=self.other_school),
+        ])
+        Enrollment.objects.bulk_create([
+            Enrollment(student=self.alice, course=self.course1, school=self.school),
+            Enrollment(student=self.alice, course=self.course2, school=self.school),
+            Enrollment(student=self.bob, course=self.course2, school=self.school),
+            Enrollment(student=self.carol, course=self.other_course, school=self.other_school),
+        ])
+
+    def names(self, basename, **params):
+        response = self.client.get(reverse(f'{basename}-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['name'] for row in response.data['results']]
+
+    def test_filter_by_school(self):
+        """
+        Ensure staff, courses and students can be listed by school
+        """
+        self.assertEqual(self.names('administrator', school=self.school.id), ['Admin'])
+        self.assertEqual(self.names('teacher', school=self.school.id), ['Alan', 'Grace'])
+        self.assertEqual(self.names('course', school=self.other_school.id), ['Algebra'])
+        self.assertEqual(self.names('student', school=self.school.id), ['Alice', 'Bob'])
+        self.assertEqual(self.names('student', school=f'{self.school.id},{self.other_school.id}'), ['Alice', 'Bob', 'Carol'])
+
+    def test_filter_by_course_and_teacher(self):
+        """
+        Ensure students are listed once by any of their courses, and courses by teacher
+        """
+        self.assertEqual(self.names('student', course=self.course2.id), ['Alice', 'Bob'])
+        self.assertEqual(self.names('student', course=f'{self.course1.id},{self.course2.id}'), ['Alice', 'Bob'])
+        self.assertEqual(self.names('student', course=self.other_course.id, school=self.school.id), [])
+        self.assertEqual(self.names('course', teacher=self.teacher2.id), ['Biology'])
+
+    def test_filter_by_name_prefix_and_ids(self):
+        """
+        Ensure every resource can be filtered by name prefix and by a list of ids
+        """
+        self.assertEqual(self.names('school', name='Mid'), ['Middle School'])
+        self.assertEqual(self.names('teacher', name='A'), ['Alan', 'Ada'])
+        self.assertEqual(self.names('course', name='Alg', school=self.school.id), ['Algebra'])
+        self.assertEqual(self.names('student', name='a'), [])
+        self.assertEqual(self.names('student', ids=f'{self.carol.id},{self.alice.id},0'), ['Alice', 'Carol'])
+        self.assertEqual(self.names('administrator', ids=self.admin.id, name='Admin'), ['Admin'])
+
+    def test_invalid_filters(self):
+        """
+        Ensure malformed filter values are rejected instead of ignored
+        """
+        for name, params in [('student', {'school': 'abc'}), ('course', {'ids': '1,x'}), ('student', {'course': 'x'})]:
+            response = self.client.get(reverse(f'{name}-list'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
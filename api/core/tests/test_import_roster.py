@@ -0,0 +1,226 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from core.models import School, SchoolStats, Administrator, Teacher, Course, Student, Enrollment
+
+
+class ImportRosterTests(TestCase):
+    def setUp(self):
+        """
+        Write a roster of two schools to CSV and NDJSON files
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.files = {
+            'schools': self.write_csv('schools.csv', [
+                ['external_id', 'name', 'address'],
+                ['S1', 'Primary School', 'Test Address'],
+                ['S2', 'Middle School', 'Test Address, 1'],
+            ]),
+            'teachers': self.write_ndjson('teachers.ndjson', [
+                {'external_id': 'T1', 'name': 'Teacher 1', 'school_external_id': 'S1'},
+                {'external_id': 'T2', 'name': 'Teacher 2', 'school_external_id': 'S2'},
+            ]),
+            'admins': self.write_csv('admins.csv', [
+                ['name', 'school_external_id', 'external_id'],
+                ['Admin 1', 'S1', 'A1'],
+            ]),
+            'courses': self.write_ndjson('courses.ndjson', [
+                {'external_id': 'C1', 'name': 'Course 1', 'location': 'Room 1',
+                 'school_external_id': 'S1', 'teacher_external_id': 'T1'},
+                {'external_id': 'C2', 'name': 'Course 2', 'location': 'Room 2',
+                 'school_external_id': 'S2', 'teacher_external_id': 'T2'},
+            ]),
+            'students': self.write_csv('students.csv', [
+                ['external_id', 'name', 'school_external_id', 'course_external_id'],
+                ['P1', 'Student 1', 'S1', 'C1'],
+                ['P2', 'Student 2', 'S1', 'C1'],
+                ['P3', 'Student 3', 'S2', 'C2'],
+            ]),
+        }
+
+    def write_csv(self, name, rows):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.writelines(','.join(f'"{value}"' if ',' in value else value for value in row) + '\n' for row in rows)
+        return path
+
+    def write_ndjson(self, name, items):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.writelines(json.dumps(item) + '\n' for item in items)
+        return path
+
+    def import_roster(self, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_roster', stdout=out, stderr=err, **{**self.files, **options})
+        return out.getvalue(), err.getvalue()
+
+    def test_import(self):
+        """
+        Ensure every file is merged with its references resolved through the external ids
+        """
+        out, err = self.import_roster()
+        self.assertIn('students: 3 inserted, 0 updated, 0 unchanged', out)
+        self.assertIn('students: read 100%', out)
+        self.assertIn('Imported 10 row(s)', out)
+
+        school = School.objects.get(external_id='S2')
+        self.assertEqual(school.address, 'Test Address, 1')
+        course = Course.objects.get(external_id='C1')
+        self.assertEqual(course.teacher, Teacher.objects.get(external_id='T1'))
+        self.assertEqual(Administrator.objects.get(external_id='A1').school.external_id, 'S1')
+        self.assertEqual(
+            list(course.students.order_by('external_id').values_list('external_id', 'school__external_id')),
+            [('P1', 'S1'), ('P2', 'S1')]
+        )
+        stats = SchoolStats.objects.get(school__external_id='S1')
+        self.assertEqual((stats.courses, stats.admins, stats.teachers, stats.students, stats.enrollments), (1, 1, 1, 2, 2))
+
+    def test_invalid_rows_are_reported(self):
+        """
+        Ensure invalid rows are listed by row and nothing is imported
+        """
+        self.files['students'] = self.write_csv('students.csv', [
+            ['external_id', 'name', 'school_external_id', 'course_external_id'],
+            ['P1', 'Student 1', 'S1', 'C1'],
+            ['P1', 'Student 2', 'S1', 'C1'],
+            ['P3', '', 'S1', 'C1'],
+            ['P4', 'Student 4', 'S1', 'C9'],
+        ])
+        with self.assertRaisesMessage(CommandError, '4 invalid row(s), nothing was imported'):
+            self.import_roster(max_errors=3)
+        self.assertFalse(School.objects.exists())
+
+        err = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('import_roster', stdout=StringIO(), stderr=err, **self.files, max_errors=3)
+        self.assertEqual(err.getvalue().splitlines(), [
+            'students row 1: duplicate external_id P1',
+            'students row 2: duplicate external_id P1',
+            'students row 3: missing name',
+            'students: 1 more invalid row(s)',
+        ])
+
+    def test_existing_rows_need_upsert(self):
+        """
+        Ensure rows that already exist are rejected without --upsert and updated with it
+        """
+        self.import_roster()
+        with self.assertRaises(CommandError):
+            self.import_roster()
+
+        self.files['students'] = self.write_csv('students.csv', [
+            ['external_id', 'name', 'school_external_id', 'course_external_id'],
+            ['P1', 'Student 1', 'S1', 'C1'],
+            ['P2', 'Student 2', 'S2', 'C2'],
+            ['P4', 'Student 4', 'S2', 'C2'],
+        ])
+        out, err = self.import_roster(upsert=True)
+        self.assertIn('schools: 0 inserted, 0 updated, 2 unchanged', out)
+        self.assertIn('students: 1 inserted, 1 updated, 1 unchanged', out)
+        self.assertEqual(
+            list(Student.objects.get(external_id='P2').courses.values_list('external_id', flat=True)), ['C2']
+        )
+        self.assertEqual(SchoolStats.objects.get(school__external_id='S1').students, 1)
+        self.assertEqual(SchoolStats.objects.get(school__external_id='S2').students, 3)
+
+    def test_courses_stay_in_their_school(self):
+        """
+        Ensure a course can't be taught by a teacher of another school, nor move
+        to another school once students are enrolled in it
+        """
+        self.import_roster()
+        del self.files['students']
+        Course.objects.create(
+            external_id='C3', name='Course 3', location='Room 3',
+            school=School.objects.get(external_id='S1'), teacher=Teacher.objects.get(external_id='T1')
+        )
+        self.files['courses'] = self.write_ndjson('courses.ndjson', [
+            {'external_id': 'C1', 'name': 'Course 1', 'location': 'Room 1',
+             'school_external_id': 'S2', 'teacher_external_id': 'T2'},
+            {'external_id': 'C2', 'name': 'Course 2', 'location': 'Room 2',
+             'school_external_id': 'S2', 'teacher_external_id': 'T1'},
+            {'external_id': 'C3', 'name': 'Course 3', 'location': 'Room 3',
+             'school_external_id': 'S2', 'teacher_external_id': 'T2'},
+        ])
+        err = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('import_roster', stdout=StringIO(), stderr=err, **self.files, upsert=True)
+        self.assertEqual(err.getvalue().splitlines(), [
+            "courses row 1: course C1 has enrolled students, it can't move to another school",
+            'courses row 2: teacher T1 is from another school',
+        ])
+        self.assertEqual(Course.objects.get(external_id='C1').school.external_id, 'S1')
+
+        self.files['courses'] = self.write_ndjson('courses.ndjson', [
+            {'external_id': 'C3', 'name': 'Course 3', 'location': 'Room 3',
+             'school_external_id': 'S2', 'teacher_external_id': 'T2'},
+        ])
+        out, err = self.import_roster(upsert=True)
+        self.assertIn('courses: 0 inserted, 1 updated, 0 unchanged', out)
+        self.assertEqual(Course.objects.get(external_id='C3').school.external_id, 'S2')
+
+    def test_import_enrollments(self):
+        """
+        Ensure an enrollments file adds the missing enrollments of known students
+        in courses of their school
+        """
+        self.import_roster()
+        course = Course.objects.create(
+            external_id='C3', name='Course 3', location='Room 3',
+            school=School.objects.get(external_id='S1'), teacher=Teacher.objects.get(external_id='T1')
+        )
+        files = {'enrollments': self.write_csv('enrollments.csv', [
+            ['student_external_id', 'course_external_id'],
+            ['P1', 'C3'],
+            ['P3', 'C1'],
+            ['P4', 'C1'],
+        ])}
+        err = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('import_roster', stdout=StringIO(), stderr=err, **files)
+        self.assertEqual(err.getvalue().splitlines(), [
+            'enrollments row 2: course C1 is offered by another school',
+            'enrollments row 3: unknown student P4',
+        ])
+
+        files['enrollments'] = self.write_csv('enrollments.csv', [
+            ['student_external_id', 'course_external_id'],
+            ['P1', 'C3'],
+            ['P2', 'C3'],
+            ['P1', 'C1'],
+        ])
+        out = StringIO()
+        call_command('import_roster', stdout=out, stderr=StringIO(), **files)
+        self.assertIn('enrollments: 2 inserted, 0 updated, 1 unchanged', out.getvalue())
+        self.assertEqual(
+            list(course.students.order_by('external_id').values_list('external_id', flat=True)), ['P1', 'P2']
+        )
+        self.assertEqual(Enrollment.objects.filter(school=course.school).count(), 4)
+
+    def test_dry_run(self):
+        """
+        Ensure a dry run validates the files without writing anything
+        """
+        out, err = self.import_roster(dry_run=True)
+        self.assertIn('Dry run: 10 valid row(s), nothing was written', out)
+        self.assertFalse(School.objects.exists())
+        self.assertFalse(Student.objects.exists())
+
+    def test_invalid_files(self):
+        """
+        Ensure files with unexpected columns or content are rejected
+        """
+        with self.assertRaisesMessage(CommandError, 'expected the CSV columns'):
+            call_command('import_roster', schools=self.write_csv('bad.csv', [['id', 'name']]), stdout=StringIO())
+        path = os.path.join(self.directory.name, 'bad.ndjson')
+        with open(path, 'w') as file:
+            file.write('{"external_id": "S1", "name": "School", "address": "Address"}\n\n{\n')
+        with self.assertRaisesMessage(CommandError, 'schools row 2: invalid JSON'):
+            call_command('import_roster', schools=path, stdout=StringIO())
+        self.assertFalse(School.objects.exists())
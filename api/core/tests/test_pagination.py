@@ -0,0 +1,97 @@
+import json
+from base64 import urlsafe_b64encode
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School, Student
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        """
+        Create students sharing names so pages have to break ties on the id
+        """
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        Student.objects.bulk_create([
+            Student(name=f'Student {i % 4}', school=self.school) for i in range(23)
+        ])
+
+    def test_cursor_pages_forward_and_backward(self):
+        """
+        Ensure walking the cursor links returns every student once in (name, id) order
+        """
+        url = reverse('student-list') + '?cursor=&limit=5'
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+
+        pages = []
+        while url:
+            response = self.client.get(url)
+            pages.append([student['name'] for student in response.data['results']])
+            last_url, url = url, response.data['next']
+        self.assertEqual(len(pages), 5)
+        self.assertEqual(sum(pages, []), [student.name for student in Student.objects.order_by('name', 'id')])
+
+        backwards = []
+        url = last_url
+        while url:
+            response = self.client.get(url)
+            backwards.insert(0, [student['name'] for student in response.data['results']])
+            url = response.data['previous']
+        self.assertEqual(backwards, pages)
+
+    def test_cursor_count_on_demand(self):
+        """
+        Ensure the total count is only computed when asked for
+        """
+        url = reverse('student-list') + '?cursor=&count=true'
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.data['count'], 23)
+        self.assertEqual(len(response.data['results']), 23)
+
+    def test_cursor_on_id_ordered_viewsets(self):
+        """
+        Ensure viewsets without a model ordering page on the id
+        """
+        for name in range(30):
+            School.objects.create(name=f'School {name}', address='Test Address')
+        response = self.client.get(reverse('school-list') + '?cursor=&limit=20')
+        first_page = [school['name'] for school in response.data['results']]
+        response = self.client.get(response.data['next'])
+        second_page = [school['name'] for school in response.data['results']]
+        self.assertEqual(first_page + second_page, list(School.objects.order_by('id').values_list('name', flat=True)))
+
+        response = self.client.get(reverse('school-bulk-stats') + '?cursor=&limit=20')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_limit_offset_still_supported(self):
+        """
+        Ensure requests without a cursor keep the limit/offset behaviour
+        """
+        response = self.client.get(reverse('student-list'), {'limit': 5, 'offset': 20})
+        self.assertEqual(response.data['count'], 23)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_invalid_cursor(self):
+        """
+        Ensure a malformed cursor is rejected
+        """
+        response = self.client.get(reverse('student-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self):
+        """
+        Ensure a well formed cursor with values of the wrong type is rejected
+        """
+        for position in [['a', 'x'], ['a', [1]], ['a', None]]:
+            cursor = urlsafe_b64encode(json.dumps({'p': position}).encode()).decode()
+            with self.subTest(position):
+                response = self.client.get(reverse('student-list'), {'cursor': cursor})
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+                response = self.client.get(reverse('async-student-list'), {'cursor': cursor})
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,222 @@
+import json
+
+from django.contrib import admin
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from core.models import School, Administrator, Teacher, Course, Student, Enrollment
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class QueryPlanTests(APITestCase):
+    """
+    Run EXPLAIN on the queries behind the hot paths with sequential scans and
+    sorts disabled: if one still shows up, no index can serve that query.
+    """
+    forbidden_nodes = {"Seq Scan", "Sort", "Incremental Sort"}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.schools = School.objects.bulk_create([
+            School(name=f'School {i}', address='Test Address') for i in range(3)
+        ])
+        for school in cls.schools:
+            Administrator.objects.bulk_create([Administrator(name=f'Admin {i}', school=school) for i in range(5)])
+            teachers = Teacher.objects.bulk_create([Teacher(name=f'Teacher {i}', school=school) for i in range(20)])
+            courses = Course.objects.bulk_create([
+                Course(name=f'Course {i}', location=f'Room {i}', school=school, teacher=teacher)
+                for i, teacher in enumerate(teachers)
+            ])
+            students = Student.objects.bulk_create([
+                Student(name=f'Student {i % 400}', school=school) for i in range(1000)
+            ])
+            Enrollment.objects.bulk_create([
+                Enrollment(student=student, course=courses[(i + offset) % len(courses)], school=school)
+                for i, student in enumerate(students) for offset in range(2)
+            ])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        cls.school = cls.schools[0]
+        cls.course = Course.objects.filter(school=cls.school).first()
+        cls.student = Student.objects.filter(courses=cls.course).first()
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+
+    def plan_nodes(self, plan):
+        yield plan
+        for child in plan.get("Plans", []):
+            yield from self.plan_nodes(child)
+
+    def assertIndexedPlan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = {node["Node Type"] for node in self.plan_nodes(plan[0]["Plan"])}
+        self.assertFalse(nodes & self.forbidden_nodes, f"Unindexed plan for: {sql}\n{json.dumps(plan, indent=2)}")
+
+    def assertRequestUsesIndex(self, url, data, *indexes):
+        """
+        Assert every statement of a GET filtering on the columns of `indexes`
+        reads one of them, with sorts allowed as a filtered page may be ordered
+        on other columns
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200, response.data)
+        statements = [query["sql"] for query in queries if query["sql"].lstrip("(").startswith("SELECT")]
+        self.assertTrue(statements)
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_sort = on")
+            for sql in statements:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                nodes = list(self.plan_nodes(plan[0]["Plan"]))
+                used = {node.get("Index Name") for node in nodes}
+                self.assertTrue(used & set(indexes), f"{', '.join(indexes)} unused by: {sql}")
+                self.assertNotIn("Seq Scan", {node["Node Type"] for node in nodes}, sql)
+
+    def assertIndexedRequest(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 400, response.data)
+        statements = [query["sql"] for query in queries if query["sql"].startswith(("SELECT", "UPDATE", "DELETE", "WITH"))]
+        self.assertTrue(statements)
+        for sql in statements:
+            self.assertIndexedPlan(sql)
+
+    def test_list_endpoints(self):
+        """
+        Ensure the cursor paginated lists walk an index in order
+        """
+        for name in ['school', 'course', 'administrator', 'teacher', 'student']:
+            url = reverse(f'{name}-list')
+            response = self.client.get(url, {'cursor': '', 'limit': 2})
+            self.assertIndexedRequest('get', url, {'cursor': '', 'limit': 2})
+            self.assertIndexedRequest('get', response.data['next'])
+
+    def test_detail_endpoints(self):
+        """
+        Ensure the detail and stats endpoints are primary key lookups
+        """
+        self.assertIndexedRequest('get', reverse('student-detail', kwargs={'pk': self.student.id}))
+        self.assertIndexedRequest('get', reverse('course-detail', kwargs={'pk': self.course.id}))
+        self.assertIndexedRequest('get', reverse('school-stats', kwargs={'pk': self.school.id}))
+        self.assertIndexedRequest('get', reverse('school-bulk-stats'), {'ids': f'{self.school.id},{self.schools[1].id}'})
+
+    def test_filters(self):
+        """
+        Ensure each list filter is served by its index
+        """
+        school_id = self.school.id
+        filters = [
+            ('school-list', {'name': 'School 1'}, 'school_name_prefix_idx'),
+            ('administrator-list', {'school': school_id}, 'administrator_school_id_idx'),
+            ('teacher-list', {'school': school_id}, 'teacher_school_id_idx'),
+            ('teacher-list', {'name': 'Teacher 19'}, 'teacher_name_prefix_idx'),
+            ('course-list', {'school': school_id}, 'course_school_id_idx'),
+            ('course-list', {'teacher': self.course.teacher_id}, 'course_teacher_id_idx'),
+            ('course-list', {'name': 'Course 19'}, 'course_name_prefix_idx'),
+            ('student-list', {'school': school_id}, 'student_school_name_idx'),
+            ('student-list', {'course': self.course.id}, 'enrollment_course_student_idx'),
+            # A database with the C collation can use the plain (name, id) index too
+            ('student-list', {'name': 'Student 39'}, 'student_name_prefix_idx', 'student_name_idx'),
+            ('student-list', {'ids': f'{self.student.id},{self.student.id + 1}'}, 'core_student_pkey'),
+        ]
+        for name, data, *indexes in filters:
+            with self.subTest(name, **data):
+                self.assertRequestUsesIndex(reverse(name), data, *indexes)
+                self.assertRequestUsesIndex(reverse(name), {**data, 'cursor': ''}, *indexes)
+
+    def test_search(self):
+        """
+        Ensure the name search reads the GIN index of every type it searches, or
+        the school one when narrowed to a school
+        """
+        for name, school_index in [
+            ('student', 'student_school_name_idx'), ('teacher', 'teacher_school_id_idx'),
+            ('administrator', 'administrator_school_id_idx'),
+        ]:
+            with self.subTest(name):
+                index = f'{name}_name_search_idx'
+                self.assertRequestUsesIndex(reverse('search'), {'q': 'stud 39'}, index)
+                self.assertRequestUsesIndex(reverse('search'), {'q': 'teach', 'school': self.school.id}, index, school_index)
+
+    def test_short_prefix_search(self):
+        """
+        Ensure a one letter search reads the name prefix index of every type
+        instead of ranking every name containing a word starting with it
+        """
+        for name, key in [('student', 'students'), ('teacher', 'teachers'), ('administrator', 'admins')]:
+            with self.subTest(name):
+                index = f'{name}_name_prefix_idx'
+                self.assertRequestUsesIndex(reverse('search'), {'q': 's', 'type': key}, index)
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(reverse('search'), {'q': 's', 'type': key})
+                with connection.cursor() as cursor:
+                    cursor.execute(f"EXPLAIN (FORMAT JSON) {queries[-1]['sql']}")
+                    plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                # Every scan of the index is cut short by the LIMIT of its branch
+                limits = [node for node in self.plan_nodes(plan[0]["Plan"]) if node["Node Type"] == "Limit"]
+                scans = [node.get("Index Name") for limit in limits[1:] for node in self.plan_nodes(limit)]
+                self.assertEqual(scans.count(index), 2, json.dumps(plan, indent=2))
+                self.assertNotIn(f'{name}_name_search_idx', scans)
+
+    def test_transfer(self):
+        """
+        Ensure the transfer lookups and update are primary key lookups
+        """
+        other_course = Course.objects.filter(school=self.school).exclude(students=self.student).first()
+        self.assertIndexedRequest('post', reverse('transfer'), {
+            'studentId': self.student.id,
+            'fromCourseId': self.course.id,
+            'toCourseId': other_course.id,
+        })
+
+    def test_hot_querysets(self):
+        """
+        Ensure students by school ordered by name, enrollments by course or school
+        and courses by school and teacher are served by their composite indexes
+        """
+        teacher = self.course.teacher
+        querysets = [
+            Student.objects.filter(school=self.school)[:25],
+            Student.objects.filter(school=self.school, name__gt='Student 1')[:25],
+            Enrollment.objects.filter(course=self.course).order_by('student')[:25],
+            Enrollment.objects.filter(school=self.school).order_by('id')[:25],
+            Course.objects.filter(school=self.school, teacher=teacher),
+            Course.objects.filter(teacher=teacher),
+        ]
+        for queryset in querysets:
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                self.assertIndexedPlan(cursor.mogrify(sql, params).decode())
+
+    def test_admin_changelists(self):
+        """
+        Ensure the admin changelists, filtered by school or searched by name, are
+        served by the indexes in their ordering
+        """
+        student_admin = admin.site._registry[Student]
+        querysets = [
+            Student.objects.order_by('name', 'id')[:100],
+            Student.objects.filter(school=self.school).order_by('name', 'id')[:100],
+            student_admin.get_search_results(None, Student.objects.order_by('name', 'id'), 'Student 39')[0][:100],
+            Course.objects.filter(school=self.school).order_by('-id')[:100],
+            Enrollment.objects.filter(school=self.school).order_by('-id')[:100],
+            Teacher.objects.filter(school=self.school).select_related('school').order_by('-id')[:100],
+        ]
+        for queryset in querysets:
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                self.assertIndexedPlan(cursor.mogrify(sql, params).decode())
@@ -0,0 +1,167 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.checks import check_response_cache
+from core.models import School, Teacher, Course, Student
+from core.views import StudentViewSet
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        """
+        Create two schools with a course each to use them for the tests
+        """
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        self.other_school = School.objects.create(name='Middle School', address='Test Address 1')
+        teacher = Teacher.objects.create(name='Teacher 1', school=self.school)
+        self.course = Course.objects.create(name='Course 1', location='Room 1', school=self.school, teacher=teacher)
+
+    def test_stats_are_cached_per_school(self):
+        """
+        Ensure stats are served from the cache until a write touches their school
+        """
+        url = reverse('school-stats', kwargs={'pk': self.school.id})
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        Teacher.objects.create(name='Teacher 2', school=self.other_school)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        self.client.post(reverse('student-list'), {
+            'name': 'Student 1', 'school_id': self.school.id, 'course_id': self.course.id
+        }, format='json')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['students'], 1)
+
+    def test_writes_invalidate_lists(self):
+        """
+        Ensure deletes, bulk creates, transfers and enrollments are visible right away
+        """
+        url = reverse('student-list')
+        self.assertEqual(self.client.get(url).data['count'], 0)
+        self.client.post(url, [
+            {'name': f'Student {i}', 'school_id': self.school.id, 'course_id': self.course.id} for i in range(3)
+        ], format='json')
+        self.assertEqual(self.client.get(url).data['count'], 3)
+
+        student = Student.objects.first()
+        self.client.delete(reverse('student-detail', kwargs={'pk': student.id}))
+        self.assertEqual(self.client.get(url).data['count'], 2)
+
+        other_course = Course.objects.create(
+            name='Course 2', location='Room 2', school=self.school, teacher=self.course.teacher
+        )
+        detail_url = reverse('student-detail', kwargs={'pk': Student.objects.first().id})
+        self.client.get(detail_url)
+        self.assertEqual(self.client.get(detail_url)['X-Cache'], 'HIT')
+        self.client.post(reverse('transfer'), {
+            'studentId': Student.objects.first().id, 'fromCourseId': self.course.id, 'toCourseId': other_course.id
+        })
+        self.assertEqual(self.client.get(detail_url).data['course_ids'], [other_course.id])
+        self.client.post(reverse('enrollments'), [
+            {'studentId': Student.objects.first().id, 'courseId': self.course.id}
+        ], format='json')
+        self.assertEqual(self.client.get(detail_url).data['course_ids'], [self.course.id, other_course.id])
+
+    def test_admin_writes_invalidate_lists(self):
+        """
+        Ensure rows changed and deleted through the Django admin are visible right away
+        """
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        url = reverse('teacher-list')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        teacher = Teacher.objects.create(name='Teacher 2', school=self.other_school)
+        stats_url = reverse('school-stats', kwargs={'pk': self.other_school.id})
+        self.client.get(stats_url)
+        response = self.client.post(reverse('admin:core_teacher_change', args=[teacher.id]), {
+            'name': 'Teacher 2', 'school': self.school.id,
+        })
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        response = self.client.get(stats_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['teachers'], 0)
+
+        self.client.post(reverse('admin:core_teacher_delete', args=[teacher.id]), {'post': 'yes'})
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 1)
+
+        self.client.post(reverse('admin:core_teacher_changelist'), {
+            'action': 'delete_selected', 'post': 'yes', '_selected_action': [self.course.teacher_id],
+        })
+        self.assertEqual(self.client.get(url).data['count'], 0)
+
+    def test_invalidated_on_commit(self):
+        """
+        Ensure a write inside a transaction starts a new generation again when it
+        commits, orphaning what was cached before it did
+        """
+        url = reverse('student-list')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Student.objects.create(name='Student 1', school=self.school)
+            self.client.get(url)
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_opt_out(self):
+        """
+        Ensure views can opt out of the cache
+        """
+        url = reverse('student-list')
+        StudentViewSet.cache_responses = False
+        try:
+            self.client.get(url)
+            response = self.client.get(url)
+        finally:
+            StudentViewSet.cache_responses = True
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Cache', response)
+
+    def test_metrics(self):
+        """
+        Ensure hits and misses are counted per view
+        """
+        url = reverse('course-detail', kwargs={'pk': self.course.id})
+        for _ in range(3):
+            self.client.get(url)
+        out = StringIO()
+        call_command('response_cache_metrics', stdout=out)
+        self.assertRegex(out.getvalue(), r'course-retrieve: [1-9]\d* hits, [1-9]\d* misses')
+
+        url = reverse('response-cache')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(response.data['views']['course-retrieve']['hit'], 0)
+
+    def test_shared_cache_check(self):
+        """
+        Ensure several workers with a per process response cache fail the system checks
+        """
+        locmem = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        redis = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        dummy = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(CACHES=locmem, WEB_CONCURRENCY=4):
+            self.assertEqual([error.id for error in check_response_cache(None)], ['core.E002'])
+        with override_settings(CACHES=locmem, WEB_CONCURRENCY=1):
+            self.assertEqual(check_response_cache(None), [])
+        for caches in [redis, dummy]:
+            with override_settings(CACHES=caches, WEB_CONCURRENCY=4):
+                self.assertEqual(check_response_cache(None), [])
+        with override_settings(CACHES=locmem, WEB_CONCURRENCY=4, RESPONSE_CACHE_ENABLED=False):
+            self.assertEqual(check_response_cache(None), [])
@@ -0,0 +1,82 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School, Teacher, Course, Student, Enrollment
+
+
+class RosterTests(APITestCase):
+    def setUp(self):
+        """
+        Create a school with two courses and their students, and another school
+        """
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        self.teacher = Teacher.objects.create(name='Teacher 1', school=self.school)
+        self.courses = [
+            Course.objects.create(name=f'Course {index}', location='Room 1', school=self.school, teacher=self.teacher)
+            for index in range(2)
+        ]
+        for name in ('Carol', 'Alice', 'Bob'):
+            student = Student.objects.create(name=name, school=self.school)
+            Enrollment.objects.create(student=student, course=self.courses[0], school=self.school)
+        Enrollment.objects.create(student=student, course=self.courses[1], school=self.school)
+
+        other = School.objects.create(name='Middle School', address='Test Address')
+        teacher = Teacher.objects.create(name='Teacher 2', school=other)
+        course = Course.objects.create(name='Course 3', location='Room 2', school=other, teacher=teacher)
+        student = Student.objects.create(name='Dave', school=other)
+        Enrollment.objects.create(student=student, course=course, school=other)
+
+    def test_get_roster(self):
+        """
+        Ensure the roster nests the teacher and students of each course of the school
+        """
+        response = self.client.get(reverse('school-roster', kwargs={'pk': self.school.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['school'], {'id': self.school.id, 'name': 'Primary School', 'address': 'Test Address'})
+        self.assertEqual(response.data['count'], 2)
+        first, second = response.data['results']
+        self.assertEqual(first['id'], self.courses[0].id)
+        self.assertEqual(first['teacher'], {'id': self.teacher.id, 'name': 'Teacher 1'})
+        self.assertEqual([student['name'] for student in first['students']], ['Alice', 'Bob', 'Carol'])
+        self.assertEqual([student['name'] for student in second['students']], ['Bob'])
+
+        response = self.client.get(reverse('school-roster', kwargs={'pk': 0}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_roster_query_count(self):
+        """
+        Ensure the roster takes the same number of queries whatever the size of the school
+        """
+        url = reverse('school-roster', kwargs={'pk': self.school.id})
+        with self.settings(RESPONSE_CACHE_ENABLED=False):
+            with self.assertNumQueries(4):
+                self.client.get(url)
+
+            for index in range(5):
+                teacher = Teacher.objects.create(name=f'Teacher {index}', school=self.school)
+                course = Course.objects.create(name='Course', location='Room', school=self.school, teacher=teacher)
+                students = Student.objects.bulk_create([
+                    Student(name=f'Student {number}', school=self.school) for number in range(10)
+                ])
+                Enrollment.objects.bulk_create([
+                    Enrollment(student=student, course=course, school=self.school) for student in students
+                ])
+            with self.assertNumQueries(4):
+                response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 7)
+
+    def test_roster_pagination(self):
+        """
+        Ensure the roster is paginated by course, with offsets or cursors
+        """
+        url = reverse('school-roster', kwargs={'pk': self.school.id})
+        response = self.client.get(url, {'limit': 1, 'offset': 1})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([course['id'] for course in response.data['results']], [self.courses[1].id])
+        self.assertIsNotNone(response.data['previous'])
+
+        response = self.client.get(url, {'cursor': '', 'limit': 1})
+        self.assertEqual([course['id'] for course in response.data['results']], [self.courses[0].id])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([course['id'] for course in response.data['results']], [self.courses[1].id])
+        self.assertEqual(response.data['school']['id'], self.school.id)
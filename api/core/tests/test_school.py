@@ -1,7 +1,8 @@
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
-from core.models import School, Administrator, Teacher, Course, Student
+from core.models import School, Administrator, Teacher, Course, Student, Enrollment
+from new_app.instrumentation import query_budget
 
 
 class SchoolTests(APITestCase):
@@ -27,16 +28,10 @@ class SchoolTests(APITestCase):
             school=self.school, teacher=self.teacher2
         )
 
-        self.student1 = Student.objects.create(
-            name='Student 1',
-            school=self.school,
-            course=self.course1
-        )
-        self.student2 = Student.objects.create(
-            name='Student 2',
-            school=self.school,
-            course=self.course2
-        )
+        self.student1 = Student.objects.create(name='Student 1', school=self.school)
+        Enrollment.objects.create(student=self.student1, course=self.course1, school=self.school)
+        self.student2 = Student.objects.create(name='Student 2', school=self.school)
+        Enrollment.objects.create(student=self.student2, course=self.course2, school=self.school)
 
     def test_create_school(self):
         """
@@ -52,6 +47,7 @@ class SchoolTests(APITestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @query_budget(2)
     def test_get_all_schools(self):
         """
         Ensure we can get all schools
@@ -63,6 +59,7 @@ class SchoolTests(APITestCase):
         self.assertEqual(response.data['results'][0]['name'], 'Primary School')
         self.assertEqual(response.data['results'][1]['name'], 'Middle School')
 
+    @query_budget(2)
     def test_get_school(self):
         """
         Ensure we can get a school's detail
@@ -109,7 +106,8 @@ class SchoolTests(APITestCase):
         Ensure we can get a school's stats
         """
         url = reverse('school-stats', kwargs={'pk': self.school.id})
-        response = self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['id'], self.school.id)
         self.assertEqual(response.data['courses'], 2)
@@ -120,3 +118,25 @@ class SchoolTests(APITestCase):
         url = reverse('school-stats', kwargs={'pk': 0})
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_bulk_school_stats(self):
+        """
+        Ensure we can get the stats of several schools in a single query
+        """
+        other_school = School.objects.get(name='Middle School')
+        url = reverse('school-bulk-stats')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'ids': f'{self.school.id},{other_school.id},0'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'id': self.school.id, 'courses': 2, 'admins': 2, 'teachers': 2, 'students': 2, 'enrollments': 2},
+            {'id': other_school.id, 'courses': 0, 'admins': 0, 'teachers': 0, 'students': 0, 'enrollments': 0},
+        ])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['results'][0]['students'], 2)
+
+        response = self.client.get(url, {'ids': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,138 @@
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School, SchoolStats, Administrator, Teacher, Course, Student, Enrollment
+
+
+class SchoolStatsTests(APITestCase):
+    def setUp(self):
+        """
+        Create two schools with a teacher and a course each to use them for the tests
+        """
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        self.other_school = School.objects.create(name='Middle School', address='Test Address 1')
+
+        self.teacher = Teacher.objects.create(name='Teacher 1', school=self.school)
+        self.course = Course.objects.create(
+            name='Course 1', location='Room 1',
+            school=self.school, teacher=self.teacher
+        )
+        other_teacher = Teacher.objects.create(name='Teacher 2', school=self.other_school)
+        self.other_course = Course.objects.create(
+            name='Course 2', location='Room 2',
+            school=self.other_school, teacher=other_teacher
+        )
+
+    def assertStats(self, school, **expected):
+        stats = SchoolStats.objects.values('courses', 'admins', 'teachers', 'students', 'enrollments').get(school=school)
+        self.assertEqual(stats, {'courses': 0, 'admins': 0, 'teachers': 0, 'students': 0, 'enrollments': 0, **expected})
+
+    def test_counters_follow_creates_and_deletes(self):
+        """
+        Ensure the counters follow single and bulk creates and deletes
+        """
+        self.assertStats(self.school, courses=1, teachers=1)
+
+        admin = Administrator.objects.create(name='Admin', school=self.school)
+        students = Student.objects.bulk_create([Student(name=f'Student {i}', school=self.school) for i in range(5)])
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, course=self.course, school=self.school) for student in students
+        ])
+        self.assertStats(self.school, courses=1, teachers=1, admins=1, students=5, enrollments=5)
+
+        admin.delete()
+        Student.objects.filter(name__in=['Student 0', 'Student 1']).delete()
+        self.assertStats(self.school, courses=1, teachers=1, students=3, enrollments=3)
+
+    def test_counters_follow_school_changes(self):
+        """
+        Ensure moving rows to another school moves their counts too
+        """
+        student = Student.objects.create(name='Student', school=self.school)
+        Student.objects.create(name='Other Student', school=self.school)
+
+        student.school = self.other_school
+        student.save()
+        self.assertStats(self.school, courses=1, teachers=1, students=1)
+        self.assertStats(self.other_school, courses=1, teachers=1, students=1)
+
+        Student.objects.filter(school=self.school).update(school=self.other_school)
+        Student.objects.update(name='Renamed')
+        self.assertStats(self.school, courses=1, teachers=1)
+        self.assertStats(self.other_school, courses=1, teachers=1, students=2)
+
+    def test_counters_follow_cascades(self):
+        """
+        Ensure deleting a teacher also discounts its cascaded courses and enrollments
+        """
+        student = Student.objects.create(name='Student', school=self.school)
+        Enrollment.objects.create(student=student, course=self.course, school=self.school)
+        self.teacher.delete()
+        self.assertStats(self.school, students=1)
+
+        self.other_school.delete()
+        self.assertFalse(SchoolStats.objects.filter(school=self.other_school.id).exists())
+
+    def test_counters_follow_transfers(self):
+        """
+        Ensure transferring a student keeps the counters exact
+        """
+        course = Course.objects.create(name='Course 3', location='Room 3', school=self.school, teacher=self.teacher)
+        student = Student.objects.create(name='Student', school=self.school)
+        Enrollment.objects.create(student=student, course=self.course, school=self.school)
+        response = self.client.post(reverse('transfer'), {
+            'studentId': student.id,
+            'fromCourseId': self.course.id,
+            'toCourseId': course.id
+        })
+        self.assertEqual(response.data['success'], True)
+        self.assertStats(self.school, courses=2, teachers=1, students=1, enrollments=1)
+
+    def test_get_school_stats_reads_one_row(self):
+        """
+        Ensure the stats endpoint only reads the counter row
+        """
+        url = reverse('school-stats', kwargs={'pk': self.school.id})
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'id': self.school.id, 'courses': 1, 'admins': 0, 'teachers': 1, 'students': 0, 'enrollments': 0
+        })
+
+
+class RebuildSchoolStatsCommandTests(TestCase):
+    def setUp(self):
+        """
+        Create a school with a teacher and drift its counters
+        """
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        Teacher.objects.create(name='Teacher 1', school=self.school)
+        SchoolStats.objects.filter(school=self.school).update(teachers=7, students=3)
+
+    def test_verify_reports_drift(self):
+        """
+        Ensure --verify fails on drifted counters and leaves them untouched
+        """
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_school_stats', verify=True, stdout=out)
+        self.assertIn(f"School {self.school.id} expected", out.getvalue())
+        self.assertEqual(SchoolStats.objects.get(school=self.school).teachers, 7)
+
+    def test_rebuild_fixes_drift(self):
+        """
+        Ensure a rebuild restores exact counters, including missing rows
+        """
+        missing = School.objects.create(name='Middle School', address='Test Address 1')
+        SchoolStats.objects.filter(school=missing).delete()
+
+        call_command('rebuild_school_stats', stdout=StringIO())
+        stats = SchoolStats.objects.get(school=self.school)
+        self.assertEqual((stats.teachers, stats.students), (1, 0))
+        self.assertTrue(SchoolStats.objects.filter(school=missing).exists())
+        call_command('rebuild_school_stats', verify=True, stdout=StringIO())
@@ -0,0 +1,100 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School, Administrator, Teacher, Student
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        """
+        Create two schools with people sharing name parts to use them for the tests
+        """
+        self.school, self.other_school = School.objects.bulk_create([
+            School(name='Primary School', address='Test Address'),
+            School(name='Middle School', address='Test Address 1'),
+        ])
+        self.admin = Administrator.objects.create(name='Alison Park', school=self.school)
+        self.teacher = Teacher.objects.create(name="Bob O'Neil", school=self.school)
+        self.alice, self.ali, self.other_alice = Student.objects.bulk_create([
+            Student(name='Alice Smith', school=self.school),
+            Student(name='Smith Ali', school=self.school),
+            Student(name='Alice Jones', school=self.other_school),
+        ])
+
+    def search(self, **params):
+        response = self.client.get(reverse('search'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(result['type'], result['name']) for result in response.data['results']]
+
+    def test_search(self):
+        """
+        Ensure every type is searched by word prefixes, names starting with the query first
+        """
+        with self.assertNumQueries(1):
+            results = self.search(q='ali')
+        self.assertEqual(results, [
+            ('student', 'Alice Jones'), ('student', 'Alice Smith'), ('administrator', 'Alison Park'),
+            ('student', 'Smith Ali'),
+        ])
+        with self.assertNumQueries(1):
+            results = self.search(q='smi ali')
+        self.assertEqual(results, [('student', 'Alice Smith'), ('student', 'Smith Ali')])
+        self.assertEqual(self.search(q='neil'), [('teacher', "Bob O'Neil")])
+        self.assertEqual(self.search(q='o\'ne'), [('teacher', "Bob O'Neil")])
+        self.assertEqual(self.search(q='zoe'), [])
+
+        response = self.client.get(reverse('search'), {'q': 'alice smith'})
+        result = response.data['results'][0]
+        self.assertEqual((result['id'], result['school_id']), (self.alice.id, self.school.id))
+
+    def test_search_filters(self):
+        """
+        Ensure the results can be narrowed by school and type, and limited
+        """
+        self.assertEqual(self.search(q='ali', school=self.other_school.id), [('student', 'Alice Jones')])
+        self.assertEqual(self.search(q='ali', type='admins,teachers'), [('administrator', 'Alison Park')])
+        self.assertEqual(self.search(q='ali', limit=2), [('student', 'Alice Jones'), ('student', 'Alice Smith')])
+
+    def test_search_ranks_every_match(self):
+        """
+        Ensure the best matches are found among many, in the same order on every
+        call, as no search is sampled
+        """
+        Student.objects.bulk_create([Student(name=f'Bob Zed {i}', school=self.school) for i in range(600)])
+        best = Student.objects.create(name='Zed Bob', school=self.school)
+        expected = [best.id] + list(
+            Student.objects.filter(name__startswith='Bob Zed').order_by('name', 'id').values_list('id', flat=True)[:4]
+        )
+        for params in [{'q': 'zed'}, {'q': 'zed', 'school': self.school.id}] * 2:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('search'), {**params, 'limit': 5})
+            self.assertEqual([result['id'] for result in response.data['results']], expected)
+            self.assertFalse([query for query in queries if 'gin_fuzzy_search_limit' in query['sql']])
+
+    def test_search_short_prefix(self):
+        """
+        Ensure a single term of one or two characters finds the names starting
+        with it in any case, and not the names with a later word starting with it
+        """
+        Student.objects.create(name='alfred', school=self.school)
+        with self.assertNumQueries(1):
+            results = self.search(q='AL')
+        self.assertEqual(results, [
+            ('student', 'Alice Jones'), ('student', 'Alice Smith'), ('administrator', 'Alison Park'),
+            ('student', 'alfred'),
+        ])
+        self.assertEqual(self.search(q='s', type='students'), [('student', 'Smith Ali')])
+        self.assertEqual(self.search(q='al', school=self.other_school.id), [('student', 'Alice Jones')])
+        self.assertEqual(self.search(q='o'), [])
+
+    def test_invalid_search(self):
+        """
+        Ensure a missing query and malformed parameters are rejected
+        """
+        for params in [{}, {'q': ' '}, {'q': 'a', 'type': 'courses'}, {'q': 'a', 'school': 'x'}, {'q': 'a', 'limit': 0}]:
+            response = self.client.get(reverse('search'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('search'), {'q': '%&!'})
+        self.assertEqual(response.data['results'], [])
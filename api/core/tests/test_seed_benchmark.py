@@ -0,0 +1,49 @@
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.db.models import F
+from django.test import TestCase
+from core.models import School, Administrator, Teacher, Course, Student, Enrollment
+
+
+class SeedBenchmarkTests(TestCase):
+    def test_seed(self):
+        """
+        Ensure the generated roster is consistent and sized as requested
+        """
+        out = StringIO()
+        call_command('seed_benchmark', schools=5, students_per_school=60, batch_schools=2, stdout=out)
+        self.assertIn('5 schools', out.getvalue())
+        self.assertEqual(School.objects.count(), 5)
+        self.assertIn(f'{Student.objects.count()} students', out.getvalue())
+        self.assertGreater(Student.objects.count(), 0)
+        for model in (Administrator, Teacher, Course):
+            self.assertEqual(model.objects.values('school').distinct().count(), 5)
+        self.assertIn(f'{Enrollment.objects.count()} enrollments', out.getvalue())
+        self.assertFalse(Student.objects.filter(enrollments__isnull=True).exists())
+        self.assertFalse(Enrollment.objects.exclude(course__school_id=F('school_id')).exists())
+        self.assertFalse(Enrollment.objects.exclude(student__school_id=F('school_id')).exists())
+        self.assertFalse(Course.objects.exclude(teacher__school_id=F('school_id')).exists())
+        # The counters were maintained while loading
+        call_command('rebuild_school_stats', verify=True, stdout=StringIO())
+
+    def test_reproducible(self):
+        """
+        Ensure the same seed generates the same roster
+        """
+        def roster():
+            return list(Enrollment.objects.order_by('id').values_list('student__name', 'course__name'))
+
+        call_command('seed_benchmark', schools=2, students_per_school=30, seed=7, stdout=StringIO())
+        first = roster()
+        Student.objects.all().delete()
+        School.objects.all().delete()
+        call_command('seed_benchmark', schools=2, students_per_school=30, seed=7, stdout=StringIO())
+        self.assertEqual(roster(), first)
+
+    def test_invalid_arguments(self):
+        """
+        Ensure sizes that can't be generated are rejected
+        """
+        with self.assertRaises(CommandError):
+            call_command('seed_benchmark', schools=0, students_per_school=10, stdout=StringIO())
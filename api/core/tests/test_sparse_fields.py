@@ -0,0 +1,95 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School, Teacher, Course, Student, Enrollment
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class SparseFieldsTests(APITestCase):
+    def setUp(self):
+        """
+        Create a school with a course and enrolled students to use them for the tests
+        """
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        teacher = Teacher.objects.create(name='Teacher 1', school=self.school)
+        self.course = Course.objects.create(name='Course 1', location='Room 1', school=self.school, teacher=teacher)
+        self.students = Student.objects.bulk_create([
+            Student(name=f'Student {i}', school=self.school) for i in range(1, 4)
+        ])
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, course=self.course, school=self.school) for student in self.students
+        ])
+
+    def get(self, url, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, queries[-1]['sql']
+
+    def test_fields(self):
+        """
+        Ensure only the requested fields are rendered and their columns selected
+        """
+        response, sql = self.get(reverse('student-list'), {'fields': 'name'})
+        self.assertEqual(response.data['results'][0], {'name': 'Student 1'})
+        self.assertNotIn('school_id', sql)
+        self.assertNotIn('core_enrollment', sql)
+
+        response, sql = self.get(reverse('student-list'), {'fields': 'course_ids,name', 'limit': 1})
+        self.assertEqual(response.data['results'], [{'name': 'Student 1', 'course_ids': [self.course.id]}])
+        response, sql = self.get(reverse('student-list'), {'fields': 'course_id', 'limit': 1})
+        self.assertEqual(response.data['results'], [{'course_id': self.course.id}])
+
+        response, sql = self.get(reverse('school-detail', kwargs={'pk': self.school.id}), {'fields': 'name'})
+        self.assertEqual(response.data, {'name': 'Primary School'})
+        self.assertNotIn('address', sql)
+
+    def test_exclude(self):
+        """
+        Ensure excluded fields are neither rendered nor selected
+        """
+        response, sql = self.get(reverse('course-list'), {'exclude': 'location,teacher_id'})
+        self.assertEqual(response.data['results'], [{'name': 'Course 1', 'school_id': self.school.id}])
+        self.assertNotIn('location', sql)
+
+        response, sql = self.get(reverse('course-list'), {'fields': 'name,location', 'exclude': 'location'})
+        self.assertEqual(response.data['results'], [{'name': 'Course 1'}])
+
+    def test_pagination_and_validators(self):
+        """
+        Ensure keyset pages, ETags and the async routes work on the narrowed rows
+        without loading the deferred columns
+        """
+        url = reverse('student-list')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'fields': 'school_id', 'cursor': '', 'limit': 2})
+        self.assertEqual(response.data['results'], [{'school_id': self.school.id}] * 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.data['results'], [{'school_id': self.school.id}])
+
+        etag = self.client.get(url, {'fields': 'name'})['ETag']
+        response = self.client.get(url, {'fields': 'name'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(reverse('async-student-list'), {'fields': 'name', 'limit': 1})
+        self.assertEqual(response.json()['results'], [{'name': 'Student 1'}])
+
+    def test_writes_render_every_field(self):
+        """
+        Ensure the parameters only apply to reads
+        """
+        url = reverse('student-detail', kwargs={'pk': self.students[0].id})
+        response = self.client.patch(f'{url}?fields=name', {'name': 'Renamed'}, format='json')
+        self.assertEqual(response.data['course_ids'], [self.course.id])
+
+    def test_invalid_fields(self):
+        """
+        Ensure unknown fields and empty field lists are rejected
+        """
+        for params in [{'fields': 'name,secret'}, {'exclude': ','}]:
+            response = self.client.get(reverse('student-list'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'exclude'})
@@ -0,0 +1,134 @@
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, AsyncRequestFactory, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School, Teacher, Course, Student, Enrollment
+from new_app.instrumentation import QueryInstrumentationMiddleware, assert_query_budget, query_budget, query_shape
+
+
+class SQLInstrumentationTests(APITestCase):
+    def setUp(self):
+        """
+        Create a school with a course of three students to use them for the tests
+        """
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        teacher = Teacher.objects.create(name='Teacher', school=self.school)
+        course = Course.objects.create(name='Course', location='Room 1', school=self.school, teacher=teacher)
+        for name in ('Student 1', 'Student 2', 'Student 3'):
+            student = Student.objects.create(name=name, school=self.school)
+            Enrollment.objects.create(student=student, course=course, school=self.school)
+
+    @override_settings(SQL_REQUEST_TIME_BUDGET_MS=10_000)
+    def test_server_timing_header(self):
+        """
+        Ensure responses report their query count and database time
+        """
+        with self.assertLogs('new_app.instrumentation', 'DEBUG') as logs:
+            response = self.client.get(reverse('student-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = response['Server-Timing'].split(', ')
+        self.assertRegex(timings[0], r'^db;dur=\d+\.\d\d;desc="2 queries"$')
+        self.assertRegex(timings[1], r'^db-slow-1;dur=\d+\.\d\d$')
+        self.assertEqual(len(timings), 3)
+
+        record = logs.records[-1]
+        self.assertEqual(record.levelname, 'DEBUG')
+        self.assertFalse(record.db_over_budget)
+        self.assertEqual((record.method, record.path, record.status_code), ('GET', '/api/students', 200))
+        self.assertEqual(record.db_queries, 2)
+        self.assertEqual(len(record.db_slowest), 2)
+        self.assertEqual(record.db_repeated, [])
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_over_budget_requests_are_logged(self):
+        """
+        Ensure requests over the query or time budget are logged at info level
+        """
+        for budget in [{'SQL_REQUEST_QUERY_BUDGET': 1}, {'SQL_REQUEST_TIME_BUDGET_MS': 0}]:
+            with self.subTest(budget), override_settings(**budget):
+                with self.assertLogs('new_app.instrumentation', 'INFO') as logs:
+                    self.client.get(reverse('student-list'))
+                record = logs.records[-1]
+                self.assertEqual(record.levelname, 'INFO')
+                self.assertTrue(record.db_over_budget)
+                self.assertIn('over budget', record.getMessage())
+
+    @override_settings(SQL_REPEATED_QUERY_THRESHOLD=3)
+    def test_repeated_queries_are_flagged(self):
+        """
+        Ensure a query shape repeated once per row is logged as a probable N+1
+        """
+        def get_response(request):
+            names = [enrollment.course.name for enrollment in Enrollment.objects.all()]
+            return HttpResponse(", ".join(names))
+
+        middleware = QueryInstrumentationMiddleware(get_response)
+        with self.assertLogs('new_app.instrumentation', 'WARNING') as logs:
+            response = middleware(RequestFactory().get('/students'))
+        self.assertIn('db-repeated;desc="1 repeated query shapes"', response['Server-Timing'])
+        [repeated] = logs.records[-1].db_repeated
+        self.assertEqual(repeated['count'], 3)
+        self.assertIn('FROM "core_course"', repeated['shape'])
+
+    async def test_async_requests(self):
+        """
+        Ensure queries run in the threads of async requests are recorded
+        """
+        async def get_response(request):
+            return HttpResponse(str(await Student.objects.acount()))
+
+        middleware = QueryInstrumentationMiddleware(get_response)
+        with self.assertLogs('new_app.instrumentation', 'DEBUG'):
+            response = await middleware(AsyncRequestFactory().get('/students'))
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    @override_settings(SQL_INSTRUMENTATION_ENABLED=False)
+    def test_disabled(self):
+        """
+        Ensure nothing is reported when the instrumentation is disabled
+        """
+        response = self.client.get(reverse('student-list'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class QueryBudgetTests(TestCase):
+    def test_query_shape(self):
+        """
+        Ensure statements differing only by their parameters have the same shape
+        """
+        self.assertEqual(
+            query_shape('SELECT * FROM "core_student" WHERE "id" IN (%s, %s, %s) LIMIT 21'),
+            query_shape('SELECT * FROM "core_student" WHERE "id" IN (%s) LIMIT 5'),
+        )
+        self.assertEqual(query_shape("SELECT 'Bob', 1"), "SELECT ?, ?")
+
+    def test_budget_exceeded(self):
+        """
+        Ensure blocks running more queries than their budget fail the test
+        """
+        with assert_query_budget(self, 2) as recorder:
+            School.objects.count()
+            School.objects.exists()
+        self.assertEqual(recorder.count, 2)
+
+        with self.assertRaisesRegex(self.failureException, 'over the budget of 1'):
+            with assert_query_budget(self, 1):
+                School.objects.count()
+                School.objects.exists()
+
+    def test_repeats_exceeded(self):
+        """
+        Ensure blocks repeating a query shape more than allowed fail the test
+        """
+        with self.assertRaisesRegex(self.failureException, 'probable N\\+1'):
+            with assert_query_budget(self, 10, repeats=2):
+                for school_id in range(3):
+                    School.objects.filter(id=school_id).exists()
+
+    @query_budget(1)
+    def test_decorator(self):
+        """
+        Ensure the decorator applies the budget to the test method
+        """
+        self.assertEqual(School.objects.count(), 0)
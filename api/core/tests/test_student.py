@@ -1,7 +1,8 @@
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
-from core.models import School, Teacher, Course, Student
+from core.models import School, Teacher, Course, Student, Enrollment
+from new_app.instrumentation import query_budget
 
 
 class StudentTests(APITestCase):
@@ -22,16 +23,10 @@ class StudentTests(APITestCase):
             name='Course 2', location='Room 2',
             school=self.school, teacher=teacher2
         )
-        self.student = Student.objects.create(
-            name='Student 1',
-            school=self.school,
-            course=self.course1
-        )
-        Student.objects.create(
-            name='Student 2',
-            school=self.school,
-            course=self.course2
-        )
+        self.student = Student.objects.create(name='Student 1', school=self.school)
+        Enrollment.objects.create(student=self.student, course=self.course1, school=self.school)
+        student2 = Student.objects.create(name='Student 2', school=self.school)
+        Enrollment.objects.create(student=student2, course=self.course2, school=self.school)
 
     def test_create_student(self):
         """
@@ -46,11 +41,34 @@ class StudentTests(APITestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data['name'], 'Test Student')
+        self.assertEqual(response.data['course_ids'], [self.course1.id])
+
+        data = {'name': 'Test Student', 'school_id': self.school.id, 'course_ids': [self.course2.id, self.course1.id]}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['course_ids'], [self.course1.id, self.course2.id])
+        self.assertEqual(response.data['course_id'], self.course1.id)
+
+        response = self.client.post(url, {'name': 'Test Student', 'school_id': self.school.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['course_ids'], response.data['course_id']), ([], None))
 
         data = {'name': '', 'school_id': self.school.id, 'course_id': self.course1.id}
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+        data = {'name': 'Test Student', 'school_id': self.school.id, 'course_id': 0}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'], ['Invalid data for Course'])
+
+        other_school = School.objects.create(name='Other School', address='Test Address')
+        data = {'name': 'Test Student', 'school_id': other_school.id, 'course_ids': [self.course1.id]}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'], ['Invalid data for Course'])
+
+    @query_budget(2)
     def test_get_all_students(self):
         """
         Ensure we can get all students
@@ -62,6 +80,7 @@ class StudentTests(APITestCase):
         self.assertEqual(response.data['results'][0]['name'], 'Student 1')
         self.assertEqual(response.data['results'][1]['name'], 'Student 2')
 
+    @query_budget(2)
     def test_get_student(self):
         """
         Ensure we can get a student's detail
@@ -71,6 +90,7 @@ class StudentTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['name'], self.student.name)
         self.assertEqual(response.data['school_id'], self.school.id)
+        self.assertEqual(response.data['course_ids'], [self.course1.id])
         self.assertEqual(response.data['course_id'], self.course1.id)
 
         url = reverse('student-detail', kwargs={'pk': 0})
@@ -92,11 +112,42 @@ class StudentTests(APITestCase):
         self.assertEqual(response.data['name'], 'First Student')
         self.assertEqual(response.data['school_id'], self.school.id)
         self.assertEqual(response.data['course_id'], self.course2.id)
+        self.assertEqual(response.data['course_ids'], [self.course2.id])
+
+        response = self.client.patch(url, {'course_ids': [self.course1.id, self.course2.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['course_ids'], [self.course1.id, self.course2.id])
+
+        response = self.client.patch(url, {'name': 'Student'}, format='json')
+        self.assertEqual(response.data['course_ids'], [self.course1.id, self.course2.id])
+
+        data = {**response.data, 'course_ids': [self.course2.id]}
+        response = self.client.put(url, data, format='json')
+        self.assertEqual((response.data['course_ids'], response.data['course_id']), ([self.course2.id], self.course2.id))
+        response = self.client.put(url, {**response.data, 'course_ids': []}, format='json')
+        self.assertEqual((response.data['course_ids'], response.data['course_id']), ([], None))
+        response = self.client.put(url, response.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         data = {'name': '', 'school_id': self.school.id, 'course_id': self.course2.id}
         response = self.client.put(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_update_student_null_course_id(self):
+        """
+        Ensure a null course_id without course_ids leaves the enrollments unchanged
+        """
+        Enrollment.objects.create(student=self.student, course=self.course2, school=self.school)
+        url = reverse('student-detail', kwargs={'pk': self.student.id})
+        data = {'name': 'First Student', 'school_id': self.school.id, 'course_id': None}
+        response = self.client.put(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['course_ids'], [self.course1.id, self.course2.id])
+        self.assertEqual(response.data['course_id'], self.course1.id)
+        self.assertEqual(
+            sorted(self.student.enrollments.values_list('course_id', flat=True)), [self.course1.id, self.course2.id]
+        )
+
     def test_delete_student(self):
         """
         Ensure we can delete a student
@@ -119,7 +170,8 @@ class StudentTests(APITestCase):
             'fromCourseId': self.course1.id,
             'toCourseId': self.course2.id
         }
-        response = self.client.post(url, data)
+        with self.assertNumQueries(1):
+            response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['success'], True)
 
@@ -129,7 +181,7 @@ class StudentTests(APITestCase):
             'toCourseId': self.course2.id
         }
         response = self.client.post(url, data)
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data['success'], False)
         self.assertEqual(response.data['message'], 'Student doest not exist.')
 
@@ -139,7 +191,7 @@ class StudentTests(APITestCase):
             'toCourseId': self.course2.id
         }
         response = self.client.post(url, data)
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
         self.assertEqual(response.data['success'], False)
         self.assertEqual(response.data['message'], f"Student isn't included the course {self.course1.id}")
 
@@ -149,6 +201,53 @@ class StudentTests(APITestCase):
             'toCourseId': 0
         }
         response = self.client.post(url, data)
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
         self.assertEqual(response.data['success'], False)
         self.assertEqual(response.data['message'], 'Course 0 does not exist')
+
+        data = {
+            'studentId': self.student.id,
+            'fromCourseId': 'abc',
+            'toCourseId': self.course1.id
+        }
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['success'], False)
+        self.assertEqual(list(self.student.courses.all()), [self.course2])
+
+        Enrollment.objects.create(student=self.student, course=self.course1, school=self.school)
+        data = {
+            'studentId': self.student.id,
+            'fromCourseId': self.course2.id,
+            'toCourseId': self.course1.id
+        }
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['message'], f"Student is already included the course {self.course1.id}")
+
+    def test_transfer_expects_an_object(self):
+        """
+        Ensure a JSON array or scalar body is rejected like invalid ids
+        """
+        url = reverse('transfer')
+        for data in [[{'studentId': self.student.id}], 'abc', 1]:
+            response = self.client.post(url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data['success'], False)
+
+    def test_students_query_count(self):
+        """
+        Ensure the list and detail endpoints run a fixed number of queries whatever the page size
+        """
+        students = Student.objects.bulk_create([Student(name=f'Student {i:02}', school=self.school) for i in range(20)])
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, course=self.course1, school=self.school) for student in students
+        ])
+        url = reverse('student-list')
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 22)
+
+        url = reverse('student-detail', kwargs={'pk': self.student.id})
+        with self.assertNumQueries(1):
+            self.client.get(url)
@@ -2,6 +2,7 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from core.models import School, Teacher
+from new_app.instrumentation import query_budget
 
 
 class TeacherTests(APITestCase):
@@ -28,6 +29,7 @@ class TeacherTests(APITestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @query_budget(2)
     def test_get_all_teachers(self):
         """
         Ensure we can get all teachers
@@ -39,6 +41,7 @@ class TeacherTests(APITestCase):
         self.assertEqual(response.data['results'][0]['name'], 'Teacher 1')
         self.assertEqual(response.data['results'][1]['name'], 'Teacher 2')
 
+    @query_budget(2)
     def test_get_teacher(self):
         """
         Ensure we can get a teacher's detail
@@ -79,3 +82,17 @@ class TeacherTests(APITestCase):
         url = reverse('teacher-detail', kwargs={'pk': 0})
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_teachers_query_count(self):
+        """
+        Ensure the list and detail endpoints run a fixed number of queries whatever the page size
+        """
+        Teacher.objects.bulk_create([Teacher(name=f'Teacher {i:02}', school=self.school) for i in range(20)])
+        url = reverse('teacher-list')
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 22)
+
+        url = reverse('teacher-detail', kwargs={'pk': self.teacher.id})
+        with self.assertNumQueries(1):
+            self.client.get(url)
@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import School
+from core.checks import check_throttle_cache
+from core.throttling import TokenBucketThrottle, acquire_in_flight, release_in_flight, throttle_cache, \
+    IN_FLIGHT_PERIOD
+
+
+def rates(**rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ThrottlingTests(APITestCase):
+    def setUp(self):
+        """
+        Create a school to use it for the tests, with empty buckets and counters,
+        leaving none behind for the other tests
+        """
+        throttle_cache().clear()
+        self.addCleanup(throttle_cache().clear)
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        self.now = 1000.0
+        timer = mock.patch.object(TokenBucketThrottle, 'timer', lambda throttle: self.now)
+        timer.start()
+        self.addCleanup(timer.stop)
+
+    def assertThrottled(self, response, retry_after):
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], str(retry_after))
+
+    @rates(client='3/min')
+    def test_client_rate(self):
+        """
+        Ensure a client gets bursts of the rate, refilled evenly, whatever the
+        endpoints, and other clients keep their own bucket
+        """
+        urls = [reverse('student-list'), reverse('school-detail', kwargs={'pk': self.school.id})]
+        for url in urls + urls[:1]:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertThrottled(self.client.get(urls[1]), 20)
+        self.assertEqual(self.client.get(urls[1], REMOTE_ADDR='10.0.0.2').status_code, status.HTTP_200_OK)
+
+        self.now += 15
+        self.assertThrottled(self.client.get(urls[0]), 5)
+        self.now += 5
+        self.assertEqual(self.client.get(urls[0]).status_code, status.HTTP_200_OK)
+        self.assertThrottled(self.client.get(urls[0]), 20)
+
+        self.client.force_authenticate(User.objects.create_user('user'))
+        self.assertEqual(self.client.get(urls[0]).status_code, status.HTTP_200_OK)
+
+    @rates(client='100/min', stats='2/min')
+    def test_endpoint_rate(self):
+        """
+        Ensure views with a throttle scope have their own rate, on the sync and async routes
+        """
+        for name in ['school-stats', 'async-school-stats']:
+            with self.subTest(name):
+                throttle_cache().clear()
+                url = reverse(name, kwargs={'pk': self.school.id})
+                for _ in range(2):
+                    self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+                self.assertThrottled(self.client.get(url), 30)
+                self.assertEqual(self.client.get(reverse('school-list')).status_code, status.HTTP_200_OK)
+        self.assertThrottled(self.client.get(reverse('school-bulk-stats'), {'ids': self.school.id}), 30)
+
+    @rates(client='100/min', stats='2/min')
+    @override_settings(IN_FLIGHT_LIMITS={'stats': 1})
+    def test_async_cache_calls(self):
+        """
+        Ensure the async routes use the async cache methods, so a network cache doesn't block the event loop
+        """
+        url = reverse('async-school-stats', kwargs={'pk': self.school.id})
+        with mock.patch.object(TokenBucketThrottle, 'allow_request', side_effect=AssertionError), \
+                mock.patch('core.throttling.acquire_in_flight', side_effect=AssertionError), \
+                mock.patch('core.throttling.release_in_flight', side_effect=AssertionError):
+            for _ in range(2):
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            self.assertThrottled(self.client.get(url), 30)
+
+    @override_settings(IN_FLIGHT_LIMITS={'transfer': 2, 'stats': 1})
+    def test_in_flight_limit(self):
+        """
+        Ensure requests over the in-flight cap of their scope are refused until a
+        slot is released, and finished requests release theirs
+        """
+        held = acquire_in_flight('transfer')
+        for _ in range(3):
+            response = self.client.post(reverse('transfer'), {}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(acquire_in_flight('transfer'))
+        self.assertThrottled(self.client.post(reverse('transfer'), {}, format='json'), 1)
+        self.assertThrottled(self.client.post(reverse('transfers'), [], format='json'), 1)
+        release_in_flight(held)
+        self.assertEqual(self.client.post(reverse('transfers'), [], format='json').status_code, status.HTTP_200_OK)
+
+        held = acquire_in_flight('stats')
+        self.assertThrottled(self.client.get(reverse('async-school-stats', kwargs={'pk': self.school.id})), 1)
+        release_in_flight(held)
+        for _ in range(2):
+            response = self.client.get(reverse('async-school-stats', kwargs={'pk': self.school.id}))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(acquire_in_flight('search'))
+
+    @override_settings(IN_FLIGHT_LIMITS={'transfer': 1})
+    def test_leaked_slots_expire(self):
+        """
+        Ensure a slot never released stops counting two periods after it was taken
+        """
+        with mock.patch('core.throttling.time.time', return_value=IN_FLIGHT_PERIOD * 10):
+            self.assertTrue(acquire_in_flight('transfer'))
+        with mock.patch('core.throttling.time.time', return_value=IN_FLIGHT_PERIOD * 11):
+            self.assertIs(acquire_in_flight('transfer'), False)
+        with mock.patch('core.throttling.time.time', return_value=IN_FLIGHT_PERIOD * 12):
+            self.assertTrue(acquire_in_flight('transfer'))
+
+    def test_shared_cache_check(self):
+        """
+        Ensure several workers with a per process throttle cache fail the system checks
+        """
+        locmem = {**settings.CACHES, 'throttle': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        redis = {**settings.CACHES, 'throttle': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with override_settings(CACHES=locmem, WEB_CONCURRENCY=4):
+            self.assertEqual([error.id for error in check_throttle_cache(None)], ['core.E001'])
+        with override_settings(CACHES=locmem, WEB_CONCURRENCY=1):
+            self.assertEqual(check_throttle_cache(None), [])
+        with override_settings(CACHES=redis, WEB_CONCURRENCY=4):
+            self.assertEqual(check_throttle_cache(None), [])
+        with override_settings(CACHES=locmem, WEB_CONCURRENCY=4, THROTTLE_ENABLED=False):
+            self.assertEqual(check_throttle_cache(None), [])
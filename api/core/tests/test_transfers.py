@@ -0,0 +1,143 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from django.db import connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from core.models import School, SchoolStats, Teacher, Course, Student, Enrollment
+
+
+class BatchTransferTests(APITestCase):
+    def setUp(self):
+        """
+        Create three courses and some students to use them for the tests
+        """
+        self.school = School.objects.create(name='Primary School', address='Test Address')
+        teacher = Teacher.objects.create(name='Teacher 1', school=self.school)
+        self.course1, self.course2, self.course3 = Course.objects.bulk_create([
+            Course(name=f'Course {i}', location=f'Room {i}', school=self.school, teacher=teacher)
+            for i in range(1, 4)
+        ])
+        self.students = self.enroll(5, self.course1)
+
+    def enroll(self, count, course):
+        students = Student.objects.bulk_create([Student(name=f'Student {i}', school=self.school) for i in range(count)])
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, course=course, school=self.school) for student in students
+        ])
+        return students
+
+    def transfer(self, student, from_course, to_course_id):
+        return {'studentId': student.id, 'fromCourseId': from_course.id, 'toCourseId': to_course_id}
+
+    def test_batch_transfer(self):
+        """
+        Ensure we can transfer many students at once and get a result per item
+        """
+        url = reverse('transfers')
+        data = [
+            self.transfer(self.students[0], self.course1, self.course2.id),
+            self.transfer(self.students[1], self.course1, self.course2.id),
+            self.transfer(self.students[2], self.course1, self.course3.id),
+            self.transfer(self.students[3], self.course2, self.course3.id),
+            self.transfer(self.students[4], self.course1, 0),
+            self.transfer(self.students[0], self.course2, self.course3.id),
+            {'studentId': 0, 'fromCourseId': self.course1.id, 'toCourseId': self.course2.id},
+            {'studentId': 'abc'},
+        ]
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([result['success'] for result in results], [True, True, True] + [False] * 5)
+        self.assertEqual(results[3]['message'], f"Student isn't included the course {self.course2.id}")
+        self.assertEqual(results[4]['message'], 'Course 0 does not exist')
+        self.assertEqual(results[5]['message'], f'Student {self.students[0].id} is transferred more than once.')
+        self.assertEqual(results[6]['message'], 'Student doest not exist.')
+        self.assertEqual(results[7]['message'], 'Invalid transfer.')
+
+        self.assertEqual(
+            list(Enrollment.objects.order_by('student_id').values_list('course_id', flat=True)),
+            [self.course2.id, self.course2.id, self.course3.id, self.course1.id, self.course1.id]
+        )
+        stats = SchoolStats.objects.get(school=self.school)
+        self.assertEqual((stats.students, stats.enrollments), (5, 5))
+
+    def test_batch_transfer_query_count(self):
+        """
+        Ensure the number of queries depends on the course pairs, not the number of students
+        """
+        students = self.enroll(100, self.course1)
+        data = [self.transfer(student, self.course1, self.course2.id) for student in students]
+        # 3 validation SELECTs, 1 UPDATE and the transaction savepoint
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse('transfers'), data, format='json')
+        self.assertTrue(all(result['success'] for result in response.data['results']))
+        self.assertEqual(self.course2.students.count(), 100)
+
+    def test_batch_transfer_expects_a_list(self):
+        """
+        Ensure a non list body is rejected
+        """
+        response = self.client.post(reverse('transfers'), {'studentId': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConcurrentTransferTests(TransactionTestCase):
+    clients = 16
+
+    def setUp(self):
+        """
+        Create two courses and a student to fight over
+        """
+        school = School.objects.create(name='Primary School', address='Test Address')
+        teacher = Teacher.objects.create(name='Teacher 1', school=school)
+        self.course1, self.course2 = Course.objects.bulk_create([
+            Course(name=f'Course {i}', location=f'Room {i}', school=school, teacher=teacher)
+            for i in range(1, 3)
+        ])
+        self.student = Student.objects.create(name='Student', school=school)
+        Enrollment.objects.create(student=self.student, course=self.course1, school=school)
+
+    def run_concurrently(self, payloads):
+        barrier = Barrier(len(payloads))
+
+        def post(payload):
+            try:
+                barrier.wait()
+                return APIClient().post(reverse('transfer'), payload).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(payloads)) as executor:
+            return list(executor.map(post, payloads))
+
+    def test_no_double_transfer(self):
+        """
+        Ensure exactly one of many identical concurrent transfers succeeds
+        """
+        payload = {'studentId': self.student.id, 'fromCourseId': self.course1.id, 'toCourseId': self.course2.id}
+        codes = self.run_concurrently([payload] * self.clients)
+        self.assertEqual(codes.count(status.HTTP_200_OK), 1)
+        self.assertEqual(codes.count(status.HTTP_409_CONFLICT), self.clients - 1)
+        self.assertEqual(list(self.student.courses.all()), [self.course2])
+
+    def test_no_lost_transfer(self):
+        """
+        Ensure concurrent back and forth transfers alternate, leaving the student
+        where the last successful one put it
+        """
+        forth = {'studentId': self.student.id, 'fromCourseId': self.course1.id, 'toCourseId': self.course2.id}
+        back = {'studentId': self.student.id, 'fromCourseId': self.course2.id, 'toCourseId': self.course1.id}
+        payloads = [forth, back] * (self.clients // 2)
+        for _ in range(5):
+            Enrollment.objects.filter(student=self.student).update(course=self.course1)
+            codes = self.run_concurrently(payloads)
+            self.assertTrue(set(codes) <= {status.HTTP_200_OK, status.HTTP_409_CONFLICT})
+
+            moved = [payload for payload, code in zip(payloads, codes) if code == status.HTTP_200_OK]
+            forth_count, back_count = moved.count(forth), moved.count(back)
+            self.assertIn(forth_count - back_count, (0, 1))
+            expected = self.course2 if forth_count > back_count else self.course1
+            self.assertEqual(list(self.student.courses.all()), [expected])
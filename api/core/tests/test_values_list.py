@@ -0,0 +1,109 @@
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import serializers, status
+from rest_framework.test import APITestCase
+from core.models import School, Teacher, Course, Administrator, Student, Enrollment
+from core.serializers import StudentSerializer
+from core.views import StudentViewSet
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ValuesListTests(APITestCase):
+    def setUp(self):
+        """
+        Create two schools with teachers, courses, admins and students, some
+        enrolled in several courses and one in none, to use them for the tests
+        """
+        self.schools = School.objects.bulk_create([
+            School(name=f'School {i}', address=f'Address {i}') for i in range(1, 3)
+        ])
+        for school in self.schools:
+            teachers = Teacher.objects.bulk_create([Teacher(name=f'Teacher {i}', school=school) for i in range(3)])
+            Administrator.objects.bulk_create([Administrator(name=f'Admin {i}', school=school) for i in range(2)])
+            courses = Course.objects.bulk_create([
+                Course(name=f'Course {i}', location=f'Room {i}', school=school, teacher=teacher)
+                for i, teacher in enumerate(teachers)
+            ])
+            students = Student.objects.bulk_create([
+                Student(name=name, school=school) for name in ['Ava', 'Ben', 'Ben', 'Zoë', 'Émile']
+            ])
+            Enrollment.objects.bulk_create([
+                Enrollment(student=student, course=course, school=school)
+                for index, student in enumerate(students[1:]) for course in courses[:index + 1]
+            ])
+
+    def assertSameResponses(self, url, params):
+        """
+        Ensure the values path answers `params` like the serializers do, and return the response
+        """
+        response = self.client.get(url, params)
+        with override_settings(VALUES_LIST_ENABLED=False):
+            expected = self.client.get(url, params)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(response.get('ETag'), expected.get('ETag'))
+        return response
+
+    def test_same_responses(self):
+        """
+        Ensure every list route renders the same pages, links and ETags from the rows
+        """
+        school_id = self.schools[1].id
+        for name in ['student-list', 'course-list', 'teacher-list', 'administrator-list']:
+            url = reverse(name)
+            for params in [
+                {}, {'limit': 3, 'offset': 2}, {'school': school_id}, {'cursor': '', 'limit': 4, 'count': 'true'},
+                {'fields': 'name'}, {'exclude': 'name'},
+            ]:
+                with self.subTest(name=name, params=params):
+                    self.assertSameResponses(url, params)
+        response = self.assertSameResponses(reverse('student-list'), {'name': 'Ben'})
+        courses = [course.id for course in Course.objects.order_by('id')]
+        self.assertEqual(
+            [row['course_ids'] for row in response.json()['results']],
+            [courses[:1], courses[:2], courses[3:4], courses[3:5]]
+        )
+
+    def test_keyset_pages(self):
+        """
+        Ensure the cursors built from the rows walk the same pages both ways
+        """
+        response = self.assertSameResponses(reverse('student-list'), {'cursor': '', 'limit': 3})
+        names = []
+        while response.json()['next']:
+            names += [row['name'] for row in response.json()['results']]
+            response = self.assertSameResponses(response.json()['next'], {})
+        names += [row['name'] for row in response.json()['results']]
+        self.assertEqual(names, sorted(Student.objects.values_list('name', flat=True)))
+        self.assertSameResponses(response.json()['previous'], {})
+
+    def test_queries_and_async_route(self):
+        """
+        Ensure a page is read by one query without serializing the rows, and the
+        async route serves the same rows
+        """
+        with mock.patch.object(StudentSerializer, 'to_representation', side_effect=AssertionError), \
+                self.assertNumQueries(1):
+            response = self.client.get(reverse('student-list'), {'cursor': ''})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for params in [{'limit': 4}, {'cursor': '', 'fields': 'course_ids'}]:
+            response = self.client.get(reverse('async-student-list'), params)
+            expected = self.client.get(reverse('student-list'), params)
+            self.assertEqual(response.json()['results'], expected.json()['results'])
+
+    def test_fallback(self):
+        """
+        Ensure serializers with fields rendering more than the column keep the regular path
+        """
+        class StudentWithSchool(serializers.ModelSerializer):
+            school = serializers.StringRelatedField()
+
+            class Meta:
+                model = Student
+                fields = ['name', 'school']
+
+        with mock.patch.object(StudentViewSet, 'serializer_class', StudentWithSchool):
+            response = self.client.get(reverse('student-list'), {'limit': 1})
+        self.assertEqual(response.json()['results'], [{'name': 'Ava', 'school': 'School 1'}])
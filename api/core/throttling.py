@@ -0,0 +1,239 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework.exceptions import Throttled
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from core.fastjson import FastJSONRenderer
+
+IN_FLIGHT_KEY = "core:in-flight:{}:{}"
+
+# In-flight counters are kept per period of this many seconds, requests being
+# counted in the one they started in. A slot leaked by a worker killed mid
+# request so disappears after two periods instead of lowering the cap for good.
+IN_FLIGHT_PERIOD = 60
+
+# Retry-After of the requests refused by an in-flight cap, which frees up as
+# soon as any of the requests holding it finishes
+IN_FLIGHT_RETRY_AFTER = 1
+
+
+def throttle_cache():
+    """
+    The cache of the buckets and in-flight counters, shared by the workers
+    """
+    return caches[settings.THROTTLE_CACHE]
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket per client: a rate of "120/min" allows bursts of 120 requests,
+    refilled at 2 per second. The bucket is a single timestamp in the cache,
+    when it is full again (the GCRA form of the algorithm), so a request costs
+    one get and one set. Like DRF's throttles it reads and writes without a
+    lock, so concurrent requests of one client can let a few extra through.
+    Scopes without a rate in DEFAULT_THROTTLE_RATES aren't throttled.
+    """
+
+    def __init__(self):
+        # The rate is read on each request, so settings changes apply
+        pass
+
+    @property
+    def cache(self):
+        return throttle_cache()
+
+    def get_scope(self, view):
+        return self.scope
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        if not self.is_throttled(request, view):
+            return True
+        full_at = self.take_token(self.cache.get(self.key, self.now))
+        if full_at is None:
+            return False
+        self.cache.set(self.key, full_at, math.ceil(full_at - self.now))
+        return True
+
+    async def aallow_request(self, request, view):
+        """
+        allow_request() through the async cache methods, for the async views
+        """
+        if not self.is_throttled(request, view):
+            return True
+        full_at = self.take_token(await self.cache.aget(self.key, self.now))
+        if full_at is None:
+            return False
+        await self.cache.aset(self.key, full_at, math.ceil(full_at - self.now))
+        return True
+
+    def is_throttled(self, request, view):
+        """
+        Whether the view's scope has a rate, reading it and the client's bucket key
+        """
+        self.scope = self.get_scope(view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope) if self.scope else None
+        if rate is None:
+            return False
+        self.num_requests, self.duration = self.parse_rate(rate)
+        self.key = self.get_cache_key(request, view)
+        self.now = self.timer()
+        return True
+
+    def take_token(self, full_at):
+        """
+        The time the bucket is full again once a token is taken from it, or
+        None when it is empty
+        """
+        interval = self.duration / self.num_requests
+        full_at = max(full_at, self.now) + interval
+        self.allowed_at = full_at - self.num_requests * interval
+        return None if self.allowed_at > self.now else full_at
+
+    def wait(self):
+        return self.allowed_at - self.now
+
+
+class ClientRateThrottle(TokenBucketThrottle):
+    """
+    The rate of all the API requests of a client, a user or an address
+    """
+    scope = "client"
+
+
+class EndpointRateThrottle(TokenBucketThrottle):
+    """
+    The rate of the requests of a client to the views sharing a `throttle_scope`
+    """
+
+    def get_scope(self, view):
+        return getattr(view, "throttle_scope", None)
+
+
+def in_flight_keys(scope):
+    """
+    The keys of the in-flight counters of the current and the previous period
+    """
+    period = int(time.time() // IN_FLIGHT_PERIOD)
+    return IN_FLIGHT_KEY.format(scope, period), IN_FLIGHT_KEY.format(scope, period - 1)
+
+
+def acquire_in_flight(scope):
+    """
+    Take one of the IN_FLIGHT_LIMITS[scope] slots, shared by the workers through
+    the cache. Returns the key to release it with, None when the scope has no
+    cap, or False when they are all taken.
+    """
+    limit = settings.IN_FLIGHT_LIMITS.get(scope)
+    if limit is None:
+        return None
+    cache = throttle_cache()
+    key, previous_key = in_flight_keys(scope)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=3 * IN_FLIGHT_PERIOD)
+        count = cache.incr(key)
+    # Requests started in the previous period and still running
+    count += cache.get(previous_key, 0)
+    if count > limit:
+        release_in_flight(key)
+        return False
+    return key
+
+
+async def aacquire_in_flight(scope):
+    """
+    acquire_in_flight() through the async cache methods
+    """
+    limit = settings.IN_FLIGHT_LIMITS.get(scope)
+    if limit is None:
+        return None
+    cache = throttle_cache()
+    key, previous_key = in_flight_keys(scope)
+    try:
+        count = await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=3 * IN_FLIGHT_PERIOD)
+        count = await cache.aincr(key)
+    count += await cache.aget(previous_key, 0)
+    if count > limit:
+        await arelease_in_flight(key)
+        return False
+    return key
+
+
+def release_in_flight(key):
+    if key:
+        try:
+            throttle_cache().decr(key)
+        except ValueError:
+            # Expired with a request outliving two periods
+            pass
+
+
+async def arelease_in_flight(key):
+    if key:
+        try:
+            await throttle_cache().adecr(key)
+        except ValueError:
+            pass
+
+
+class InFlightLimitMixin:
+    """
+    Caps the requests of a view's `throttle_scope` processed at once to
+    IN_FLIGHT_LIMITS[scope] across the workers, answering the others with a 429,
+    after the rate throttles so rejected requests don't take a slot
+    """
+    throttle_scope = None
+    in_flight_key = None
+
+    def check_throttles(self, request):
+        super().check_throttles(request)
+        self.in_flight_key = acquire_in_flight(self.throttle_scope)
+        if self.in_flight_key is False:
+            self.throttled(request, IN_FLIGHT_RETRY_AFTER)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        release_in_flight(self.in_flight_key)
+        self.in_flight_key = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class AsyncThrottleMixin:
+    """
+    The throttles and in-flight cap of the DRF views on async-native Django
+    views, through the async cache methods. Clients are identified by address
+    only, as authenticating them would run synchronous queries. Throttle classes
+    need an `aallow_request()`, as TokenBucketThrottle has.
+    """
+    throttle_scope = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        throttles = [throttle_class() for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES]
+        drf_request = Request(request)
+        waits = [throttle.wait() for throttle in throttles if not await throttle.aallow_request(drf_request, self)]
+        key = await aacquire_in_flight(self.throttle_scope) if not waits else None
+        if waits or key is False:
+            exc = Throttled(max(waits, default=IN_FLIGHT_RETRY_AFTER))
+            return HttpResponse(
+                FastJSONRenderer().render({"detail": exc.detail}), status=exc.status_code,
+                content_type="application/json", headers={"Retry-After": "%d" % exc.wait}
+            )
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        finally:
+            await arelease_in_flight(key)
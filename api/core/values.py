@@ -0,0 +1,70 @@
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Serializer fields whose output is the column value as the database returns
+# it, None included, so rows can be rendered without calling them
+PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField)
+
+
+def is_passthrough(field):
+    if isinstance(field, serializers.ListField):
+        return is_passthrough(field.child)
+    return type(field) in PASSTHROUGH_FIELDS
+
+
+class ValuesListMixin:
+    """
+    Serves the list action from `values_list()` rows mapped straight to the
+    serializer's output shape, without building a model instance and running
+    the serializer fields for each row. It applies when every rendered field
+    reads a column or annotation the serializer would output unchanged;
+    other serializers, and VALUES_LIST_ENABLED=false, keep the regular path.
+    Filters, sparse fieldsets, pagination, ETags and the response cache work
+    the same on both.
+    """
+    values_loaded = ("pk", "updated_at")
+
+    def values_sources(self):
+        """
+        The {name: source} of the fields to render from the rows, or None when
+        the serializer has to render them
+        """
+        if not settings.VALUES_LIST_ENABLED:
+            return None
+        fields = {name: field for name, field in self.get_serializer().fields.items() if not field.write_only}
+        sources = {name: field.source for name, field in fields.items()}
+        if not all(is_passthrough(field) for field in fields.values()):
+            return None
+        if len(set(sources.values())) != len(sources) or any(
+            source == "*" or "." in source for source in sources.values()
+        ):
+            return None
+        return sources
+
+    def values_queryset(self, queryset, sources):
+        """
+        The rows as named tuples starting with the rendered columns, followed by
+        what pagination and the ETags read: the primary key, `updated_at` and
+        the ordering columns
+        """
+        opts = queryset.model._meta
+        ordering = [field.lstrip("-") for field in queryset.query.order_by or opts.ordering if isinstance(field, str)]
+        columns = dict.fromkeys([*sources.values(), *self.values_loaded, opts.pk.attname, *ordering])
+        return queryset.values_list(*columns, named=True)
+
+    @staticmethod
+    def values_data(rows, sources):
+        names = list(sources)
+        return [dict(zip(names, row)) for row in rows]
+
+    def list(self, request, *args, **kwargs):
+        sources = self.values_sources()
+        if sources is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.values_queryset(self.filter_queryset(self.get_queryset()), sources)
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(self.values_data(rows, sources))
+        return self.get_paginated_response(self.values_data(page, sources))
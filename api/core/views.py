@@ -1,76 +1,544 @@
-from rest_framework import viewsets, mixins
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Prefetch
+from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.serializers import as_serializer_error
 from rest_framework.views import APIView
-from django.http import Http404
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from django.views import View
+
+from core.cache import CachedResponseMixin, cached_response, cached_view_names, get_metrics, invalidate_schools, \
+    school_pk
+from core.conditional import ConditionalResponseMixin, conditional_response, data_version
+from core.export import EXPORT_ENTITIES, CSVRenderer, NDJSONRenderer, export_response
+from core.fastjson import FastJSONRenderer
+from core.filters import SchoolFilterSet, CourseFilterSet, AdministratorFilterSet, TeacherFilterSet, \
+    StudentFilterSet
+from core.models import School, SchoolStats, Course, Administrator, Teacher, Student, Enrollment
+from core.search import SEARCH_TYPES, search_names
+from core.serializers import SchoolSerializer, SchoolStatsSerializer, CourseSerializer, AdministratorSerializer, \
+    TeacherSerializer, StudentSerializer, RosterSchoolSerializer, RosterCourseSerializer
+from core.sparse import SparseFieldsMixin
+from core.throttling import InFlightLimitMixin, AsyncThrottleMixin
+from core.values import ValuesListMixin
+from new_app.pooled_postgresql.pool import pool_stats
 
-from core.models import School, Course, Administrator, Teacher, Student
-from core.serializers import SchoolSerializer, CourseSerializer, AdministratorSerializer, \
-    TeacherSerializer, StudentSerializer
 
+def requested_school_ids(request, kwargs):
+    try:
+        return [int(school_id) for school_id in request.query_params["ids"].split(",") if school_id]
+    except (KeyError, ValueError):
+        return None
 
-class SchoolViewSet(viewsets.ModelViewSet):
-    queryset = School.objects.all()
+
+class SchoolViewSet(
+    InFlightLimitMixin, CachedResponseMixin, ConditionalResponseMixin, SparseFieldsMixin, viewsets.ModelViewSet
+):
+    queryset = School.objects.order_by("id")
     serializer_class = SchoolSerializer
+    filterset_class = SchoolFilterSet
 
-    @action(detail=True, methods=['get'])
+    @cached_response(school_ids=school_pk)
+    def retrieve(self, request, *args, **kwargs):
+        # Skips the globally keyed cache of CachedResponseMixin
+        return ConditionalResponseMixin.retrieve(self, request, *args, **kwargs)
+
+    @action(detail=True, methods=['get'], throttle_scope='stats')
+    @cached_response(school_ids=school_pk)
+    @conditional_response(data_version)
     def stats(self, request, pk, *args, **kwargs):
         try:
-            school = School.objects.get(id=pk)
-            result = {
-                "id": school.id,
-                "courses": Course.objects.filter(school__id=pk).count(),
-                "admins": Administrator.objects.filter(school__id=pk).count(),
-                "teachers": Teacher.objects.filter(school__id=pk).count(),
-                "students": Student.objects.filter(school__id=pk).count()
-            }
-            return Response(result)
-        except School.DoesNotExist:
+            stats = SchoolStats.objects.get(school_id=pk)
+        except SchoolStats.DoesNotExist:
             raise Http404
+        return Response(SchoolStatsSerializer(stats).data)
+
+    @action(detail=False, methods=['get'], url_path='stats', url_name='bulk-stats', throttle_scope='stats')
+    @cached_response(school_ids=requested_school_ids)
+    @conditional_response(data_version)
+    def bulk_stats(self, request, *args, **kwargs):
+        """
+        Return the stats of the schools listed in `?ids=1,2,3`, or of every school
+        page by page when no ids are given
+        """
+        queryset = SchoolStats.objects.order_by("school_id")
+        ids = request.query_params.get("ids")
+        if ids is None:
+            page = self.paginate_queryset(queryset)
+            return self.get_paginated_response(SchoolStatsSerializer(page, many=True).data)
+
+        try:
+            ids = [int(school_id) for school_id in ids.split(",") if school_id]
+        except ValueError:
+            raise ValidationError({"ids": "Expected a comma separated list of school ids."})
+        return Response(SchoolStatsSerializer(queryset.filter(school_id__in=ids), many=True).data)
+
+    @action(detail=True, methods=['get'])
+    @cached_response(school_ids=school_pk)
+    @conditional_response(data_version)
+    def roster(self, request, *args, **kwargs):
+        """
+        Return the school with a page of its courses, each with its teacher and
+        students nested, in four queries whatever the size of the school
+        """
+        school = self.get_object()
+        courses = Course.objects.filter(school_id=school.pk).order_by("id").select_related("teacher").only(
+            "id", "name", "location", "teacher__id", "teacher__name"
+        ).prefetch_related(Prefetch(
+            "students",
+            queryset=Student.objects.order_by("name", "id").only("id", "name")
+        ))
+        page = self.paginate_queryset(courses)
+        response = self.get_paginated_response(RosterCourseSerializer(page, many=True).data)
+        response.data = {"school": RosterSchoolSerializer(school).data, **response.data}
+        return response
+
+    @action(detail=True, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request, *args, **kwargs):
+        """
+        Stream the rows of the school's `?entities=students,enrollments,teachers,courses,admins`
+        (all of them by default) as `?format=csv` or `?format=ndjson`
+        """
+        entities = request.query_params.get("entities")
+        entities = list(dict.fromkeys(entity for entity in entities.split(",") if entity)) \
+            if entities else list(EXPORT_ENTITIES)
+        unknown = [entity for entity in entities if entity not in EXPORT_ENTITIES]
+        if unknown or not entities:
+            raise ValidationError({"entities": [f"Expected a comma separated list of {', '.join(EXPORT_ENTITIES)}."]})
+        school = self.get_object()
+        return export_response(request, school.pk, entities, settings.EXPORT_CHUNK_SIZE)
+
+
+class BulkCreateMixin:
+    """
+    Accepts a list body on create: valid items are inserted in batches and invalid
+    ones are reported by index, or nothing is inserted on any error with `?atomic=true`
+    """
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        atomic = request.query_params.get("atomic", "").lower() in ("1", "true")
+        try:
+            instances, errors = serializer.bulk_create(atomic=atomic, batch_size=settings.BULK_CREATE_BATCH_SIZE)
+        except IntegrityError:
+            # A referenced row was deleted between the validation and the INSERTs
+            return Response(
+                {"non_field_errors": ["A referenced row was deleted concurrently, nothing was created."]},
+                status=status.HTTP_409_CONFLICT
+            )
+        invalidate_schools([instance.school_id for instance in instances])
+        return Response(
+            {"created": serializer.to_representation(instances), "errors": errors},
+            status=status.HTTP_201_CREATED if instances else status.HTTP_400_BAD_REQUEST
+        )
 
 
-class CourseViewSet(viewsets.ModelViewSet):
-    queryset = Course.objects.all()
+class CourseViewSet(
+    BulkCreateMixin, CachedResponseMixin, ConditionalResponseMixin, SparseFieldsMixin, ValuesListMixin,
+    viewsets.ModelViewSet
+):
+    queryset = Course.objects.order_by("id")
     serializer_class = CourseSerializer
+    filterset_class = CourseFilterSet
+    cascaded_enrollments = "course"
 
 
-class AdministratorViewSet(viewsets.ModelViewSet):
-    queryset = Administrator.objects.all()
+class AdministratorViewSet(
+    BulkCreateMixin, CachedResponseMixin, ConditionalResponseMixin, SparseFieldsMixin, ValuesListMixin,
+    viewsets.ModelViewSet
+):
+    queryset = Administrator.objects.order_by("id")
     serializer_class = AdministratorSerializer
+    filterset_class = AdministratorFilterSet
 
 
-class TeacherViewSet(viewsets.ModelViewSet):
-    queryset = Teacher.objects.all()
+class TeacherViewSet(
+    BulkCreateMixin, CachedResponseMixin, ConditionalResponseMixin, SparseFieldsMixin, ValuesListMixin,
+    viewsets.ModelViewSet
+):
+    queryset = Teacher.objects.order_by("id")
     serializer_class = TeacherSerializer
+    filterset_class = TeacherFilterSet
+    cascaded_enrollments = "course__teacher"
 
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(
+    BulkCreateMixin, CachedResponseMixin, ConditionalResponseMixin, SparseFieldsMixin, ValuesListMixin,
+    viewsets.ModelViewSet
+):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
+    filterset_class = StudentFilterSet
+
+    def get_queryset(self):
+        # The courses subquery only runs when they are rendered
+        fields = self.requested_fields()
+        queryset = super().get_queryset()
+        courses = fields is None or "course_ids" in fields or "course_id" in fields
+        return queryset.with_course_ids() if courses else queryset
+
+
+class TransferView(InFlightLimitMixin, APIView):
+    """
+    Move one student between courses with a single conditional UPDATE, so
+    concurrent transfers of the same student can't overwrite each other. The
+    failure is only diagnosed, with extra reads, when nothing was updated.
+    """
+    throttle_scope = "transfer"
+
+    def post(self, request, format=None):
+        try:
+            if not isinstance(request.data, dict):
+                # A JSON array or scalar body
+                raise TypeError
+            student_id = int(request.data.get("studentId"))
+            from_course_id = int(request.data.get("fromCourseId"))
+            to_course_id = int(request.data.get("toCourseId"))
+        except (TypeError, ValueError):
+            return Response(
+                {"success": False, "message": "studentId, fromCourseId and toCourseId must be integers."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            moved = Enrollment.objects.transfer([student_id], from_course_id, to_course_id)
+        except IntegrityError:
+            # Another course of the student was moved to the same one concurrently
+            moved = {}
+        if moved:
+            invalidate_schools(moved.values())
+            return Response({
+                "success": True,
+                "message": f"Successfully transferred Student {student_id} "
+                           f"from Course {from_course_id} to Course {to_course_id}"
+            })
+
+        school_id = Student.objects.filter(id=student_id).values_list("school_id", flat=True).first()
+        if school_id is None:
+            return Response(
+                {"success": False, "message": "Student doest not exist."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        enrolled = set(Enrollment.objects.filter(
+            student_id=student_id, course_id__in=[from_course_id, to_course_id]
+        ).values_list("course_id", flat=True))
+        if from_course_id not in enrolled:
+            return Response(
+                {"success": False, "message": f"Student isn't included the course {from_course_id}"},
+                status=status.HTTP_409_CONFLICT
+            )
+        if to_course_id in enrolled:
+            return Response(
+                {"success": False, "message": f"Student is already included the course {to_course_id}"},
+                status=status.HTTP_409_CONFLICT
+            )
+        if not Course.objects.filter(id=to_course_id, school_id=school_id).exists():
+            return Response(
+                {"success": False, "message": f"Course {to_course_id} does not exist"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        # The student left or joined a course after the UPDATE ran
+        return Response(
+            {"success": False, "message": f"Student isn't included the course {from_course_id}"},
+            status=status.HTTP_409_CONFLICT
+        )
+
+
+class BatchTransferView(InFlightLimitMixin, APIView):
+    """
+    Move many students between courses in one request. Students, their
+    enrollments and courses are validated with one query each and the moves are applied with one conditional
+    UPDATE per (from course, to course) pair inside a single transaction.
+    """
+    throttle_scope = "transfer"
+
+    def post(self, request, format=None):
+        if not isinstance(request.data, list):
+            raise ValidationError({"non_field_errors": ["Expected a list of transfers."]})
+
+        transfers, results = [], []
+        for item in request.data:
+            try:
+                transfer = {key: int(item[key]) for key in ("studentId", "fromCourseId", "toCourseId")}
+            except (TypeError, KeyError, ValueError):
+                transfer = None
+                results.append({"success": False, "message": "Invalid transfer."})
+            else:
+                results.append({**transfer, "success": False})
+            transfers.append(transfer)
+
+        valid = [transfer for transfer in transfers if transfer]
+        student_ids = {transfer["studentId"] for transfer in valid}
+        school_ids = dict(Student.objects.filter(id__in=student_ids).values_list("id", "school_id"))
+        enrolled = set(Enrollment.objects.filter(student_id__in=student_ids, course_id__in={
+            course_id for transfer in valid for course_id in (transfer["fromCourseId"], transfer["toCourseId"])
+        }).values_list("student_id", "course_id"))
+        course_schools = dict(Course.objects.filter(
+            id__in={transfer["toCourseId"] for transfer in valid}
+        ).values_list("id", "school_id"))
+
+        groups, seen = defaultdict(list), set()
+        for index, transfer in enumerate(transfers):
+            if transfer is None:
+                continue
+            student_id = transfer["studentId"]
+            from_course_id, to_course_id = transfer["fromCourseId"], transfer["toCourseId"]
+            if student_id in seen:
+                results[index]["message"] = f"Student {student_id} is transferred more than once."
+            elif student_id not in school_ids:
+                results[index]["message"] = "Student doest not exist."
+            elif (student_id, from_course_id) not in enrolled:
+                results[index]["message"] = f"Student isn't included the course {from_course_id}"
+            elif (student_id, to_course_id) in enrolled:
+                results[index]["message"] = f"Student is already included the course {to_course_id}"
+            elif course_schools.get(to_course_id) != school_ids[student_id]:
+                results[index]["message"] = f"Course {to_course_id} does not exist"
+            else:
+                groups[from_course_id, to_course_id].append(index)
+            seen.add(student_id)
+
+        try:
+            moved_schools = self.apply(transfers, results, groups)
+        except IntegrityError:
+            # A concurrent request enrolled one of the students in a target course
+            for index in [index for group in groups.values() for index in group]:
+                results[index]["success"] = False
+                results[index]["message"] = "Conflicting concurrent transfer, nothing was transferred."
+            moved_schools = set()
+
+        if moved_schools:
+            invalidate_schools(moved_schools)
+        return Response({"results": results})
+
+    def apply(self, transfers, results, groups):
+        moved_schools = set()
+        with transaction.atomic():
+            for (from_course_id, to_course_id), indexes in groups.items():
+                moved = Enrollment.objects.transfer(
+                    [transfers[index]["studentId"] for index in indexes], from_course_id, to_course_id
+                )
+                moved_schools.update(moved.values())
+                for index in indexes:
+                    student_id = transfers[index]["studentId"]
+                    if student_id in moved:
+                        results[index]["success"] = True
+                        results[index]["message"] = f"Successfully transferred Student {student_id} " \
+                                                    f"from Course {from_course_id} to Course {to_course_id}"
+                    else:
+                        # Changed by a concurrent request since it was validated
+                        results[index]["message"] = f"Student isn't included the course {from_course_id}"
+        return moved_schools
+
+
+class EnrollmentView(APIView):
+    """
+    Enroll (POST) or unenroll (DELETE) a list of `{"studentId", "courseId"}` pairs
+    with one statement, reporting per pair whether it changed anything. Enrolling
+    twice or in a course of another school is a no-op.
+    """
 
-#
-class TransferView(APIView):
     def post(self, request, format=None):
-        student_id = request.data.get("studentId")
-        from_course_id = int(request.data.get("fromCourseId"))
-        to_course_id = int(request.data.get("toCourseId"))
+        return self.apply(request, self.enroll)
+
+    def delete(self, request, format=None):
+        return self.apply(request, self.unenroll)
+
+    def apply(self, request, change):
+        if not isinstance(request.data, list):
+            raise ValidationError({"non_field_errors": ["Expected a list of enrollments."]})
+        pairs = []
+        for item in request.data:
+            try:
+                pairs.append((int(item["studentId"]), int(item["courseId"])))
+            except (TypeError, KeyError, ValueError):
+                pairs.append(None)
+
+        valid = list({pair for pair in pairs if pair})
+        changed = {}
+        with transaction.atomic():
+            if valid:
+                # The counter triggers update the stats rows in no particular order,
+                # lock them in school order first so concurrent batches can't deadlock
+                list(SchoolStats.objects.filter(
+                    school__student__id__in={student_id for student_id, course_id in valid}
+                ).order_by("school_id").select_for_update().values_list("school_id", flat=True))
+                changed = change(valid)
+            if changed:
+                Student.objects.filter(id__in={student_id for student_id, course_id in changed}).update(
+                    updated_at=timezone.now()
+                )
+        if changed:
+            invalidate_schools(set(changed.values()))
+        return Response({"results": [
+            {"success": False, "message": "Invalid enrollment."} if pair is None else
+            {"studentId": pair[0], "courseId": pair[1], "success": pair in changed}
+            for pair in pairs
+        ]})
+
+    def enroll(self, pairs):
+        """
+        Insert the enrollments whose course is offered by the student's school and
+        that don't exist yet, returning {(student id, course id): school id}
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {Enrollment._meta.db_table} (student_id, course_id, school_id, created_at) "
+                f"SELECT student.id, course.id, course.school_id, now() "
+                f"FROM unnest(%s::bigint[], %s::bigint[]) AS pair (student_id, course_id) "
+                f"JOIN {Student._meta.db_table} student ON student.id = pair.student_id "
+                f"JOIN {Course._meta.db_table} course ON course.id = pair.course_id "
+                f"AND course.school_id = student.school_id "
+                f"ON CONFLICT (student_id, course_id) DO NOTHING "
+                f"RETURNING student_id, course_id, school_id",
+                [[student_id for student_id, course_id in pairs], [course_id for student_id, course_id in pairs]]
+            )
+            return {(student_id, course_id): school_id for student_id, course_id, school_id in cursor.fetchall()}
+
+    def unenroll(self, pairs):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {Enrollment._meta.db_table} enrollment "
+                f"USING unnest(%s::bigint[], %s::bigint[]) AS pair (student_id, course_id) "
+                f"WHERE enrollment.student_id = pair.student_id AND enrollment.course_id = pair.course_id "
+                f"RETURNING enrollment.student_id, enrollment.course_id, enrollment.school_id",
+                [[student_id for student_id, course_id in pairs], [course_id for student_id, course_id in pairs]]
+            )
+            return {(student_id, course_id): school_id for student_id, course_id, school_id in cursor.fetchall()}
+
+
+class SearchView(InFlightLimitMixin, APIView):
+    """
+    Search students, teachers and administrators by name as you type:
+    `?q=ali smi` matches the names with words starting with "ali" and "smi",
+    best first. `?school=1,2` and `?type=students,teachers,admins` narrow the
+    search, `?limit=` is 20 by default and 100 at most.
+    """
+    max_limit = 100
+    throttle_scope = "search"
+
+    def get(self, request, format=None):
+        params = request.query_params
+        errors = {}
+        text = params.get("q", "")
+        if not text.strip():
+            errors["q"] = "This parameter is required."
+        types = [key for key in params.get("type", "").split(",") if key] or list(SEARCH_TYPES)
+        if any(key not in SEARCH_TYPES for key in types):
+            errors["type"] = f"Expected a comma separated list of {', '.join(SEARCH_TYPES)}."
+        try:
+            school_ids = [int(school_id) for school_id in params.get("school", "").split(",") if school_id]
+        except ValueError:
+            errors["school"] = "Expected a comma separated list of school ids."
         try:
-            student = Student.objects.get(id=student_id)
-        except Student.DoesNotExist:
-            return Response({"success": False, "message": "Student doest not exist."})
+            limit = int(params.get("limit", 20))
+            if not 0 < limit <= self.max_limit:
+                raise ValueError
+        except ValueError:
+            errors["limit"] = f"Expected a number between 1 and {self.max_limit}."
+        if errors:
+            raise ValidationError(errors)
+        return Response({"results": search_names(text, types=types, school_ids=school_ids, limit=limit)})
 
-        if student.course_id != from_course_id:
-            return Response({"success": False, "message": f"Student isn't included the course {from_course_id}"})
 
+def json_response(data, status=status.HTTP_200_OK, headers=None):
+    return HttpResponse(
+        FastJSONRenderer().render(data), status=status, content_type="application/json", headers=headers
+    )
+
+
+class AsyncReadView(AsyncThrottleMixin, View):
+    """
+    Async-native GET of the list and detail routes of a viewset, serving the same
+    JSON through the async ORM instead of running the whole request in a worker
+    thread. The viewset's queryset, filters, pagination and serializer are reused;
+    the response cache and validators are left to the sync routes.
+    """
+    viewset = None
+
+    async def get(self, request, pk=None):
+        request = Request(request)
+        view = self.viewset(
+            request=request, args=(), kwargs={} if pk is None else {"pk": pk}, format_kwarg=None,
+            action="list" if pk is None else "retrieve"
+        )
         try:
-            course = Course.objects.get(id=to_course_id)
-        except Course.DoesNotExist:
-            return Response({"success": False, "message": f"Course {to_course_id} does not exist"})
-
-        student.course = course
-        student.save()
-        return Response({
-            "success": True,
-            "message": f"Successfully transferred Student {student_id} "
-                       f"from Course {from_course_id} to Course {to_course_id}"
-        })
\ No newline at end of file
+            return await self.read(view, request, pk)
+        except (APIException, Http404, DjangoValidationError) as exc:
+            # Invalid filters, cursors and fields, answered as on the sync routes
+            if isinstance(exc, DjangoValidationError):
+                exc = ValidationError(as_serializer_error(exc))
+            response = view.get_exception_handler()(exc, view.get_exception_handler_context())
+            if response is None:
+                raise
+            headers = {header: value for header, value in response.items() if header != "Content-Type"}
+            return json_response(response.data, status=response.status_code, headers=headers)
+
+    async def read(self, view, request, pk):
+        queryset = view.filter_queryset(view.get_queryset())
+        if pk is not None:
+            try:
+                instance = await queryset.aget(pk=pk)
+            except queryset.model.DoesNotExist:
+                # Raised as get_object_or_404() does on the sync route, for the
+                # exception handler to render it the same way
+                raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+            return json_response(view.get_serializer(instance).data)
+
+        sources = view.values_sources() if isinstance(view, ValuesListMixin) else None
+        if sources is not None:
+            queryset = view.values_queryset(queryset, sources)
+        page = await view.paginator.apaginate_queryset(queryset, request, view)
+        rows = page if page is not None else [row async for row in queryset]
+        data = view.values_data(rows, sources) if sources is not None else view.get_serializer(rows, many=True).data
+        if page is None:
+            return json_response(data)
+        return json_response(view.paginator.get_paginated_response(data).data)
+
+
+class AsyncSchoolStatsView(AsyncThrottleMixin, View):
+    """
+    Async-native GET /api/schools/:id/stats. The counts are kept in one
+    SchoolStats row, so this is a single primary key read.
+    """
+    throttle_scope = "stats"
+
+    async def get(self, request, pk):
+        try:
+            stats = await SchoolStats.objects.aget(school_id=pk)
+        except SchoolStats.DoesNotExist:
+            return json_response({"detail": NotFound.default_detail}, status=status.HTTP_404_NOT_FOUND)
+        return json_response(SchoolStatsSerializer(stats).data)
+
+
+class DatabasePoolView(APIView):
+    """
+    Connection pool usage of the process serving the request: connections in
+    use and idle, requests waiting for one and the time spent waiting
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        return Response({"pools": pool_stats()})
+
+
+class ResponseCacheMetricsView(APIView):
+    """
+    Response cache hits and misses of every cached view, read by the server so
+    they're the ones of its cache even when it's local to the process
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        return Response({"views": get_metrics(cached_view_names())})
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'new_app.settings')
+# Requests run their sync code in short lived threads, where persistent
+# connections would pile up: share a pool of connections instead
+os.environ.setdefault('DB_POOL_MAX_SIZE', '10')
 
 application = get_asgi_application()
@@ -0,0 +1,224 @@
+"""
+Per request SQL instrumentation: query count, database time, slowest statements
+and repeated query shapes (probable N+1s), reported as Server-Timing headers and
+structured log fields by the middleware, and enforced in tests by `query_budget`.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_recorder = ContextVar("sql_recorder", default=None)
+
+PLACEHOLDER_LIST = re.compile(r"\(%s(?:\s*,\s*%s)*\)")
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def query_shape(sql):
+    """
+    Normalize a statement so executions differing only by their parameters,
+    literals or the length of an IN list compare equal
+    """
+    sql = PLACEHOLDER_LIST.sub("(...)", sql)
+    sql = STRING_LITERAL.sub("?", sql)
+    return NUMBER_LITERAL.sub("?", sql)
+
+
+class QueryRecorder:
+    def __init__(self, parent=None):
+        # Queries are also recorded by the enclosing recorder, if any
+        self.parent = parent
+        self.queries = []
+
+    def add(self, alias, sql, duration):
+        self.queries.append((alias, sql, duration))
+        if self.parent is not None:
+            self.parent.add(alias, sql, duration)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(duration for alias, sql, duration in self.queries)
+
+    def slowest(self, limit):
+        return sorted(self.queries, key=lambda query: query[2], reverse=True)[:limit]
+
+    def repeated(self, threshold):
+        """
+        Return (shape, executions) of the query shapes executed at least `threshold`
+        times, most repeated first
+        """
+        shapes = Counter(query_shape(sql) for alias, sql, duration in self.queries)
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.add(context["connection"].alias, sql, time.perf_counter() - started)
+
+
+def install(connection, **kwargs):
+    # Installed once per connection object, a no-op outside of `record_queries`
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install)
+
+
+@contextmanager
+def record_queries():
+    """
+    Record the queries run on every database by the current thread or task, and
+    the threads it runs sync code in, for the duration of the block
+    """
+    for connection in connections.all():
+        install(connection)
+    recorder = QueryRecorder(_recorder.get())
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Adds the query count, database time and slowest statements of each request
+    to its `Server-Timing` header and to a structured log record. The record is
+    a debug one, so high request rates don't flood the logs, an info one when
+    the request is over SQL_REQUEST_QUERY_BUDGET queries or
+    SQL_REQUEST_TIME_BUDGET_MS of database time, and a warning when a query
+    shape repeats at least SQL_REPEATED_QUERY_THRESHOLD times.
+    Queries run while a streaming response is consumed aren't counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.SQL_INSTRUMENTATION_ENABLED:
+            return self.get_response(request)
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        self.report(request, response, recorder)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.SQL_INSTRUMENTATION_ENABLED:
+            return await self.get_response(request)
+        with record_queries() as recorder:
+            response = await self.get_response(request)
+        self.report(request, response, recorder)
+        return response
+
+    def report(self, request, response, recorder):
+        slowest = recorder.slowest(settings.SQL_SLOWEST_QUERIES)
+        repeated = recorder.repeated(settings.SQL_REPEATED_QUERY_THRESHOLD)
+
+        timings = [f'db;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries"']
+        timings += [f"db-slow-{rank};dur={duration * 1000:.2f}" for rank, (alias, sql, duration) in enumerate(slowest, 1)]
+        if repeated:
+            timings.append(f'db-repeated;desc="{len(repeated)} repeated query shapes"')
+        if response.has_header("Server-Timing"):
+            timings.insert(0, response["Server-Timing"])
+        response["Server-Timing"] = ", ".join(timings)
+
+        message = "%s %s %s: %d queries in %.2fms"
+        args = [request.method, request.path, response.status_code, recorder.count, recorder.duration * 1000]
+        over_budget = recorder.count > settings.SQL_REQUEST_QUERY_BUDGET \
+            or recorder.duration * 1000 > settings.SQL_REQUEST_TIME_BUDGET_MS
+        level = logging.INFO if over_budget else logging.DEBUG
+        if over_budget:
+            message += ", over budget"
+        if repeated:
+            message += ", probable N+1: %s"
+            args.append("; ".join(f"{count}x {shape}" for shape, count in repeated))
+            level = logging.WARNING
+        if not logger.isEnabledFor(level):
+            return
+        logger.log(level, message, *args, extra={
+            "method": request.method,
+            "path": request.path,
+            "status_code": response.status_code,
+            "db_queries": recorder.count,
+            "db_time_ms": round(recorder.duration * 1000, 3),
+            "db_slowest": [
+                {"alias": alias, "sql": sql, "time_ms": round(duration * 1000, 3)} for alias, sql, duration in slowest
+            ],
+            "db_repeated": [{"shape": shape, "count": count} for shape, count in repeated],
+            "db_over_budget": over_budget,
+        })
+
+
+@contextmanager
+def assert_query_budget(test_case, queries, repeats=None):
+    """
+    Fail `test_case` when the block runs more than `queries` queries, or repeats
+    a query shape more than `repeats` times (SQL_REPEATED_QUERY_THRESHOLD - 1 by default)
+    """
+    if repeats is None:
+        repeats = settings.SQL_REPEATED_QUERY_THRESHOLD - 1
+    with record_queries() as recorder:
+        yield recorder
+    if recorder.count > queries:
+        statements = "\n".join(f"{index}. {sql}" for index, (alias, sql, duration) in enumerate(recorder.queries, 1))
+        test_case.fail(f"{recorder.count} queries executed, over the budget of {queries}:\n{statements}")
+    repeated = recorder.repeated(repeats + 1)
+    if repeated:
+        shapes = "\n".join(f"{count}x {shape}" for shape, count in repeated)
+        test_case.fail(f"Query shapes repeated more than {repeats} times, probable N+1:\n{shapes}")
+
+
+def query_budget(queries, repeats=None):
+    """
+    Declare the query budget of a test method, or of every test method of a
+    test case class, failing the tests that exceed it (setUp isn't counted)
+    """
+    def decorator(target):
+        if isinstance(target, type):
+            for name in dir(target):
+                if name.startswith("test") and callable(getattr(target, name)):
+                    setattr(target, name, decorator(getattr(target, name)))
+            return target
+
+        if iscoroutinefunction(target):
+            @wraps(target)
+            async def async_test(self, *args, **kwargs):
+                with assert_query_budget(self, queries, repeats):
+                    return await target(self, *args, **kwargs)
+            return async_test
+
+        @wraps(target)
+        def test(self, *args, **kwargs):
+            with assert_query_budget(self, queries, repeats):
+                return target(self, *args, **kwargs)
+        return test
+
+    return decorator
@@ -0,0 +1,38 @@
+"""
+PostgreSQL backend checking connections out of a per process pool instead of
+opening one per request. Configured by the POOL entry of the database settings
+(MAX_SIZE, TIMEOUT, CHECK_INTERVAL, MAX_LIFETIME) and meant to be used with
+CONN_MAX_AGE = 0, so connections go back to the pool at the end of each request.
+"""
+from functools import partial
+
+from django.db.backends.postgresql import base
+
+from .creation import DatabaseCreation
+from .pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    pool = None
+
+    def get_pool(self, conn_params):
+        options = self.settings_dict.get("POOL", {})
+        return get_pool(
+            self.alias,
+            conn_params,
+            max_size=options.get("MAX_SIZE", 10),
+            timeout=options.get("TIMEOUT", 10),
+            check_interval=options.get("CHECK_INTERVAL", 5),
+            max_lifetime=options.get("MAX_LIFETIME", 3600),
+        )
+
+    def get_new_connection(self, conn_params):
+        # Keep the pool the connection came from, a forked child gets its own
+        self.pool = self.get_pool(conn_params)
+        return self.pool.getconn(partial(super().get_new_connection, conn_params))
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
@@ -0,0 +1,213 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of psycopg2 connections, shared by the threads of a process.
+
+    Checkouts block up to `timeout` seconds when `max_size` connections are in
+    use. Idle connections are health checked with a round trip on checkout when
+    they haven't been used for `check_interval` seconds, and replaced once they
+    are older than `max_lifetime`. Returned connections are rolled back and
+    their session state is discarded, broken ones are closed.
+    """
+
+    def __init__(self, alias, database, max_size=10, timeout=10, check_interval=5, max_lifetime=3600):
+        self.alias = alias
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.max_lifetime = max_lifetime
+        self.pid = os.getpid()
+
+        self.condition = threading.Condition()
+        # (connection, opened at, returned at), most recently returned last
+        self.idle = deque()
+        self.opened_at = {}
+        self.size = 0
+        self.waiting = 0
+        self.counters = {
+            "connections_opened": 0,
+            "connections_discarded": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "timeouts": 0,
+        }
+
+    def getconn(self, connect):
+        """
+        Check out a connection, calling `connect()` to open one when none is idle
+        """
+        started = time.monotonic()
+        with self.condition:
+            if not self.idle and self.size >= self.max_size:
+                self.wait(started)
+            self.counters["checkouts"] += 1
+            # Reserve the slot, the connection is checked or opened outside the lock
+            idle = self.idle.pop() if self.idle else None
+            if idle is None:
+                self.size += 1
+
+        if idle is not None:
+            connection, opened_at, returned_at = idle
+            if self.is_healthy(connection, opened_at, returned_at):
+                return connection
+            self.discard(connection, release=False)
+        try:
+            connection = connect()
+        except Exception:
+            self.release_slot()
+            raise
+        with self.condition:
+            self.counters["connections_opened"] += 1
+            self.opened_at[id(connection)] = time.monotonic()
+        return connection
+
+    def wait(self, started):
+        """
+        Wait, holding the condition, until a connection is idle or a slot is free
+        """
+        self.waiting += 1
+        try:
+            while not self.idle and self.size >= self.max_size:
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.counters["timeouts"] += 1
+                    raise psycopg2.OperationalError(
+                        f"No database connection available after {self.timeout}s ({self.max_size} in use)"
+                    )
+                self.condition.wait(remaining)
+        finally:
+            self.waiting -= 1
+            wait = time.monotonic() - started
+            self.counters["waits"] += 1
+            self.counters["wait_seconds"] += wait
+            self.counters["max_wait_seconds"] = max(self.counters["max_wait_seconds"], wait)
+
+    def putconn(self, connection):
+        if os.getpid() != self.pid:
+            # Inherited through a fork: closing it would end the parent's session
+            return
+        try:
+            if connection.closed:
+                raise psycopg2.InterfaceError("connection already closed")
+            if connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            self.reset_session(connection)
+        except psycopg2.Error:
+            self.discard(connection)
+            return
+        with self.condition:
+            self.idle.append((connection, self.opened_at.get(id(connection), time.monotonic()), time.monotonic()))
+            self.condition.notify()
+
+    def reset_session(self, connection):
+        """
+        Drop what the borrower left on the session, temporary tables such as the
+        staging ones of import_roster, SET without LOCAL, advisory locks and
+        prepared statements. The settings of Django are set again on checkout.
+        """
+        autocommit = connection.autocommit
+        # DISCARD ALL can't run in a transaction
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute("DISCARD ALL")
+        connection.autocommit = autocommit
+
+    def is_healthy(self, connection, opened_at, returned_at):
+        now = time.monotonic()
+        if connection.closed or now - opened_at > self.max_lifetime:
+            return False
+        if now - returned_at < self.check_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def discard(self, connection, release=True):
+        """
+        Close a connection, freeing its slot unless the caller replaces it
+        """
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        with self.condition:
+            self.opened_at.pop(id(connection), None)
+            self.counters["connections_discarded"] += 1
+            if release:
+                self.size -= 1
+                self.condition.notify()
+
+    def release_slot(self):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def close_all(self):
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+        for connection, opened_at, returned_at in idle:
+            self.discard(connection)
+
+    def stats(self):
+        with self.condition:
+            return {
+                "alias": self.alias,
+                "database": self.database,
+                "max_size": self.max_size,
+                "size": self.size,
+                "in_use": self.size - len(self.idle),
+                "idle": len(self.idle),
+                "waiting": self.waiting,
+                **self.counters,
+                "wait_seconds": round(self.counters["wait_seconds"], 6),
+                "max_wait_seconds": round(self.counters["max_wait_seconds"], 6),
+            }
+
+
+def get_pool(alias, conn_params, **options):
+    """
+    Return the pool of a database alias and connection parameters (the test
+    runner renames the database) for the current process, creating it on first
+    use and again in a forked child
+    """
+    key = (alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(alias, conn_params.get("database"), **options)
+        return pool
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools if pool.pid == os.getpid()]
+
+
+def close_pools(alias):
+    """
+    Close the idle connections of the pools of a database alias
+    """
+    with _pools_lock:
+        pools = [pool for pool in _pools.values() if pool.alias == alias and pool.pid == os.getpid()]
+    for pool in pools:
+        pool.close_all()
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'new_app.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -120,8 +121,38 @@ AUTHENTICATION_BACKENDS = (
     'guardian.backends.ObjectPermissionBackend',
 )
 
+# Token bucket rate limits of the API, see core/throttling.py: "<requests>/<period>"
+# allows bursts of <requests>, refilled evenly over the period. The client rate
+# covers all the requests of a user or address, the others the views with that
+# throttle_scope. Shared by the workers through the THROTTLE_CACHE below.
+THROTTLE_ENABLED = os.environ.get("THROTTLE_ENABLED", "true").lower() == "true"
+THROTTLE_RATES = {
+    'client': os.environ.get("THROTTLE_CLIENT_RATE", "3000/min"),
+    'transfer': os.environ.get("THROTTLE_TRANSFER_RATE", "300/min"),
+    'stats': os.environ.get("THROTTLE_STATS_RATE", "1200/min"),
+    'search': os.environ.get("THROTTLE_SEARCH_RATE", "600/min"),
+}
+
+# Requests of these throttle scopes processed at once across the workers, so a
+# single client can't take all the database connections
+IN_FLIGHT_LIMITS = {
+    'transfer': int(os.environ.get("IN_FLIGHT_TRANSFER_LIMIT", 16)),
+    'stats': int(os.environ.get("IN_FLIGHT_STATS_LIMIT", 32)),
+    'search': int(os.environ.get("IN_FLIGHT_SEARCH_LIMIT", 16)),
+} if THROTTLE_ENABLED else {}
+
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    # orjson when it's installed, with the same output as DRF's JSON renderer and parser
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.fastjson.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.fastjson.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetOrLimitOffsetPagination',
     'PAGE_SIZE': 25,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -129,6 +160,14 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.ClientRateThrottle',
+        'core.throttling.EndpointRateThrottle',
+    ] if THROTTLE_ENABLED else [],
+    'DEFAULT_THROTTLE_RATES': THROTTLE_RATES,
+    # Proxies in front of the API whose X-Forwarded-For is trusted to identify the
+    # throttled clients, none by default so a client can't choose its address
+    'NUM_PROXIES': int(os.environ.get("NUM_PROXIES", 0)),
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
@@ -136,6 +175,26 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Maximum number of rows per INSERT statement for list-body POSTs on the core endpoints
+BULK_CREATE_BATCH_SIZE = int(os.environ.get("BULK_CREATE_BATCH_SIZE", 1000))
+
+# Per request SQL instrumentation, see new_app/instrumentation.py: the slowest
+# statements are logged, at debug level unless the request is over one of the
+# budgets, and a query shape executed this many times in one request is
+# reported as a probable N+1
+SQL_INSTRUMENTATION_ENABLED = os.environ.get("SQL_INSTRUMENTATION_ENABLED", "true").lower() == "true"
+SQL_SLOWEST_QUERIES = int(os.environ.get("SQL_SLOWEST_QUERIES", 3))
+SQL_REPEATED_QUERY_THRESHOLD = int(os.environ.get("SQL_REPEATED_QUERY_THRESHOLD", 5))
+SQL_REQUEST_QUERY_BUDGET = int(os.environ.get("SQL_REQUEST_QUERY_BUDGET", 20))
+SQL_REQUEST_TIME_BUDGET_MS = float(os.environ.get("SQL_REQUEST_TIME_BUDGET_MS", 200))
+
+# Rows fetched per round trip by the server-side cursors of the exports
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 2000))
+
+# List pages rendered from values_list() rows instead of serializer instances
+# when their fields allow it, see core/values.py
+VALUES_LIST_ENABLED = os.environ.get("VALUES_LIST_ENABLED", "true").lower() == "true"
+
 JWT_AUTH = {
     'ACCESS_TOKEN_LIFETIME': datetime.timedelta(days=7),
     'REFRESH_TOKEN_LIFETIME': datetime.timedelta(days=7),
@@ -146,19 +205,68 @@ CRYPTOGRAPHY_KEY = os.environ.get("CRYPTOGRAPHY_KEY", SECRET_KEY)
 
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
+# With DB_POOL_MAX_SIZE > 0 each request checks a connection out of a per process
+# pool and returns it when it ends (the default of asgi.py). Otherwise connections
+# are persistent for DB_CONN_MAX_AGE seconds (the default of wsgi.py), or closed
+# at the end of each request with 0. Environment variables override both.
+
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 0))
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'new_app.pooled_postgresql' if DB_POOL_MAX_SIZE else 'django.db.backends.postgresql',
         'NAME': os.environ.get("POSTGRES_DB"),
         "USER": os.environ.get("POSTGRES_USER"),
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
-        "HOST": "db",
-        "PORT": 5432,
+        "HOST": os.environ.get("POSTGRES_HOST", "db"),
+        "PORT": int(os.environ.get("POSTGRES_PORT", 5432)),
+        "CONN_MAX_AGE": 0 if DB_POOL_MAX_SIZE else int(os.environ.get("DB_CONN_MAX_AGE", 0)),
+        # Ping persistent connections before reusing them in a new request
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "true").lower() == "true",
+        "POOL": {
+            "MAX_SIZE": DB_POOL_MAX_SIZE,
+            # Seconds a request waits for a connection before failing
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            # Idle connections unused for longer are pinged on checkout
+            "CHECK_INTERVAL": float(os.environ.get("DB_POOL_CHECK_INTERVAL", 5)),
+            "MAX_LIFETIME": float(os.environ.get("DB_POOL_MAX_LIFETIME", 3600)),
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# The local memory cache is per process: use a shared backend (memcached,
+# redis, database) when running several workers so invalidations reach all of
+# them, which the core.E002 system check enforces for the response cache
+
+# The rate limits and in-flight caps only hold across the uvicorn workers, as
+# many as WEB_CONCURRENCY, with a shared throttle cache: Redis when
+# THROTTLE_CACHE_LOCATION is set. A local memory one with several workers fails
+# the core.E001 system check, run by `migrate` in entrypoint.sh.
+THROTTLE_CACHE_LOCATION = os.environ.get("THROTTLE_CACHE_LOCATION")
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get("CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get("CACHE_LOCATION", 'core'),
+    },
+    'throttle': {
+        'BACKEND': os.environ.get("THROTTLE_CACHE_BACKEND", 'django.core.cache.backends.redis.RedisCache'
+                                  if THROTTLE_CACHE_LOCATION else 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': THROTTLE_CACHE_LOCATION or 'throttle',
+    },
+}
+THROTTLE_CACHE = 'throttle'
+
+# Versioned caching of the core read endpoints, see core/cache.py
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 300))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
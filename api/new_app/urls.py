@@ -16,5 +16,22 @@ api_router.register(r"students", core_views.StudentViewSet)
 urlpatterns =  [
     path('admin/', admin.site.urls),
     path('api/', include(api_router.urls)),
-    path('api/transfer', core_views.TransferView.as_view(), name='transfer')
-]
\ No newline at end of file
+    path('api/transfer', core_views.TransferView.as_view(), name='transfer'),
+    path('api/transfers', core_views.BatchTransferView.as_view(), name='transfers'),
+    path('api/enrollments', core_views.EnrollmentView.as_view(), name='enrollments'),
+    path('api/search', core_views.SearchView.as_view(), name='search'),
+    path('api/db-pool', core_views.DatabasePoolView.as_view(), name='db-pool'),
+    path('api/response-cache', core_views.ResponseCacheMetricsView.as_view(), name='response-cache'),
+    path('api/async/schools/<int:pk>/stats', core_views.AsyncSchoolStatsView.as_view(), name='async-school-stats'),
+]
+
+# Async-native read routes mirroring the list and detail GETs of every viewset
+for prefix, viewset, basename in api_router.registry:
+    urlpatterns += [
+        path(f'api/async/{prefix}', core_views.AsyncReadView.as_view(viewset=viewset), name=f'async-{basename}-list'),
+        path(
+            f'api/async/{prefix}/<int:pk>',
+            core_views.AsyncReadView.as_view(viewset=viewset),
+            name=f'async-{basename}-detail'
+        ),
+    ]
\ No newline at end of file
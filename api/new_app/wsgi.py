@@ -12,5 +12,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'new_app.settings')
+# Each worker thread serves requests one at a time and keeps its connection
+os.environ.setdefault('DB_CONN_MAX_AGE', '60')
 
 application = get_wsgi_application()